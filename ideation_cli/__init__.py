@@ -25,3 +25,12 @@ IDEATION_TECHNIQUES = [
     "scamper",
     "oblique_strategy",
 ]
+
+# Default rounds of critique and revision applied by the round_robin technique
+DEFAULT_REFINE_ROUNDS = 3
+
+# Methods available for ranking ideas before rendering cover images
+RANK_METHODS = ["heuristic", "model"]
+
+# Layouts of the idea directories under the output path
+LAYOUTS = ["flat", "sharded"]
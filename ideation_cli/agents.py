@@ -0,0 +1,227 @@
+"""
+agents.py - Multi-agent ideation for the Ideation CLI.
+
+With ``--agents`` each idea's task is worked by a team of autogen agents
+before it is named and described: a designer develops the mechanics, a
+critic finds the weak points and a marketer finds the hook. Their first
+turns run concurrently; the designer then revises the idea with the
+critic's and marketer's notes, and the revision becomes the idea's task.
+
+The agents do not use autogen's own OpenAI client. Each agent replies
+through the turn function it is given, ``generator.generate_agent_turn``
+in the CLI, so agent turns go through the
+same shared transport, endpoint pool, model router, cassettes and metrics
+as every other call. Agent turns across all ideas are limited to
+``--agent-concurrency`` at a time, and the turns of one idea to
+``--agent-max-tokens`` tokens; a turn that no longer fits is skipped and the
+idea keeps what the team produced so far.
+
+autogen is only imported the first time a team is used, since importing it
+takes longer than the rest of the CLI.
+
+Classes:
+    - TokenBudget: The token allowance of one idea.
+    - AgentTeam: The agents and the limits they share.
+
+Constants:
+    - ROLES: The system prompt of each agent.
+    - BRIEF: The message each agent's first turn replies to.
+    - REVISION_REQUEST: The message asking the designer to revise the idea.
+    - AGENTS: The process-wide team used by the CLI.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ROLES = {
+    "designer": (
+        "You are a game designer. Develop the game idea you are given into a concrete design: the core loop, "
+        "the main mechanics and what the player does minute to minute. Answer in plain text, in at most "
+        "200 words, without preamble."
+    ),
+    "critic": (
+        "You are a blunt game critic. Name the three weakest points of the game idea you are given and how "
+        "each could be fixed. Answer in plain text, in at most 120 words, without preamble."
+    ),
+    "marketer": (
+        "You are a games marketer. Find the hook of the game idea you are given: who it is for, the one-line "
+        "pitch and what would make it stand out on itch.io. Answer in plain text, in at most 120 words, "
+        "without preamble."
+    ),
+}
+
+BRIEF = "The game idea: {task}"
+
+REVISION_REQUEST = (
+    "Revise your design with this feedback. Keep what works, fix the weak points and make the hook "
+    "central. Answer with only the revised game idea, in at most 200 words.\n\n"
+    "Critic: {critic}\n\nMarketer: {marketer}"
+)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_TOKENS = 4000
+
+# Completion tokens allowed per turn, before the idea's allowance is considered.
+TURN_MAX_TOKENS = 600
+
+# The smallest completion worth asking for; a turn with less room is skipped.
+MIN_TURN_TOKENS = 100
+
+# Characters per token used to estimate a turn's prompt before sending it.
+CHARS_PER_TOKEN = 4
+
+
+def _require_autogen():
+    try:
+        import autogen
+    except ImportError as err:
+        raise RuntimeError(
+            "Multi-agent ideation needs autogen; install it with `pip install autogen`."
+        ) from err
+    return autogen
+
+
+class TokenBudget:
+    """The tokens the agent turns of one idea may still use."""
+
+    def __init__(self, max_tokens):
+        self._lock = threading.Lock()
+        self.remaining = max_tokens
+
+    def reserve(self, prompt_tokens):
+        """
+        Reserves room for a turn.
+
+        Args:
+            prompt_tokens (int): The estimated prompt tokens of the turn.
+
+        Returns:
+            int: The completion tokens the turn may use, or 0 if it does not fit.
+        """
+        with self._lock:
+            completion = min(TURN_MAX_TOKENS, self.remaining - prompt_tokens)
+            if completion < MIN_TURN_TOKENS:
+                return 0
+            self.remaining -= prompt_tokens + completion
+            return completion
+
+    def settle(self, reserved, used):
+        """Returns the unused part of a reservation once the turn's usage is known."""
+        with self._lock:
+            self.remaining += reserved - used
+
+
+class AgentTeam:
+    """A designer, a critic and a marketer working on ideas concurrently."""
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, concurrency=DEFAULT_CONCURRENCY, max_tokens=DEFAULT_MAX_TOKENS):
+        """
+        Sets the limits shared by every idea.
+
+        Args:
+            concurrency (int): The most agent turns in flight across all ideas.
+            max_tokens (int): The most tokens the turns of one idea may use.
+        """
+        self.concurrency = max(1, concurrency)
+        self.max_tokens = max_tokens
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def _turn(self, role, messages, model, generate, budget, transcript):
+        system_prompt = ROLES[role]
+        prompt_tokens = (
+            len(system_prompt) + sum(len(m["content"]) for m in messages)
+        ) // CHARS_PER_TOKEN
+        reserved = budget.reserve(prompt_tokens)
+        if not reserved:
+            print(f"Agent token budget spent, skipping the {role}'s turn.")
+            return None
+        used = prompt_tokens + reserved
+        try:
+            with self._slots:
+                reply, used = generate(system_prompt, messages, model, reserved)
+        finally:
+            budget.settle(prompt_tokens + reserved, used)
+        transcript.append({"agent": role, "content": reply, "tokens": used})
+        return reply
+
+    def _agent(self, role, model, generate, budget, transcript):
+        autogen = _require_autogen()
+        agent = autogen.ConversableAgent(
+            name=role,
+            system_message=ROLES[role],
+            llm_config=False,
+            human_input_mode="NEVER",
+            code_execution_config=False,
+        )
+
+        def reply(recipient, messages=None, sender=None, config=None):
+            history = [
+                {"role": message.get("role", "user"), "content": message["content"]}
+                for message in messages or []
+            ]
+            return True, self._turn(role, history, model, generate, budget, transcript)
+
+        agent.register_reply(
+            [autogen.Agent, None], reply, remove_other_reply_funcs=True
+        )
+        return agent
+
+    def work(self, task, model, generate):
+        """
+        Develops a task with the team.
+
+        Args:
+            task (str): The idea's task.
+            model (str): The run-level model.
+            generate (callable): Generates one turn, given the agent's system
+                prompt, the conversation, the model and the most completion
+                tokens; returns the reply and the tokens it used.
+
+        Returns:
+            tuple: The revised task, and the team's turns in the order they
+            finished, each with its ``agent``, ``content`` and ``tokens``.
+        """
+        budget = TokenBudget(self.max_tokens)
+        transcript = []
+        agents = {
+            role: self._agent(role, model, generate, budget, transcript)
+            for role in ROLES
+        }
+        brief = [{"role": "user", "content": BRIEF.format(task=task)}]
+        # Turns run in copies of this context, so a model pinned for the idea applies to them.
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+            futures = {
+                role: executor.submit(
+                    context.copy().run, agent.generate_reply, messages=brief
+                )
+                for role, agent in agents.items()
+            }
+            replies = {role: future.result() for role, future in futures.items()}
+
+        design = replies["designer"]
+        if not design:
+            return task, transcript
+        if not replies["critic"] and not replies["marketer"]:
+            return design, transcript
+        revision = agents["designer"].generate_reply(
+            messages=brief
+            + [
+                {"role": "assistant", "content": design},
+                {
+                    "role": "user",
+                    "content": REVISION_REQUEST.format(
+                        critic=replies["critic"] or "No notes.",
+                        marketer=replies["marketer"] or "No notes.",
+                    ),
+                },
+            ]
+        )
+        return revision or design, transcript
+
+
+AGENTS = AgentTeam()
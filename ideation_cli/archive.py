@@ -0,0 +1,346 @@
+"""
+archive.py - Packed archives of saved ideas.
+
+``ideation-cli pack ideas.tar`` packs every idea under ``--path`` into one
+uncompressed tar archive, with a JSON index next to it (``ideas.tar.idx``)
+giving the offset and size of every file of every idea. Moving one large
+file between machines avoids the per-file overhead of thousands of small
+``metadata.json`` and cover files, and the archive stays a plain tar that
+any tar tool can read.
+
+The archive is written and read through memory maps. Packing sizes the
+archive up front from the tar headers and file sizes, then copies each file
+into its place; reading maps the archive and serves a file as a slice of
+the map, so listing the ideas, reading one idea's metadata or streaming its
+cover touch only the bytes involved. Covers are PNGs, which do not compress
+further, so the archive is not compressed and never has to be decompressed
+as a whole.
+
+``ideation-cli unpack ideas.tar`` lists, shows or extracts ideas. If the
+index is missing, or does not match the archive, it is rebuilt by scanning
+the tar headers.
+
+Classes:
+    - IdeaArchive: A packed archive opened for reading.
+
+Functions:
+    - pack(root, archive_path): Pack the ideas under an output path.
+    - pack_main(argv): Run the ``pack`` subcommand.
+    - unpack_main(argv): Run the ``unpack`` subcommand.
+
+Constants:
+    - INDEX_SUFFIX: The suffix of the index file next to an archive.
+"""
+
+import argparse
+import fnmatch
+import json
+import mmap
+import os
+import posixpath
+import tarfile
+import tempfile
+
+from ideation_cli.utils import iter_idea_dirs
+from ideation_cli.writer import WRITER, write_bytes, write_json
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+METADATA_FILE = "metadata.json"
+COVER_FILE = "cover.png"
+
+
+def index_path(archive_path):
+    """Returns the path of the index of an archive."""
+    return archive_path + INDEX_SUFFIX
+
+
+def _padded(size):
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+
+def _idea_files(dir_path):
+    """The files of an idea directory that are packed, in sorted order."""
+    return sorted(
+        name
+        for name in os.listdir(dir_path)
+        if not name.startswith(".") and os.path.isfile(os.path.join(dir_path, name))
+    )
+
+
+def _read_name(path):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file).get("name")
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return None
+
+
+def pack(root, archive_path):
+    """
+    Packs every idea under an output path into an archive and its index.
+
+    Args:
+        root (str): The output path.
+        archive_path (str): The archive to write; it is replaced atomically.
+
+    Returns:
+        dict: The index written next to the archive.
+    """
+    # Lay out every header and file before writing, so the archive can be sized and mapped once.
+    members = []
+    ideas = []
+    offset = 0
+    for dir_path in iter_idea_dirs(root):
+        idea = posixpath.join(*os.path.relpath(dir_path, root).split(os.sep))
+        entry = {
+            "path": idea,
+            "name": _read_name(os.path.join(dir_path, METADATA_FILE)),
+            "files": {},
+        }
+        for name in _idea_files(dir_path):
+            source = os.path.join(dir_path, name)
+            stat = os.stat(source)
+            info = tarfile.TarInfo(posixpath.join(idea, name))
+            info.size = stat.st_size
+            info.mtime = int(stat.st_mtime)
+            info.mode = 0o644
+            header = info.tobuf(format=tarfile.PAX_FORMAT)
+            data_offset = offset + len(header)
+            members.append((header, offset, source, data_offset, info.size))
+            entry["files"][name] = [data_offset, info.size]
+            offset = data_offset + _padded(info.size)
+        ideas.append(entry)
+    # Two zero blocks end the archive, padded to a whole record as tar tools expect.
+    size = offset + 2 * tarfile.BLOCKSIZE
+    size = -(-size // tarfile.RECORDSIZE) * tarfile.RECORDSIZE
+
+    directory = os.path.dirname(os.path.abspath(archive_path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(archive_path)}."
+    )
+    try:
+        with os.fdopen(fd, "r+b") as file:
+            file.truncate(size)
+            with mmap.mmap(file.fileno(), size) as target:
+                for header, header_offset, source, data_offset, length in members:
+                    target[header_offset:data_offset] = header
+                    if not length:
+                        continue
+                    with open(source, "rb") as source_file:
+                        with mmap.mmap(
+                            source_file.fileno(), length, access=mmap.ACCESS_READ
+                        ) as data:
+                            target[data_offset : data_offset + length] = data
+                target.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    index = {"version": INDEX_VERSION, "archive_size": size, "ideas": ideas}
+    write_json(index_path(archive_path), index)
+    return index
+
+
+class IdeaArchive:
+    """A packed archive of ideas, memory-mapped for reading."""
+
+    def __init__(self, archive_path):
+        self.path = archive_path
+        self._file = open(archive_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self.index = self._load_index(size)
+        self._ideas = {entry["path"]: entry for entry in self.index["ideas"]}
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _load_index(self, size):
+        try:
+            with open(index_path(self.path), "r", encoding="utf-8") as file:
+                index = json.load(file)
+            if index.get("version") == INDEX_VERSION and index["archive_size"] == size:
+                return index
+        except (OSError, json.JSONDecodeError, KeyError):
+            pass
+        return self._scan(size)
+
+    def _scan(self, size):
+        """Rebuilds the index from the tar headers, reading no file data but the metadata."""
+        ideas = {}
+        self._file.seek(0)
+        with tarfile.open(fileobj=self._file, mode="r:") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                idea, name = posixpath.split(member.name)
+                entry = ideas.setdefault(
+                    idea, {"path": idea, "name": None, "files": {}}
+                )
+                entry["files"][name] = [member.offset_data, member.size]
+        for entry in ideas.values():
+            if METADATA_FILE in entry["files"]:
+                entry["name"] = json.loads(self._read(entry, METADATA_FILE)).get("name")
+        return {
+            "version": INDEX_VERSION,
+            "archive_size": size,
+            "ideas": sorted(ideas.values(), key=lambda entry: entry["path"]),
+        }
+
+    def _read(self, entry, name):
+        offset, size = entry["files"][name]
+        # Slicing the map copies only this file's bytes.
+        return self._map[offset : offset + size]
+
+    def ideas(self):
+        """Returns the ideas in the archive, each with its ``path``, ``name`` and ``files``."""
+        return list(self.index["ideas"])
+
+    def read(self, idea, name):
+        """
+        Returns the bytes of one file of an idea, read from the memory map.
+
+        Args:
+            idea (str): The idea's path relative to the packed output path.
+            name (str): The file name, e.g. ``metadata.json`` or ``cover.png``.
+
+        Raises:
+            KeyError: If the archive has no such idea or file.
+        """
+        return self._read(self._ideas[idea], name)
+
+    def metadata(self, idea):
+        """Returns the parsed ``metadata.json`` of an idea."""
+        return json.loads(self.read(idea, METADATA_FILE))
+
+    def extract(self, destination, patterns=None, names=None):
+        """
+        Extracts ideas to a directory.
+
+        Args:
+            destination (str): The output path to extract under.
+            patterns (list): Glob patterns an idea's path must match; all ideas if empty.
+            names (list): The file names to extract; all files if empty.
+
+        Returns:
+            int: The number of files extracted.
+
+        Raises:
+            ValueError: If an idea's path would be extracted outside ``destination``.
+        """
+        selected = [
+            entry
+            for entry in self.index["ideas"]
+            if not patterns
+            or any(fnmatch.fnmatch(entry["path"], pattern) for pattern in patterns)
+        ]
+        # Check every path before writing anything, so a bad archive extracts nothing.
+        for entry in selected:
+            parts = entry["path"].split("/")
+            if posixpath.isabs(entry["path"]) or ".." in parts:
+                raise ValueError(f"Unsafe idea path in archive: {entry['path']}")
+            for name in entry["files"]:
+                if "/" in name or name in ("", ".", ".."):
+                    raise ValueError(f"Unsafe file name in archive: {name}")
+
+        extracted = 0
+        for entry in selected:
+            dir_path = os.path.join(destination, *entry["path"].split("/"))
+            for name in entry["files"]:
+                if names and name not in names:
+                    continue
+                os.makedirs(dir_path, exist_ok=True)
+                write_bytes(os.path.join(dir_path, name), self._read(entry, name))
+                extracted += 1
+        return extracted
+
+
+def pack_main(argv=None):
+    """Runs the ``pack`` subcommand: packs the saved ideas into one archive."""
+    parser = argparse.ArgumentParser(
+        prog="ideation-cli pack",
+        description="Pack saved ideas into one tar archive with an index.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("archive", help="The archive to write, e.g. ideas.tar.")
+    parser.add_argument(
+        "--path", type=str, default="ideas", help="Directory where ideas are saved."
+    )
+    args = parser.parse_args(argv)
+
+    index = pack(args.path, args.archive)
+    files = sum(len(entry["files"]) for entry in index["ideas"])
+    print(
+        f"Packed {len(index['ideas'])} idea(s), {files} file(s), into {args.archive} "
+        f"({index['archive_size']} bytes)."
+    )
+
+
+def unpack_main(argv=None):
+    """Runs the ``unpack`` subcommand: lists, shows or extracts packed ideas."""
+    parser = argparse.ArgumentParser(
+        prog="ideation-cli unpack",
+        description="List, show or extract ideas from an archive made by `pack`.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("archive", help="The archive to read.")
+    parser.add_argument(
+        "--path", type=str, default="ideas", help="Directory to extract ideas to."
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the ideas instead of extracting."
+    )
+    parser.add_argument(
+        "--show",
+        metavar="IDEA",
+        help="Print the metadata of one idea instead of extracting.",
+    )
+    parser.add_argument(
+        "--idea",
+        action="append",
+        metavar="PATTERN",
+        help="Extract only ideas whose path matches this glob; may be repeated.",
+    )
+    parser.add_argument(
+        "--covers-only", action="store_true", help="Extract only the cover images."
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.archive):
+        print(f"Error: No archive at {args.archive}.")
+        return
+    with IdeaArchive(args.archive) as archive:
+        if args.list:
+            for entry in archive.ideas():
+                print(f"{entry['path']}  {entry['name'] or ''}")
+            return
+        if args.show:
+            try:
+                print(json.dumps(archive.metadata(args.show), indent=4))
+            except KeyError:
+                print(f"Error: No idea {args.show} in {args.archive}.")
+            return
+        # Extracted files are written in the background, with batched fsyncs.
+        WRITER.start()
+        try:
+            extracted = archive.extract(
+                args.path, args.idea, [COVER_FILE] if args.covers_only else None
+            )
+        except ValueError as err:
+            print(f"Error: {err}")
+            return
+        finally:
+            WRITER.close()
+    print(f"Extracted {extracted} file(s) to {args.path}.")
@@ -0,0 +1,307 @@
+"""
+budget.py - Run budget scheduling for the Ideation CLI.
+
+This module lets a run fit a wall-clock deadline (``--max-seconds``) and a
+spend cap (``--max-cost``). Per-stage latency and token usage are taken from
+the live statistics recorded by the model router, falling back to defaults
+until the first calls complete. Before each idea is started the budget picks
+the richest mode that still fits: the idea as requested, the idea without a
+cover image, or the idea on the cheapest model. Once not even that fits, the
+run stops and the ideas already in flight finish and are saved.
+
+An idea is priced by the calls the run's options make it take: its name
+and metadata, plus the chain steps of ``--ideation-technique`` chains, the
+critique rounds of ``round_robin`` and the turns of ``--agents``.
+
+Classes:
+    - RunBudget: Tracks elapsed time and spend and plans the next idea.
+
+Functions:
+    - estimate_cost(model, prompt_tokens, completion_tokens): Price a chat call in USD.
+    - idea_stages(args): The chat calls one idea makes per stage.
+
+Constants:
+    - MODEL_PRICING: USD per million prompt and completion tokens, per model.
+    - IMAGE_PRICING: USD per generated image, per image model.
+    - DEFAULT_STAGE_LATENCY: Seconds per call assumed before a stage has been measured.
+    - DEFAULT_STAGE_TOKENS: Prompt and completion tokens assumed before a stage has been measured.
+    - FULL, NO_IMAGE, CHEAP, STOP: The modes returned by `RunBudget.plan`.
+"""
+
+import math
+import time
+
+from ideation_cli.chains import MAX_BRANCH_WORKERS, chain_stages, leaves_per_chain
+from ideation_cli.generator import DEFAULT_REFINE_ROUNDS
+from ideation_cli.routing import ROUTER
+
+MODEL_PRICING = {
+    "o1-mini": (1.10, 4.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "o1-preview": (15.00, 60.00),
+    "o4-mini": (1.10, 4.40),
+}
+
+IMAGE_PRICING = {"dall-e-3": 0.04}
+
+DEFAULT_STAGE_LATENCY = {
+    "ideas": 6.0,
+    "refine": 8.0,
+    "agents": 8.0,
+    "name": 1.5,
+    "metadata": 6.0,
+    "image_prompt": 4.0,
+    "image": 15.0,
+    "rank": 3.0,
+}
+
+DEFAULT_STAGE_TOKENS = {
+    "ideas": (80, 300),
+    "refine": (450, 450),
+    "agents": (500, 500),
+    "name": (120, 10),
+    "metadata": (200, 300),
+    "image_prompt": (120, 250),
+    "rank": (60, 5),
+}
+
+# The model every stage is switched to when the budget only allows cheap ideas.
+CHEAP_MODEL = "gpt-4o-mini"
+
+IMAGE_STAGES = ["image_prompt", "image"]
+
+# Share of ideas assumed to need a second metadata call to repair missing fields.
+METADATA_REPAIR_RATE = 0.2
+
+# Agent turns per idea: three concurrent first turns, then the designer's revision.
+AGENT_TURNS = 4
+AGENT_SERIAL_TURNS = 2
+
+FULL = "full"
+NO_IMAGE = "no_image"
+CHEAP = "cheap"
+STOP = "stop"
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    Estimates the cost of a chat call in USD.
+
+    Args:
+        model (str): The chat model; unknown models are priced as gpt-4o.
+        prompt_tokens (int): Number of prompt tokens.
+        completion_tokens (int): Number of completion tokens.
+
+    Returns:
+        float: The estimated cost in USD.
+    """
+    prompt_price, completion_price = MODEL_PRICING.get(model, MODEL_PRICING["gpt-4o"])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+def idea_stages(args=None):
+    """
+    Returns the chat calls one idea makes per stage, for the run's options.
+
+    The calls of a technique chain are spread over the ideas one run of the
+    chain yields.
+
+    Args:
+        args: The parsed command-line arguments, or None for an idea that
+            only gets a name and metadata.
+
+    Returns:
+        dict: ``(calls, serial_calls)`` per stage, where every call is paid
+        for but only the serial calls, which wait for one another, add to
+        the idea's wall time.
+    """
+    stages = {}
+
+    def add(stage, calls, serial_calls):
+        previous_calls, previous_serial = stages.get(stage, (0, 0))
+        stages[stage] = (previous_calls + calls, previous_serial + serial_calls)
+
+    technique = getattr(args, "ideation_technique", None)
+    rounds = getattr(args, "rounds", DEFAULT_REFINE_ROUNDS)
+    chain = chain_stages(technique)
+    if chain:
+        leaves = leaves_per_chain(chain)
+        branches = 1
+        for step, count in chain:
+            branches *= count
+            stage, step_calls = (
+                ("refine", rounds) if step == "round_robin" else ("ideas", 1)
+            )
+            waves = math.ceil(branches / MAX_BRANCH_WORKERS)
+            add(stage, branches * step_calls / leaves, waves * step_calls / leaves)
+    elif technique == "round_robin":
+        add("refine", rounds, rounds)
+    if getattr(args, "agents", False):
+        add("agents", AGENT_TURNS, AGENT_SERIAL_TURNS)
+    if not getattr(args, "name", None):
+        add("name", 1, 1)
+    add("metadata", 1 + METADATA_REPAIR_RATE, 1 + METADATA_REPAIR_RATE)
+    return stages
+
+
+class RunBudget:
+    """Tracks a run's elapsed time and spend, and plans each idea to fit the limits."""
+
+    def __init__(
+        self, max_seconds=None, max_cost=None, router=ROUTER, clock=None, stages=None
+    ):
+        self.max_seconds = max_seconds
+        self.max_cost = max_cost
+        self.stages = stages if stages is not None else idea_stages()
+        self.router = router
+        self.clock = clock or time.monotonic
+        self.started = self.clock()
+
+    @property
+    def limited(self):
+        return self.max_seconds is not None or self.max_cost is not None
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def spent(self):
+        """Return the USD spent so far, from the router's recorded usage."""
+        total = 0.0
+        for stage, models in self.router.stats().items():
+            for model, stats in models.items():
+                if stage == "image":
+                    total += stats["calls"] * IMAGE_PRICING.get(model, 0.04)
+                else:
+                    total += estimate_cost(
+                        model, stats["prompt_tokens"], stats["completion_tokens"]
+                    )
+        return total
+
+    def predict_stage(self, stage, model):
+        """
+        Predicts the latency and cost of one call to a stage.
+
+        Measured averages for the stage are used once available; otherwise
+        the defaults are used. Token counts are priced for ``model`` so the
+        cost of switching to a cheaper model can be predicted too.
+
+        Returns:
+            tuple: The predicted latency in seconds and cost in USD.
+        """
+        measured = self.router.stats().get(stage, {})
+        calls = sum(stats["calls"] for stats in measured.values())
+        if calls:
+            latency = (
+                sum(
+                    stats["mean_latency"] * stats["calls"]
+                    for stats in measured.values()
+                )
+                / calls
+            )
+            prompt_tokens = sum(s["prompt_tokens"] for s in measured.values()) / calls
+            completion_tokens = (
+                sum(s["completion_tokens"] for s in measured.values()) / calls
+            )
+        else:
+            latency = DEFAULT_STAGE_LATENCY.get(stage, 5.0)
+            prompt_tokens, completion_tokens = DEFAULT_STAGE_TOKENS.get(stage, (0, 0))
+
+        if stage == "image":
+            return latency, IMAGE_PRICING.get(model, 0.04)
+        return latency, estimate_cost(model, prompt_tokens, completion_tokens)
+
+    def predict_idea(self, model, mode):
+        """Predicts the latency and cost of one idea generated in the given mode."""
+        stages = list(self.stages.items())
+        if mode == FULL:
+            stages += [(stage, (1, 1)) for stage in IMAGE_STAGES]
+        latency = cost = 0.0
+        for stage, (calls, serial_calls) in stages:
+            if stage == "image":
+                stage_model = "dall-e-3"
+            elif mode == CHEAP:
+                stage_model = CHEAP_MODEL
+            else:
+                stage_model = self.router.route(stage, model)
+            stage_latency, stage_cost = self.predict_stage(stage, stage_model)
+            latency += serial_calls * stage_latency
+            cost += calls * stage_cost
+        return latency, cost
+
+    def plan(self, remaining, in_flight, concurrency, model, image):
+        """
+        Chooses how to generate the next idea so the rest of the run fits the budget.
+
+        Args:
+            remaining (int): Ideas still to start, including this one.
+            in_flight (list): The modes of the ideas currently running.
+            concurrency (int): How many ideas run at once.
+            model (str): The run-level model (``--model``).
+            image (bool): Whether cover images were requested.
+
+        Returns:
+            str: One of FULL, NO_IMAGE, CHEAP or STOP.
+        """
+        preferred = FULL if image else NO_IMAGE
+        if not self.limited:
+            return preferred
+
+        time_left = math.inf
+        if self.max_seconds is not None:
+            time_left = self.max_seconds - self.elapsed()
+        cost_left = math.inf
+        if self.max_cost is not None:
+            reserved = sum(self.predict_idea(model, mode)[1] for mode in in_flight)
+            cost_left = self.max_cost - self.spent() - reserved
+        if time_left <= 0 or cost_left <= 0:
+            return STOP
+
+        waves = math.ceil(remaining / max(1, concurrency))
+        modes = [FULL, NO_IMAGE, CHEAP] if image else [NO_IMAGE, CHEAP]
+        for mode in modes:
+            latency, cost = self.predict_idea(model, mode)
+            if waves * latency <= time_left and remaining * cost <= cost_left:
+                return mode
+
+        # The rest of the run cannot fit; keep going with cheap ideas while one still fits.
+        latency, cost = self.predict_idea(model, CHEAP)
+        if latency <= time_left and cost <= cost_left:
+            return CHEAP
+        return STOP
+
+    def affordable_covers(self, wanted, concurrency, model):
+        """
+        Returns how many of the wanted cover images still fit in the budget.
+
+        Args:
+            wanted (int): The number of covers requested.
+            concurrency (int): How many covers are rendered at once.
+            model (str): The run-level model (``--model``).
+
+        Returns:
+            int: The number of covers to render, at most ``wanted``.
+        """
+        if not self.limited:
+            return wanted
+        latency = cost = 0.0
+        for stage in IMAGE_STAGES:
+            stage_model = (
+                "dall-e-3" if stage == "image" else self.router.route(stage, model)
+            )
+            stage_latency, stage_cost = self.predict_stage(stage, stage_model)
+            latency += stage_latency
+            cost += stage_cost
+
+        affordable = wanted
+        if self.max_cost is not None:
+            affordable = min(affordable, int((self.max_cost - self.spent()) // cost))
+        if self.max_seconds is not None:
+            waves = int((self.max_seconds - self.elapsed()) // latency)
+            affordable = min(affordable, waves * max(1, concurrency))
+        return max(0, affordable)
+
+    def summary(self):
+        """Return a one-line summary of the time and money spent."""
+        return f"Elapsed {self.elapsed():.1f}s, spent ${self.spent():.4f}"
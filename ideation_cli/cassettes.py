@@ -0,0 +1,164 @@
+"""
+cassettes.py - Record and replay API traffic for offline benchmarks.
+
+With ``--record DIR`` every chat completion, image generation and image
+download made by the generator is saved to a cassette in ``DIR`` together
+with its observed latency. With ``--replay DIR`` the same calls are served
+from the cassette instead, with no network access or API key, so scheduler,
+cache and I/O changes can be benchmarked against realistic traffic.
+
+A call is matched to a recording by a hash of its request. Identical
+requests recorded more than once are replayed in the order they were
+recorded. A request with no exact match (for example a randomized prompt)
+is served the next recording of the same kind and model, so a replayed
+run always completes. ``--replay-latency SCALE`` sleeps for each recorded
+latency multiplied by ``SCALE``, reproducing the recorded latency
+distribution; the default of 0 replays as fast as possible.
+
+Recordings are appended to one JSON Lines file per kind of call
+(``chat.jsonl``, ``image.jsonl``, ``download.jsonl`` and ``embedding.jsonl``).
+
+Classes:
+    - Cassette: The recorder and player.
+
+Constants:
+    - CASSETTE: The process-wide cassette used by the generator.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+KINDS = ["chat", "image", "download", "embedding"]
+
+
+def request_key(kind, request):
+    """Returns the hash identifying a request."""
+    payload = json.dumps([kind, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode(kind, response):
+    # Downloads are bytes; everything else is already JSON.
+    return (
+        base64.b64encode(response).decode("ascii") if kind == "download" else response
+    )
+
+
+def _decode(kind, response):
+    return base64.b64decode(response) if kind == "download" else response
+
+
+class Cassette:
+    """Records API calls to a directory, or replays them from one."""
+
+    def __init__(self, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self.sleep = sleep
+        self.configure()
+
+    def configure(self, record=None, replay=None, latency_scale=0.0):
+        """
+        Sets the cassette mode; with neither directory, calls pass straight through.
+
+        Args:
+            record (str): Directory to record calls to.
+            replay (str): Directory to replay calls from.
+            latency_scale (float): Multiplier for replayed latencies.
+
+        Raises:
+            ValueError: If both directories are given, or the replay directory holds no recordings.
+        """
+        if record and replay:
+            raise ValueError("--record and --replay cannot be used together.")
+        with self._lock:
+            self.directory = record or replay
+            self.mode = "record" if record else "replay" if replay else None
+            self.latency_scale = latency_scale
+            self._exact = {}
+            self._by_model = {}
+            # Position of the next recording to serve from each list.
+            self._positions = {}
+            self.misses = 0
+            if record:
+                os.makedirs(record, exist_ok=True)
+            if replay:
+                self._load(replay)
+
+    def _load(self, directory):
+        loaded = 0
+        for kind in KINDS:
+            try:
+                with open(
+                    os.path.join(directory, f"{kind}.jsonl"), encoding="utf-8"
+                ) as file:
+                    for line in file:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        self._exact.setdefault((kind, entry["key"]), []).append(entry)
+                        self._by_model.setdefault((kind, entry["model"]), []).append(
+                            entry
+                        )
+                        loaded += 1
+            except FileNotFoundError:
+                continue
+        if not loaded:
+            raise ValueError(f"No recordings found in {directory}.")
+
+    def _next(self, entries):
+        position = self._positions.get(id(entries), 0)
+        self._positions[id(entries)] = position + 1
+        return entries[position % len(entries)]
+
+    def play(self, kind, model, request, call):
+        """
+        Makes a call through the cassette.
+
+        Args:
+            kind (str): ``chat``, ``image``, ``download`` or ``embedding``.
+            model (str): The model of the call, used to match inexact replays.
+            request (dict): The JSON-serialisable request that identifies the call.
+            call (callable): Makes the real call and returns its JSON-serialisable
+                result (bytes for downloads).
+
+        Returns:
+            The result of ``call``, or its recorded result when replaying.
+        """
+        if self.mode is None:
+            return call()
+        key = request_key(kind, request)
+
+        if self.mode == "replay":
+            with self._lock:
+                entries = self._exact.get((kind, key))
+                if not entries:
+                    self.misses += 1
+                    entries = self._by_model.get((kind, model))
+                if not entries:
+                    raise LookupError(f"No recorded {kind} call for model {model}.")
+                entry = self._next(entries)
+            if self.latency_scale:
+                self.sleep(entry["latency"] * self.latency_scale)
+            return _decode(kind, entry["response"])
+
+        started = time.monotonic()
+        response = call()
+        entry = {
+            "key": key,
+            "model": model,
+            "latency": round(time.monotonic() - started, 4),
+            "response": _encode(kind, response),
+        }
+        with self._lock:
+            with open(
+                os.path.join(self.directory, f"{kind}.jsonl"), "a", encoding="utf-8"
+            ) as file:
+                file.write(json.dumps(entry) + "\n")
+        return response
+
+
+CASSETTE = Cassette()
@@ -0,0 +1,290 @@
+"""
+chains.py - Chained ideation techniques for the Ideation CLI.
+
+``--ideation-technique`` accepts a comma-separated chain of techniques, e.g.
+``scamper,opposite_thinking,crazy_eights*8``. Each stage asks the model to
+apply its technique to the output of the previous stage, so the ideas are
+developed step by step. A stage written ``technique*N`` fans out into N
+variants, generated concurrently, and every later stage runs once per
+branch. The final outputs (the leaves) become the tasks of the run's ideas,
+one per idea: an idea drafted with the same settings takes the next unused
+leaf before a new chain is run.
+
+Every step's output is kept in ``.chains.json`` under the output path,
+keyed by the model, the technique, its input and the branch. Extending a
+chain, or running it again, reuses the stages it shares with earlier runs
+instead of recomputing them. Unused leaves are kept there as well, and once
+a chain's leaves are used up it is run afresh from its first stage.
+
+A single technique without fan-out is not a chain: its prompt template is
+applied to the task locally, without a call.
+
+Classes:
+    - TechniqueChains: The step cache, the leaf pool and the chain runner.
+
+Functions:
+    - parse_technique_chain(value): Parse a technique chain into its stages.
+    - technique_chain(value): Validate and normalise an ``--ideation-technique`` option.
+    - format_technique_chain(stages): Format stages as a technique chain.
+    - chain_stages(value): The stages of an option value, or None if it is not a chain.
+
+Constants:
+    - CHAINS_FILENAME: The cache file name inside the output path.
+    - MAX_BRANCH_WORKERS: The most steps of a stage generated at the same time.
+    - CHAINS: The process-wide chains used by the CLI.
+"""
+
+import argparse
+import contextvars
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import IDEATION_TECHNIQUES
+from .routing import ROUTER
+from .writer import write_json
+
+CHAINS_FILENAME = ".chains.json"
+
+MAX_BRANCH_WORKERS = 8
+
+# The options that must match for an idea to take a leaf of an earlier chain.
+SETTINGS = ["model", "ideation_technique", "randomize", "theme", "game_type"]
+
+
+def parse_technique_chain(value):
+    """
+    Parses a technique chain such as ``scamper,crazy_eights*8``.
+
+    Args:
+        value (str): The comma-separated techniques, each optionally
+            followed by ``*N`` to fan out into N branches.
+
+    Returns:
+        list: ``(technique, branches)`` pairs, in order.
+
+    Raises:
+        argparse.ArgumentTypeError: If a technique is unknown or a branch count is not a positive integer.
+    """
+    stages = []
+    for part in value.split(","):
+        technique, sep, count = part.partition("*")
+        technique = technique.strip()
+        if technique not in IDEATION_TECHNIQUES:
+            raise argparse.ArgumentTypeError(
+                f"unknown technique '{technique}', choose from {', '.join(IDEATION_TECHNIQUES)}"
+            )
+        branches = 1
+        if sep:
+            try:
+                branches = int(count)
+            except ValueError:
+                branches = 0
+            if branches < 1:
+                raise argparse.ArgumentTypeError(
+                    f"expected TECHNIQUE*N with a positive N, got '{part.strip()}'"
+                )
+        stages.append((technique, branches))
+    return stages
+
+
+def format_technique_chain(stages):
+    """Formats ``(technique, branches)`` pairs as a technique chain."""
+    return ",".join(
+        technique if branches == 1 else f"{technique}*{branches}"
+        for technique, branches in stages
+    )
+
+
+def technique_chain(value):
+    """Validates an ``--ideation-technique`` option and returns it normalised."""
+    return format_technique_chain(parse_technique_chain(value))
+
+
+def chain_stages(value):
+    """
+    Returns the stages of an ``--ideation-technique`` value that is a chain.
+
+    Returns:
+        list: The ``(technique, branches)`` pairs, or None for no technique
+        or a single technique without fan-out.
+    """
+    if not value:
+        return None
+    stages = parse_technique_chain(value)
+    if len(stages) == 1 and stages[0][1] == 1:
+        return None
+    return stages
+
+
+def leaves_per_chain(stages):
+    """Returns the number of leaves, and so of ideas, one run of a chain yields."""
+    leaves = 1
+    for _, branches in stages:
+        leaves *= branches
+    return leaves
+
+
+def settings_key(args):
+    """Returns a key for the settings that leaves can be shared between."""
+    # Leaves are keyed on the model that grows them, not the run-level one.
+    settings = [
+        (
+            ROUTER.route("ideas", args.model)
+            if setting == "model"
+            else getattr(args, setting, None)
+        )
+        for setting in SETTINGS
+    ]
+    # Ideas with a fixed task only share leaves grown from that task.
+    if not getattr(args, "randomize", False):
+        settings.append(getattr(args, "task", None))
+    return json.dumps(settings)
+
+
+def _step_key(model, technique, artifact, variant):
+    payload = json.dumps([model, technique, artifact, variant])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TechniqueChains:
+    """Runs technique chains, caching every step and pooling the unused leaves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.configure(None)
+
+    def configure(self, path):
+        """Point the cache at a file; ``path=None`` keeps it in memory only."""
+        with self._lock:
+            self.path = path
+            self._data = None
+
+    def _load(self):
+        if self._data is None:
+            self._data = {"steps": {}, "rounds": {}, "pending": {}}
+            if self.path:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as file:
+                        self._data.update(json.load(file))
+                except (FileNotFoundError, json.JSONDecodeError):
+                    pass
+        return self._data
+
+    def _save(self):
+        if self.path:
+            write_json(self.path, self._data)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def take(self, args, stages, resolve, step):
+        """
+        Returns the next leaf for an idea, running the chain when none is left.
+
+        Concurrent ideas with the same settings wait for a chain that is
+        running and then take its other leaves.
+
+        Args:
+            args: The idea's arguments.
+            stages (list): The ``(technique, branches)`` pairs of the chain.
+            resolve (callable): Returns the root ``(task, game_type)`` of a new chain.
+            step (callable): Generates one step, given the technique, its input
+                and the model.
+
+        Returns:
+            dict: The leaf's ``task``, ``game_type`` and ``steps`` (the
+            technique and output of each stage leading to it), or None when
+            ``resolve`` gave no task.
+        """
+        key = settings_key(args)
+        with self._key_lock(key):
+            with self._lock:
+                pending = self._load()["pending"].get(key)
+                if pending:
+                    leaf = pending.pop(0)
+                    self._save()
+                    return leaf
+
+            task, game_type = resolve()
+            if not task:
+                return None
+            with self._lock:
+                rounds = self._load()["rounds"]
+                chain_round = rounds.get(key, 0)
+                rounds[key] = chain_round + 1
+            leaves = [
+                dict(leaf, game_type=game_type)
+                for leaf in self.expand(task, stages, args.model, step, chain_round)
+            ]
+            with self._lock:
+                self._load()["pending"][key] = leaves[1:]
+                self._save()
+            return leaves[0]
+
+    def expand(self, task, stages, model, step, chain_round=0):
+        """
+        Runs a chain on a task, generating the branches of each stage concurrently.
+
+        Args:
+            task (str): The task the first stage is applied to.
+            stages (list): The ``(technique, branches)`` pairs of the chain.
+            model (str): The run-level model.
+            step (callable): Generates one step, given the technique, its input
+                and the model.
+            chain_round (int): How many times the chain ran on these settings
+                before; a new round starts again from a fresh first stage.
+
+        Returns:
+            list: The leaves, each with its ``task`` and ``steps``.
+        """
+        branches = [{"task": task, "steps": []}]
+        for depth, (technique, count) in enumerate(stages):
+            jobs = [(branch, index) for branch in branches for index in range(count)]
+
+            def run(job, depth=depth, technique=technique):
+                branch, index = job
+                # Only the first stage differs between rounds; later stages follow from it.
+                variant = f"{chain_round}.{index}" if depth == 0 else str(index)
+                return self._step(technique, branch["task"], model, variant, step)
+
+            # Steps run in copies of this context, so a model pinned for the idea applies to them.
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_BRANCH_WORKERS, len(jobs))
+            ) as executor:
+                outputs = list(
+                    executor.map(lambda job: context.copy().run(run, job), jobs)
+                )
+            branches = [
+                {
+                    "task": output,
+                    "steps": branch["steps"]
+                    + [{"technique": technique, "output": output}],
+                }
+                for (branch, _), output in zip(jobs, outputs)
+            ]
+        return branches
+
+    def _step(self, technique, artifact, model, variant, step):
+        # Key on the model the step actually runs on: a routed or pinned one.
+        key = _step_key(ROUTER.route("ideas", model), technique, artifact, variant)
+        with self._lock:
+            cached = self._load()["steps"].get(key)
+        if cached is not None:
+            return cached
+        output = step(technique, artifact, model)
+        with self._lock:
+            self._load()["steps"][key] = output
+        return output
+
+    def pending(self, args):
+        """Returns the number of unused leaves for an idea's settings."""
+        with self._lock:
+            return len(self._load()["pending"].get(settings_key(args), []))
+
+
+CHAINS = TechniqueChains()
@@ -4,21 +4,67 @@ cli.py - Command-Line Interface for the Ideation CLI.
 This module provides the main entry point for the Ideation CLI, allowing users
 to generate game ideas, apply creative ideation techniques, and produce branding
 assets. The CLI supports both interactive mode and argument-based execution.
+
+Subcommands such as ``serve`` are listed in ``COMMANDS`` and dispatched to the
+module implementing them, so their imports are only paid when they are used.
 """
 
-import json
+import argparse
+import copy
+import importlib
 import os
-from datetime import datetime
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from ideation_cli import MODEL_CHOICES
+from ideation_cli.agents import AGENTS
+from ideation_cli.budget import (
+    CHEAP,
+    CHEAP_MODEL,
+    FULL,
+    STOP,
+    RunBudget,
+    idea_stages,
+)
+from ideation_cli.cassettes import CASSETTE
+from ideation_cli.chains import (
+    CHAINS,
+    CHAINS_FILENAME,
+    chain_stages,
+    format_technique_chain,
+)
+from ideation_cli.covers import COVER_STORE, STORE_DIRNAME
+from ideation_cli.dashboard import DASHBOARD
+from ideation_cli.endpoints import ENDPOINT_POOL, load_endpoints
 from ideation_cli.generator import (
+    DEFAULT_REFINE_ROUNDS,
     generate_metadata,
     generate_name,
     generate_cover,
+    generate_agent_turn,
     generate_ideas,
+    refine_idea,
+    use_http_client,
+    warm_client,
 )
+from ideation_cli.layout import make_idea_dir
+from ideation_cli.metrics import DEFAULT_INTERVAL, METRICS
+from ideation_cli.planner import build_plan, print_plan
+from ideation_cli.profiling import PROFILER
+from ideation_cli.ranking import rank_ideas
+from ideation_cli.reservoir import RESERVOIR, RESERVOIR_FILENAME
+from ideation_cli.routing import ROUTER
+from ideation_cli.sampler import HISTORY_FILENAME, SAMPLER, saturated_game_types
 from ideation_cli.strategies import (
     generate_random_game_prompt,
     apply_ideation_technique,
+    apply_oblique_strategy,
+)
+from ideation_cli.transport import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    TRANSPORT,
 )
 from ideation_cli.utils import (
     parse_arguments,
@@ -26,17 +72,79 @@ from ideation_cli.utils import (
     save_args_to_json,
     create_game_id,
 )
+from ideation_cli.writer import WRITER
+
+# Subcommands, mapped to the ``module:function`` that runs them with the remaining arguments.
+COMMANDS = {
+    "serve": "ideation_cli.server:main",
+    "enqueue": "ideation_cli.jobqueue:enqueue_main",
+    "worker": "ideation_cli.jobqueue:worker_main",
+    "similar": "ideation_cli.embeddings:similar_main",
+    "pack": "ideation_cli.archive:pack_main",
+    "unpack": "ideation_cli.archive:unpack_main",
+    "migrate": "ideation_cli.layout:migrate_main",
+    "gallery": "ideation_cli.gallery:gallery_main",
+    "clusters": "ideation_cli.clusters:clusters_main",
+}
 
 
-def process_game_iteration(args) -> None:
-    """Processes a single game iteration based on the provided arguments."""
-    # Determine the task and game type.
+def render_cover(task: str, name: str, dir_path: str) -> dict:
+    """Generates the cover image for an idea and returns its cover info."""
+    cover_image_path, cover_prompt = generate_cover(task, name, dir_path)
+    return {"image_path": cover_image_path, "image_prompt": cover_prompt}
+
+
+def resolve_task(args):
+    """Returns the task and game type of an idea, drawing them at random if requested."""
     if args.randomize:
         _task, _game_type = generate_random_game_prompt(args.game_type, args.theme)
         print(f"Prompt: {_task}")
+        return _task, _game_type
+    return args.task, args.game_type
+
+
+def run_chain_step(
+    technique: str, artifact: str, model: str, rounds: int = DEFAULT_REFINE_ROUNDS
+) -> str:
+    """Applies one technique of a chain to the previous stage's output."""
+    if technique == "round_robin":
+        refined, _ = refine_idea(artifact, model, rounds)
+        return refined
+    if technique == "oblique_strategy":
+        artifact, _ = apply_oblique_strategy(artifact)
+    return generate_ideas(artifact, technique, model)
+
+
+def draft_idea(args):
+    """Resolves the task of an idea and generates its name and metadata.
+
+    With a technique chain the task is the next unused leaf of the chain.
+
+    Returns:
+        dict: The ``task``, ``game_type``, ``name`` and ``metadata`` of the idea,
+        with the ``chain`` steps leading to the task when a chain was run and
+        the ``agents`` transcript with ``--agents``, or None if no task was
+        provided.
+    """
+    stages = chain_stages(args.ideation_technique)
+    rounds = getattr(args, "rounds", DEFAULT_REFINE_ROUNDS)
+    chain = None
+    refinement = None
+    transcript = None
+    if stages:
+        leaf = CHAINS.take(
+            args,
+            stages,
+            lambda: resolve_task(args),
+            lambda technique, artifact, model: run_chain_step(
+                technique, artifact, model, rounds
+            ),
+        )
+        _task, _game_type = (leaf["task"], leaf["game_type"]) if leaf else (None, None)
+        chain = leaf["steps"] if leaf else None
     else:
-        _task = args.task
-        _game_type = args.game_type
+        # Determine the task and game type.
+        _task, _game_type = resolve_task(args)
 
     # If no task was provided, skip this iteration.
     if not _task:
@@ -44,10 +152,20 @@ def process_game_iteration(args) -> None:
         return
 
     # Apply ideation technique if specified.
-    if args.ideation_technique:
+    if stages:
+        print(f"New task with technique chain: {format_technique_chain(stages)}")
+    elif args.ideation_technique == "round_robin":
+        _task, refinement = refine_idea(_task, args.model, rounds)
+        print(f"Refined the task over {len(refinement)} round(s) of critique.")
+    elif args.ideation_technique:
         _task, strategy = apply_ideation_technique(_task, args.ideation_technique)
         print(f"New task with ideation technique: {strategy}")
 
+    # Let the designer, critic and marketer agents develop the task.
+    if getattr(args, "agents", False):
+        _task, transcript = AGENTS.work(_task, args.model, generate_agent_turn)
+        print(f"Developed the task over {len(transcript)} agent turn(s).")
+
     # Generate a name if none was provided.
     if not args.name:
         _name = generate_name(_task, args.model, args.temperature, args.top_p).strip()
@@ -55,31 +173,59 @@ def process_game_iteration(args) -> None:
     else:
         _name = args.name
 
-    # Create a unique game ID using the name and the current timestamp.
-    base_game_id = create_game_id(_name)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    game_id = f"{base_game_id}_{timestamp}"
-    safe_game_id = game_id.replace("Title:", "").replace('"', "").replace(" ", "_")
-    game_dir = _game_type.replace(" ", "") if _game_type else "default"
-    dir_path = os.path.join(args.path, game_dir, safe_game_id)
-    os.makedirs(dir_path, exist_ok=True)
-
-    # Generate metadata and attempt to parse it as JSON.
-    metadata = generate_metadata(_task, _name, args.model)
-    if isinstance(metadata, str):
-        try:
-            metadata_json = json.loads(metadata)
-        except json.JSONDecodeError as e:
-            print(f"Error: Invalid JSON in metadata: {e}")
-            metadata_json = metadata
+    # Generate the metadata; it is always returned as a validated dictionary.
+    metadata_json = generate_metadata(_task, _name, args.model)
+    draft = {
+        "task": _task,
+        "game_type": _game_type,
+        "name": _name,
+        "metadata": metadata_json,
+    }
+    if chain is not None:
+        draft["chain"] = chain
+    if refinement is not None:
+        draft["refinement"] = refinement
+    if transcript is not None:
+        draft["agents"] = transcript
+    return draft
+
+
+def process_game_iteration(args):
+    """Processes a single game iteration based on the provided arguments.
+
+    Ideas prefetched for the same settings are used before generating new ones.
+
+    Returns:
+        tuple: The idea directory and the saved output, or None if the iteration was skipped.
+    """
+    draft = RESERVOIR.take(args)
+    if RESERVOIR.enabled:
+        METRICS.inc(
+            "ideation_cache_requests_total",
+            cache="reservoir",
+            outcome="miss" if draft is None else "hit",
+        )
+    if draft is not None:
+        print(f"Using prefetched idea: {draft['name']}")
     else:
-        metadata_json = metadata
+        draft = draft_idea(args)
+    if draft is None:
+        return
+    _task, _game_type, _name = draft["task"], draft["game_type"], draft["name"]
+    metadata_json = draft["metadata"]
+
+    # Create a unique game ID using the name and the current timestamp.
+    dir_path, game_id = make_idea_dir(
+        args.path,
+        _game_type,
+        create_game_id(_name),
+        getattr(args, "layout", "flat"),
+    )
 
     # Generate a cover image if requested.
     cover_info = None
     if args.image:
-        cover_image_path, cover_prompt = generate_cover(_task, _name, dir_path)
-        cover_info = {"image_path": cover_image_path, "image_prompt": cover_prompt}
+        cover_info = render_cover(_task, _name, dir_path)
 
     # Build the output dictionary and save it.
     output = {
@@ -95,23 +241,340 @@ def process_game_iteration(args) -> None:
         "game_id": game_id,
         "branding_data": metadata_json,
     }
+    for key in ("chain", "refinement", "agents"):
+        if draft.get(key):
+            output[key] = draft[key]
 
     save_args_to_json(output, dir_path)
+    return dir_path, output
+
+
+def configure_routing(args) -> None:
+    """Applies the --stage-model and --stage-slo options to the model router."""
+    stage_models = {}
+    for stage, model in getattr(args, "stage_model", None) or []:
+        if model not in MODEL_CHOICES:
+            print(f"Not a valid model for stage '{stage}': {model}. Ignoring.")
+            continue
+        stage_models[stage] = model
+    stage_slos = {}
+    for stage, seconds in getattr(args, "stage_slo", None) or []:
+        try:
+            stage_slos[stage] = float(seconds)
+        except ValueError:
+            print(f"Not a valid SLO for stage '{stage}': {seconds}. Ignoring.")
+    ROUTER.configure(stage_models, stage_slos)
+
+
+def configure_transport(args) -> None:
+    """Sizes the shared HTTP client for the run's concurrency and applies its options."""
+    use_http_client(
+        TRANSPORT.configure(
+            concurrency=getattr(args, "concurrency", 1),
+            http2=not getattr(args, "no_http2", False),
+            connect_timeout=getattr(args, "connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            read_timeout=getattr(args, "read_timeout", DEFAULT_READ_TIMEOUT),
+        )
+    )
+
+
+def configure_endpoints(args) -> None:
+    """Loads the --endpoints pool onto the shared HTTP client, or clears it."""
+    path = getattr(args, "endpoints", None)
+    ENDPOINT_POOL.configure(load_endpoints(path, TRANSPORT.client) if path else [])
+
+
+def configure_cassette(args) -> None:
+    """Applies the --record, --replay and --replay-latency options."""
+    CASSETTE.configure(
+        record=getattr(args, "record", None),
+        replay=getattr(args, "replay", None),
+        latency_scale=getattr(args, "replay_latency", 0.0),
+    )
+
+
+def process_cheap_iteration(args):
+    """Processes a single game iteration with every stage on the cheapest model."""
+    with ROUTER.pinned(CHEAP_MODEL):
+        return process_game_iteration(args)
+
+
+def run_iterations(args, budget=None, on_result=None) -> list:
+    """Runs ``args.count`` iterations concurrently within the run budget.
+
+    Before each idea is started the budget decides whether it is generated as
+    requested, without its cover image, on the cheapest model, or not at all.
+    Ideas already running when the budget runs out are allowed to finish so
+    every completed idea is saved. ``on_result`` is called with each result
+    as soon as its idea completes.
+
+    Returns:
+        list: The ``(dir_path, output)`` results of the completed iterations.
+    """
+    budget = budget or RunBudget(
+        args.max_seconds, args.max_cost, stages=idea_stages(args)
+    )
+    concurrency = max(1, args.concurrency)
+    completed = 0
+    results = []
+    submitted = 0
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while submitted < args.count or in_flight:
+            while submitted < args.count and len(in_flight) < concurrency:
+                mode = budget.plan(
+                    args.count - submitted,
+                    list(in_flight.values()),
+                    concurrency,
+                    args.model,
+                    args.image,
+                )
+                if mode == STOP:
+                    print(
+                        f"Budget exhausted, skipping {args.count - submitted} remaining idea(s)."
+                    )
+                    submitted = args.count
+                    break
+                iteration_args = copy.copy(args)
+                if args.image and mode != FULL:
+                    print("Budget is tight, skipping the cover image.")
+                    iteration_args.image = False
+                iteration = process_game_iteration
+                if mode == CHEAP:
+                    print(f"Budget is tight, using {CHEAP_MODEL} for this idea.")
+                    iteration = process_cheap_iteration
+                future = executor.submit(PROFILER.call, iteration, iteration_args)
+                in_flight[future] = mode
+                submitted += 1
+                METRICS.inc("ideation_ideas_in_flight")
+
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                del in_flight[future]
+                METRICS.inc("ideation_ideas_in_flight", -1)
+                METRICS.set("ideation_last_idea_timestamp_seconds", time.time())
+                try:
+                    result = future.result()
+                    completed += 1
+                except Exception as err:
+                    METRICS.inc("ideation_ideas_total", outcome="error")
+                    print(f"Error: Idea generation failed: {err}")
+                    continue
+                METRICS.inc(
+                    "ideation_ideas_total",
+                    outcome="skipped" if result is None else "ok",
+                )
+                if result is not None:
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+
+    if budget.limited:
+        print(f"Completed {completed} of {args.count} idea(s). {budget.summary()}")
+    return results
+
+
+def run_two_phase(args) -> list:
+    """Generates text for every idea, then renders covers only for the best ``--top-k``.
+
+    Phase one runs all iterations without cover images. The ideas are then
+    ranked, and phase two renders the covers of the top ideas in parallel,
+    as many as the run budget still allows. Every idea's saved output is
+    updated with its rank.
+
+    Returns:
+        list: The ``(dir_path, output)`` results, best first.
+    """
+    budget = RunBudget(args.max_seconds, args.max_cost, stages=idea_stages(args))
+    text_args = copy.copy(args)
+    text_args.image = False
+    results = run_iterations(text_args, budget)
+    if not results:
+        return results
+
+    order, scores = rank_ideas([output for _, output in results], args.rank, args.model)
+    ranked = [results[index] for index in order]
+    for position, index in enumerate(order, start=1):
+        results[index][1]["rank"] = {
+            "position": position,
+            "score": round(scores[index], 3),
+            "method": args.rank,
+        }
+
+    concurrency = max(1, args.concurrency)
+    top_k = budget.affordable_covers(
+        min(args.top_k, len(ranked)), concurrency, args.model
+    )
+    if top_k < min(args.top_k, len(ranked)):
+        print(f"Budget is tight, rendering covers for the top {top_k} idea(s) only.")
+    print(f"Rendering covers for the top {top_k} of {len(ranked)} idea(s)...")
+
+    def finish(position, dir_path, output):
+        if position < top_k:
+            output["cover"] = render_cover(output["task"], output["name"], dir_path)
+        save_args_to_json(output, dir_path)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(finish, position, dir_path, output)
+            for position, (dir_path, output) in enumerate(ranked)
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as err:
+                print(f"Error: Cover generation failed: {err}")
+    return ranked
+
+
+def configure_cover_store(args) -> None:
+    """Points the cover image store at the output path and applies its options."""
+    COVER_STORE.configure(
+        os.path.join(args.path, STORE_DIRNAME),
+        max_bytes=args.cover_cache_mb * 1024 * 1024,
+        fresh=args.fresh_images,
+    )
+
+
+def run_command(name, argv):
+    """Runs the subcommand ``name`` with its own command-line arguments."""
+    module_name, function_name = COMMANDS[name].split(":")
+    command = getattr(importlib.import_module(module_name), function_name)
+    return command(argv)
+
+
+def configure_chains(args) -> None:
+    """Points the technique chain cache at the output path."""
+    CHAINS.configure(os.path.join(args.path, CHAINS_FILENAME))
+
+
+def configure_agents(args) -> None:
+    """Applies the --agent-concurrency and --agent-max-tokens options to the agent team."""
+    AGENTS.configure(
+        concurrency=getattr(args, "agent_concurrency", AGENTS.concurrency),
+        max_tokens=getattr(args, "agent_max_tokens", AGENTS.max_tokens),
+    )
+
+
+def configure_sampler(args) -> None:
+    """Seeds the random prompt sampler and points its history at the output path."""
+    avoid = []
+    if getattr(args, "avoid_saturated", False):
+        avoid = saturated_game_types(args.path)
+        if avoid:
+            print(f"Avoiding saturated game types: {', '.join(avoid)}")
+        else:
+            print("No saturated game types found; run `ideation-cli clusters` first.")
+    SAMPLER.configure(
+        seed=getattr(args, "seed", None),
+        history_path=os.path.join(args.path, HISTORY_FILENAME),
+        avoid=avoid,
+    )
+
+
+def configure_metrics(args) -> None:
+    """Starts the --metrics-port and --metrics-file exporters, if requested."""
+    port = getattr(args, "metrics_port", None)
+    textfile = getattr(args, "metrics_file", None)
+    if port is None and not textfile:
+        return
+    address = METRICS.start(
+        port=port,
+        textfile=textfile,
+        interval=getattr(args, "metrics_interval", DEFAULT_INTERVAL),
+    )
+    if address is not None:
+        print(f"Serving metrics on http://{address[0]}:{address[1]}/metrics")
+
+
+def configure_dashboard(args) -> None:
+    """Starts the --dashboard progress view, if requested."""
+    if getattr(args, "dashboard", False):
+        DASHBOARD.start(args.count, interval=getattr(args, "dashboard_interval", None))
 
 
 def cli():
     """Command-line interface for ideation techniques."""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return run_command(sys.argv[1], sys.argv[2:])
+
     args = parse_arguments()
+    if getattr(args, "profile", None):
+        PROFILER.configure(args.profile, args.profile_top)
+        PROFILER.start()
+        try:
+            return run_cli(args)
+        finally:
+            PROFILER.stop()
+    return run_cli(args)
+
+
+def run_cli(args):
+    """Runs the ideation techniques for parsed command-line arguments."""
+    configure_routing(args)
+    configure_transport(args)
+    configure_endpoints(args)
+    try:
+        configure_cassette(args)
+    except ValueError as err:
+        print(f"Error: {err}")
+        return
 
     # If interactive mode is selected, gather interactive parameters.
     if args.interactive:
-        interactive_params = use_interactive_mode()  # returns a dict with all options
+        # Prefetched ideas are kept in memory until the output path is answered.
+        RESERVOIR.configure(None)
+
+        def prefetch(settings):
+            # Prefetch random ideas for the answered settings while the other questions are on screen.
+            if not args.prefetch:
+                return
+            likely_args = copy.copy(args)
+            vars(likely_args).update(settings)
+            RESERVOIR.start(likely_args, draft_idea, args.prefetch, warm=warm_client)
+
+        # Returns a dict with all options.
+        interactive_params = use_interactive_mode(on_settings=prefetch)
+        RESERVOIR.stop()
         args_dict = vars(args)
         args_dict.update(interactive_params)
-        args = type("Args", (), args_dict)
+        args = argparse.Namespace(**args_dict)
+        if args.prefetch:
+            RESERVOIR.configure(
+                os.path.join(args.path, RESERVOIR_FILENAME), keep_prefetched=True
+            )
+
+    configure_cover_store(args)
+    configure_chains(args)
+    configure_agents(args)
+
+    if args.plan:
+        print_plan(build_plan(args), args)
+        return
+
+    configure_sampler(args)
+    configure_metrics(args)
 
-    for _ in range(args.count):
-        process_game_iteration(args)
+    # Files are written in the background; closing the writer drains its queue.
+    WRITER.start()
+    configure_dashboard(args)
+    try:
+        if args.image and args.top_k:
+            run_two_phase(args)
+        else:
+            run_iterations(args)
+        DASHBOARD.stop()
+        if TRANSPORT.stats()["requests"]:
+            print(TRANSPORT.summary())
+    finally:
+        DASHBOARD.stop()
+        # Let an idea still being prefetched finish so it is kept for the next session.
+        RESERVOIR.close()
+        WRITER.close()
+        METRICS.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,424 @@
+"""
+clusters.py - Topic clusters and saturation of saved ideas.
+
+``ideation-cli clusters`` groups the saved ideas into topics and reports
+which regions of idea-space keep being generated. Ideas are vectorised by
+the embedding index of ``ideation-cli similar``, with its local hashing
+vectorizer or the provider's embedding model, and clustered by mini-batch
+k-means on the unit vectors.
+
+The clustering is incremental. The centroids and the number of ideas each
+has absorbed are kept under ``.clusters/<backend>`` in the output path, and
+every run folds only the ideas added since the last one into them, a batch
+at a time, so the centroids follow new campaigns without revisiting the
+whole tree. ``--reset``, or a different ``--clusters``, starts over, as
+does an index whose rows no longer hold the ideas clustered before (after
+it was rebuilt or its ideas were migrated).
+
+For each cluster the report gives its size, its most representative ideas
+and its saturation: its share of the ideas relative to an even split, so
+a cluster with saturation 2.0 holds twice its fair share. Every game type
+and ideation technique gets the mean saturation of the clusters its ideas
+fall in. The report is also saved to ``.clusters/saturation.json``, where
+``--avoid-saturated`` reads the game types at or above ``--threshold``.
+
+NumPy is an optional dependency, needed only by this module and the
+embedding index.
+
+Functions:
+    - update_clusters(index, k, batch_size, reset): Fold new ideas into the centroids.
+    - saturation_report(index, centroids, top, threshold): Report cluster sizes and saturation.
+    - clusters_main(argv): Run the ``clusters`` subcommand.
+
+Constants:
+    - CLUSTERS_DIRNAME: The clusters directory name inside the output path.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from ideation_cli.embeddings import BACKENDS, EmbeddingIndex
+from ideation_cli.sampler import SATURATION_FILENAME
+from ideation_cli.writer import atomic_write, write_json
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+CLUSTERS_DIRNAME = ".clusters"
+
+DEFAULT_CLUSTERS = 8
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_THRESHOLD = 1.5
+
+# Rows assigned at a time, bounding the memory used by a report.
+CHUNK_ROWS = 65536
+
+# Seed of the centroid initialisation, so a tree always clusters the same way.
+INIT_SEED = 0
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError(
+            "Clustering ideas needs NumPy; install it with `pip install numpy`."
+        )
+
+
+def _label(value):
+    if value is None or value == "":
+        return "none"
+    if isinstance(value, list):
+        return " > ".join(str(item) for item in value)
+    return str(value)
+
+
+def _fingerprint(ids):
+    """Returns a hash of the idea paths of index rows, in row order."""
+    digest = hashlib.sha256()
+    for entry in ids:
+        digest.update(entry["path"].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _ClusterState:
+    """The centroids, their counts and the labels of the rows already clustered."""
+
+    def __init__(self, index):
+        self.index = index
+        self.directory = os.path.join(index.root, CLUSTERS_DIRNAME, index.backend)
+        self._state_path = os.path.join(self.directory, "state.json")
+        self._centroids_path = os.path.join(self.directory, "centroids.f32")
+        self._labels_path = os.path.join(self.directory, "labels.jsonl")
+
+    def load(self):
+        """Returns the saved state and centroids, or ``(None, None)`` if there are none."""
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            centroids = np.fromfile(self._centroids_path, dtype=np.float32)
+        except (OSError, json.JSONDecodeError):
+            return None, None
+        if centroids.size != state["k"] * state["dim"]:
+            return None, None
+        return state, centroids.reshape(state["k"], state["dim"])
+
+    def save(self, state, centroids):
+        os.makedirs(self.directory, exist_ok=True)
+        # Centroids first: state that is newer than its centroids is never read.
+        atomic_write(self._centroids_path, centroids.astype(np.float32).tobytes())
+        atomic_write(self._state_path, json.dumps(state).encode("utf-8"))
+
+    def clear(self):
+        for path in (self._state_path, self._centroids_path, self._labels_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def labels(self, rows):
+        """
+        Returns the game type and technique of each row, reading only new ideas' metadata.
+
+        Each label records its idea's path; labels from the first one whose
+        path differs from its row's are read again.
+
+        Args:
+            rows (int): The rows of the embedding index.
+        """
+        try:
+            with open(self._labels_path, "r", encoding="utf-8") as file:
+                labels = [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            labels = []
+        ids = self.index.ids()[:rows]
+        kept = 0
+        for label, entry in zip(labels, ids):
+            if label.get("path") != entry["path"]:
+                break
+            kept += 1
+        stale = kept < len(labels)
+        labels = labels[:kept]
+        if stale or len(labels) < rows:
+            added = []
+            for entry in ids[kept:]:
+                metadata_path = os.path.join(
+                    self.index.root, entry["path"], "metadata.json"
+                )
+                try:
+                    with open(metadata_path, "r", encoding="utf-8") as file:
+                        metadata = json.load(file)
+                except (OSError, json.JSONDecodeError):
+                    metadata = {}
+                added.append(
+                    {
+                        "path": entry["path"],
+                        "game_type": _label(metadata.get("game_type")),
+                        "technique": _label(metadata.get("ideation_technique")),
+                    }
+                )
+            os.makedirs(self.directory, exist_ok=True)
+            if stale:
+                data = "".join(json.dumps(label) + "\n" for label in labels + added)
+                atomic_write(self._labels_path, data.encode("utf-8"))
+            else:
+                with open(self._labels_path, "a", encoding="utf-8") as file:
+                    for label in added:
+                        file.write(json.dumps(label) + "\n")
+            labels += added
+        return labels
+
+
+def _assign(vectors, centroids):
+    """Returns the nearest centroid of each vector and its cosine similarity."""
+    nearest = np.empty(len(vectors), dtype=np.int64)
+    similarity = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        scores = np.asarray(vectors[start : start + CHUNK_ROWS]) @ centroids.T
+        nearest[start : start + CHUNK_ROWS] = scores.argmax(axis=1)
+        similarity[start : start + CHUNK_ROWS] = scores.max(axis=1)
+    return nearest, similarity
+
+
+def _initial_centroids(vectors, k, rng):
+    """Picks ``k`` spread-out ideas as the first centroids (k-means++ seeding)."""
+    sample = np.asarray(vectors[: max(k, CHUNK_ROWS // 16)])
+    centroids = [sample[rng.integers(len(sample))]]
+    distances = 1.0 - sample @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(distances, 0.0, None) ** 2
+        total = weights.sum()
+        row = (
+            rng.choice(len(sample), p=weights / total)
+            if total > 0
+            else rng.integers(len(sample))
+        )
+        centroids.append(sample[row])
+        distances = np.minimum(distances, 1.0 - sample @ sample[row])
+    return np.array(centroids, dtype=np.float32)
+
+
+def _normalize(centroids):
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (centroids / norms).astype(np.float32)
+
+
+def update_clusters(
+    index, k=DEFAULT_CLUSTERS, batch_size=DEFAULT_BATCH_SIZE, reset=False
+):
+    """
+    Folds the ideas indexed since the last run into the cluster centroids.
+
+    Each batch is assigned to its nearest centroids, and each centroid moves
+    towards its new ideas by the share they make of all the ideas it has
+    absorbed, the per-centre learning rate of mini-batch k-means.
+
+    Args:
+        index (EmbeddingIndex): The embedding index of the ideas.
+        k (int): The number of clusters.
+        batch_size (int): Ideas folded in at a time.
+        reset (bool): Discard the saved centroids and cluster every idea again.
+
+    Returns:
+        tuple: The centroids and the number of ideas folded in this run, or
+        ``(None, 0)`` while there are fewer ideas than clusters.
+    """
+    _require_numpy()
+    store = _ClusterState(index)
+    vectors = index.vectors()
+    rows = 0 if vectors is None else vectors.shape[0]
+    if rows < k:
+        return None, 0
+
+    ids = index.ids()
+    state, centroids = (None, None) if reset else store.load()
+    if (
+        state is None
+        or state["k"] != k
+        or state["dim"] != vectors.shape[1]
+        or state["seen"] > rows
+        # The rows already folded in must still be the same ideas.
+        or state.get("ids") != _fingerprint(ids[: state["seen"]])
+    ):
+        store.clear()
+        centroids = _initial_centroids(vectors, k, np.random.default_rng(INIT_SEED))
+        state = {"k": k, "dim": int(vectors.shape[1]), "seen": 0, "counts": [0] * k}
+
+    counts = np.array(state["counts"], dtype=np.float64)
+    centroids = centroids.astype(np.float64)
+    start = state["seen"]
+    for batch_start in range(start, rows, max(1, batch_size)):
+        batch = np.asarray(vectors[batch_start : batch_start + batch_size])
+        nearest, _ = _assign(batch, centroids.astype(np.float32))
+        for cluster in np.unique(nearest):
+            members = batch[nearest == cluster]
+            counts[cluster] += len(members)
+            centroids[cluster] += (
+                members.sum(axis=0) - len(members) * centroids[cluster]
+            ) / counts[cluster]
+    centroids = _normalize(centroids)
+    state.update(
+        seen=rows, ids=_fingerprint(ids[:rows]), counts=[int(count) for count in counts]
+    )
+    store.save(state, centroids)
+    return centroids, rows - start
+
+
+def _groups(names, saturation):
+    groups = {}
+    for name, value in zip(names, saturation):
+        group = groups.setdefault(name, [0, 0.0])
+        group[0] += 1
+        group[1] += float(value)
+    return {
+        name: {"ideas": count, "saturation": round(total / count, 2)}
+        for name, (count, total) in sorted(
+            groups.items(), key=lambda item: -item[1][1] / item[1][0]
+        )
+    }
+
+
+def saturation_report(index, centroids, top=3, threshold=DEFAULT_THRESHOLD):
+    """
+    Reports the size, representative ideas and saturation of each cluster.
+
+    Args:
+        index (EmbeddingIndex): The embedding index of the ideas.
+        centroids (numpy.ndarray): The cluster centroids.
+        top (int): Representative ideas listed per cluster.
+        threshold (float): The saturation at which a game type is saturated.
+
+    Returns:
+        dict: ``ideas``, ``clusters`` (largest first, each with its ``size``,
+        ``saturation``, top ``game_type`` and ``representatives``),
+        ``game_types`` and ``techniques`` (each with its ``ideas`` and mean
+        ``saturation``), and the ``saturated_game_types``.
+    """
+    vectors = index.vectors()
+    ids = index.ids()
+    rows = vectors.shape[0]
+    labels = _ClusterState(index).labels(rows)
+    nearest, similarity = _assign(vectors, centroids)
+    k = len(centroids)
+    sizes = np.bincount(nearest, minlength=k)
+    cluster_saturation = sizes * k / rows
+
+    clusters = []
+    for cluster in np.argsort(-sizes):
+        members = np.flatnonzero(nearest == cluster)
+        if not len(members):
+            continue
+        best = members[np.argsort(-similarity[members])[:top]]
+        game_types = [labels[row]["game_type"] for row in members]
+        clusters.append(
+            {
+                "cluster": int(cluster),
+                "size": int(sizes[cluster]),
+                "saturation": round(float(cluster_saturation[cluster]), 2),
+                "game_type": max(set(game_types), key=game_types.count),
+                "representatives": [
+                    {
+                        "name": ids[row]["name"],
+                        "path": ids[row]["path"],
+                        "similarity": round(float(similarity[row]), 3),
+                    }
+                    for row in best
+                ],
+            }
+        )
+
+    saturation = cluster_saturation[nearest]
+    game_types = _groups([label["game_type"] for label in labels], saturation)
+    return {
+        "ideas": int(rows),
+        "clusters": clusters,
+        "game_types": game_types,
+        "techniques": _groups([label["technique"] for label in labels], saturation),
+        "threshold": threshold,
+        "saturated_game_types": [
+            name
+            for name, group in game_types.items()
+            if name != "none" and group["saturation"] >= threshold
+        ],
+    }
+
+
+def clusters_main(argv=None):
+    """Runs the ``clusters`` subcommand: clusters saved ideas and reports saturation."""
+    parser = argparse.ArgumentParser(
+        prog="ideation-cli clusters",
+        description="Cluster saved ideas into topics and report which are saturated.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--path", type=str, default="ideas", help="Directory where ideas are saved."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="hashing",
+        help="Embed with a local hashing vectorizer (offline) or the provider's model.",
+    )
+    parser.add_argument(
+        "--clusters", type=int, default=DEFAULT_CLUSTERS, help="Number of clusters."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Ideas folded into the centroids at a time.",
+    )
+    parser.add_argument(
+        "--top", type=int, default=3, help="Representative ideas shown per cluster."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Saturation at which a game type is reported as saturated.",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Discard the saved centroids and cluster every idea again.",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        index = EmbeddingIndex(args.path, args.backend)
+    except RuntimeError as err:
+        print(f"Error: {err}")
+        return
+    added = index.update()
+    if added:
+        print(f"Indexed {added} new idea(s).")
+    centroids, folded = update_clusters(
+        index, max(1, args.clusters), args.batch_size, args.reset
+    )
+    if centroids is None:
+        print(f"Need at least {args.clusters} idea(s) under {args.path} to cluster.")
+        return
+    print(f"Clustered {folded} new idea(s).")
+
+    report = saturation_report(index, centroids, args.top, args.threshold)
+    write_json(os.path.join(args.path, SATURATION_FILENAME), report)
+    for cluster in report["clusters"]:
+        print(
+            f"Cluster {cluster['cluster']}: {cluster['size']} idea(s), "
+            f"saturation {cluster['saturation']:.2f}, mostly {cluster['game_type']}"
+        )
+        for idea in cluster["representatives"]:
+            print(f"    {idea['similarity']:.3f}  {idea['name']}  ({idea['path']})")
+    for title, key in (("Game type", "game_types"), ("Technique", "techniques")):
+        print(f"{title:<30}{'Ideas':>8}{'Saturation':>12}")
+        for name, group in report[key].items():
+            print(f"{name:<30}{group['ideas']:>8}{group['saturation']:>12.2f}")
+    if report["saturated_game_types"]:
+        print(
+            "Saturated game types: "
+            + ", ".join(report["saturated_game_types"])
+            + ". Use --avoid-saturated to leave them out of random draws."
+        )
@@ -0,0 +1,229 @@
+"""
+covers.py - Content-addressed cover image store for the Ideation CLI.
+
+Runs with a fixed ``--name`` and ``--task`` keep asking DALL·E for the same
+cover. This module keeps every generated cover in a store under the output
+directory, addressed by a hash of the normalised image prompt and the image
+generation parameters. A second index maps each cover request (the
+normalised task and name the image prompt is generated from) to the stored
+image, so a repeated request skips both the image prompt and the image
+calls. Hits are hard-linked into the idea directory, falling back to a copy
+where hard links are not supported. When the store grows past its size
+limit the least recently used images are evicted; idea directories keep
+their own links to them. Last use is recorded in the index rather than on
+the image files, whose inodes the idea covers share. Images and links are
+written through the background writer, so a stored image that is still
+queued counts as present. The index is rewritten inline instead: it is
+re-read and updated under an exclusive lock on ``index.lock``, so workers
+and servers sharing an output directory keep each other's entries. Where
+``fcntl`` is unavailable the lock only covers the current process.
+
+Classes:
+    - CoverStore: The store, with lookup, insertion and eviction.
+
+Functions:
+    - normalize_prompt(text): Normalise a prompt before hashing it.
+
+Constants:
+    - STORE_DIRNAME: The store directory name inside the output path.
+    - DEFAULT_MAX_MB: The default store size limit in megabytes.
+    - COVER_STORE: The process-wide store used by the generator.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from ideation_cli.writer import atomic_write, is_pending, link, write_bytes
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+STORE_DIRNAME = ".covers"
+DEFAULT_MAX_MB = 1024
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """
+    Normalises a prompt so trivially different spellings share a hash.
+
+    Args:
+        text (str): The prompt.
+
+    Returns:
+        str: The prompt lower-cased, with runs of whitespace collapsed and
+        surrounding whitespace and quotes removed.
+    """
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip().strip("\"'")
+
+
+def _hash(*parts, params):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(normalize_prompt(part).encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CoverStore:
+    """A size-limited, content-addressed store of generated cover images."""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, fresh=False):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.configure(root, max_bytes, fresh)
+
+    def configure(self, root, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, fresh=False):
+        """Point the store at a directory; ``root=None`` disables it."""
+        with self._lock:
+            self.root = root
+            self.max_bytes = max_bytes
+            self.fresh = fresh
+
+    @property
+    def enabled(self):
+        return self.root is not None
+
+    def _index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    def _object_path(self, object_key):
+        return os.path.join(self.root, "objects", object_key[:2], f"{object_key}.png")
+
+    @contextlib.contextmanager
+    def _locked_index(self):
+        """Yield the index as it is on disk, and save it back if it changed.
+
+        Both the in-process lock and an exclusive lock on ``index.lock`` are
+        held throughout, so concurrent processes never drop each other's
+        entries.
+        """
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, "index.lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    with open(self._index_path(), "r", encoding="utf-8") as file:
+                        text = file.read()
+                    index = json.loads(text)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    text, index = None, {"requests": {}, "objects": {}}
+                yield index
+                updated = json.dumps(index, indent=2)
+                if updated != text:
+                    atomic_write(self._index_path(), updated.encode("utf-8"))
+
+    def key_lock(self, task, name, params):
+        """Return a lock shared by concurrent requests for the same cover.
+
+        Holding it while generating means a second idea with the same request
+        waits for the first and then reuses its image, instead of paying for
+        an identical one.
+        """
+        request_key = _hash(task, name, params=params)
+        with self._lock:
+            return self._key_locks.setdefault(request_key, threading.Lock())
+
+    def lookup(self, task, name, params, touch=True):
+        """
+        Finds a stored cover for a cover request.
+
+        Args:
+            task (str): The idea's task, which the image prompt is generated from.
+            name (str): The idea's name.
+            params (dict): The image generation parameters.
+            touch (bool): Whether a hit counts as a use for eviction.
+
+        Returns:
+            tuple: The stored image path and its image prompt, or None on a miss
+            or when ``--fresh-images`` was requested.
+        """
+        if not self.enabled or self.fresh:
+            return None
+        with self._locked_index() as index:
+            object_key = index["requests"].get(_hash(task, name, params=params))
+            entry = index["objects"].get(object_key)
+            if entry is None:
+                return None
+            object_path = self._object_path(object_key)
+            if not self._stored(object_path):
+                return None
+            if touch:
+                entry["used"] = time.time()
+            return object_path, entry["prompt"]
+
+    def add(self, task, name, params, image_prompt, data):
+        """
+        Stores a generated cover and records the request that produced it.
+
+        Args:
+            task (str): The idea's task.
+            name (str): The idea's name.
+            params (dict): The image generation parameters.
+            image_prompt (str): The prompt the image was generated from.
+            data (bytes): The image data.
+
+        Returns:
+            str: The path of the stored image.
+        """
+        object_key = _hash(image_prompt, params=params)
+        object_path = self._object_path(object_key)
+        with self._locked_index() as index:
+            if not self._stored(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                write_bytes(object_path, data)
+            index["objects"][object_key] = {
+                "prompt": image_prompt,
+                "size": len(data),
+                "used": time.time(),
+            }
+            index["requests"][_hash(task, name, params=params)] = object_key
+            self._evict(index, keep=object_key)
+        return object_path
+
+    @staticmethod
+    def _stored(object_path):
+        return os.path.exists(object_path) or is_pending(object_path)
+
+    def _evict(self, index, keep):
+        total = sum(entry["size"] for entry in index["objects"].values())
+        if total <= self.max_bytes:
+            return
+
+        def last_used(object_key):
+            return index["objects"][object_key].get("used", 0.0)
+
+        for object_key in sorted(index["objects"], key=last_used):
+            if total <= self.max_bytes:
+                break
+            if object_key == keep or is_pending(self._object_path(object_key)):
+                continue
+            total -= index["objects"].pop(object_key)["size"]
+            try:
+                os.remove(self._object_path(object_key))
+            except FileNotFoundError:
+                pass
+        index["requests"] = {
+            request_key: object_key
+            for request_key, object_key in index["requests"].items()
+            if object_key in index["objects"]
+        }
+
+    @staticmethod
+    def link_into(object_path, image_path):
+        """Hard-links a stored image to ``image_path``, copying if linking fails."""
+        link(object_path, image_path)
+        return image_path
+
+
+COVER_STORE = CoverStore()
@@ -0,0 +1,242 @@
+"""
+dashboard.py - A live view of a run's progress.
+
+With ``--dashboard`` the run's progress is summarised in one place instead
+of being read from the interleaved messages of concurrent ideas: ideas done,
+ideas per minute and the ETA, the calls in flight for each stage with their
+p50 and p95 latency, retries, the cache hit rate and the spend so far.
+
+On a terminal the view is redrawn in place every half second, with the most
+recent messages of the ideas underneath it; messages are held back while
+the view is live, and errors among them are printed again when the run
+ends. When stdout is not a terminal, such as in CI logs or when redirected
+to a file, a compact JSON line with the same figures is written every
+``--dashboard-interval`` seconds instead, and messages pass through as
+usual.
+
+Everything shown is read from the live metrics and the model router, so the
+dashboard adds no bookkeeping of its own to the pipeline.
+
+Classes:
+    - Dashboard: Collects the figures and draws them.
+
+Constants:
+    - DASHBOARD: The process-wide dashboard used by the CLI.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+from ideation_cli.budget import RunBudget
+from ideation_cli.metrics import METRICS
+from ideation_cli.routing import STAGES
+
+LIVE_INTERVAL = 0.5
+LOG_INTERVAL = 10.0
+
+# Messages shown under the live view.
+LOG_LINES = 6
+
+# Stages shown, in pipeline order; covers are rendered by the image stage.
+DASHBOARD_STAGES = STAGES + ["image"]
+
+
+class _Capture:
+    """Stands in for stdout while the live view is drawn, keeping the latest messages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partial = ""
+        self.recent = deque(maxlen=LOG_LINES)
+        self.errors = []
+
+    def write(self, text):
+        with self._lock:
+            lines = (self._partial + text).split("\n")
+            self._partial = lines.pop()
+            for line in lines:
+                if line.strip():
+                    self.recent.append(line)
+                if line.startswith("Error"):
+                    self.errors.append(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return (
+        f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+    )
+
+
+def _format_latency(latency):
+    return "-" if latency is None else f"{latency:.1f}s"
+
+
+class Dashboard:
+    """Draws a run's progress live on a terminal, or logs it as JSON lines."""
+
+    def __init__(self, metrics=METRICS, clock=time.monotonic):
+        self.metrics = metrics
+        self.clock = clock
+        self._thread = None
+        self._stopping = None
+        self._stream = None
+        self._capture = None
+        self._drawn = 0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def snapshot(self):
+        """
+        Collects the figures shown.
+
+        Returns:
+            dict: ``elapsed``, ``ideas`` (done, failed, in flight and total),
+            ``ideas_per_minute``, ``eta``, ``stages`` (calls, in flight, p50
+            and p95 latency of each stage that was used), ``retries``,
+            ``rate_limited``, ``cache_hit_rate`` and ``spent``.
+        """
+        metrics = self.metrics
+        elapsed = self.clock() - self._started
+        done = metrics.total("ideation_ideas_total")
+        failed = metrics.total("ideation_ideas_total", outcome="error")
+        rate = done / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = max(0, self._total - done)
+        eta = remaining / rate * 60 if rate else None
+
+        stages = {}
+        for stage in DASHBOARD_STAGES:
+            calls = metrics.total("ideation_api_calls_total", stage=stage)
+            in_flight = metrics.total("ideation_api_calls_in_flight", stage=stage)
+            if not calls and not in_flight:
+                continue
+            stages[stage] = {
+                "calls": calls,
+                "in_flight": in_flight,
+                "p50": metrics.quantile("ideation_api_call_seconds", 0.5, stage=stage),
+                "p95": metrics.quantile("ideation_api_call_seconds", 0.95, stage=stage),
+            }
+
+        hits = metrics.total("ideation_cache_requests_total", outcome="hit")
+        lookups = hits + metrics.total("ideation_cache_requests_total", outcome="miss")
+        return {
+            "elapsed": round(elapsed, 1),
+            "ideas": {
+                "done": done,
+                "failed": failed,
+                "in_flight": metrics.total("ideation_ideas_in_flight"),
+                "total": self._total,
+            },
+            "ideas_per_minute": round(rate, 2),
+            "eta": None if eta is None else round(eta, 1),
+            "stages": stages,
+            "retries": metrics.total("ideation_api_retries_total"),
+            "rate_limited": metrics.total("ideation_rate_limited_responses_total"),
+            "cache_hit_rate": round(hits / lookups, 3) if lookups else None,
+            "spent": round(self._budget.spent(), 4),
+        }
+
+    def render(self, snapshot):
+        """Returns the lines of the live view for a snapshot."""
+        ideas = snapshot["ideas"]
+        hit_rate = snapshot["cache_hit_rate"]
+        lines = [
+            f"Ideas {ideas['done']}/{ideas['total']} done, {ideas['in_flight']} in flight, "
+            f"{ideas['failed']} failed | {snapshot['ideas_per_minute']:.1f}/min | "
+            f"elapsed {_format_seconds(snapshot['elapsed'])}, ETA {_format_seconds(snapshot['eta'])}",
+            f"Spent ${snapshot['spent']:.4f} | retries {snapshot['retries']}, "
+            f"rate-limited {snapshot['rate_limited']} | cache hits "
+            f"{'-' if hit_rate is None else f'{hit_rate:.0%}'}",
+            f"{'Stage':<14}{'In flight':>10}{'Calls':>8}{'p50':>9}{'p95':>9}",
+        ]
+        for stage, stats in snapshot["stages"].items():
+            lines.append(
+                f"{stage:<14}{stats['in_flight']:>10}{stats['calls']:>8}"
+                f"{_format_latency(stats['p50']):>9}{_format_latency(stats['p95']):>9}"
+            )
+        return lines
+
+    def _draw(self, final=False):
+        lines = self.render(self.snapshot())
+        if self._capture is not None and not final:
+            lines += ["-" * 50] + list(self._capture.recent)
+        # Move back to the top of the previous frame and clear it.
+        prefix = f"\x1b[{self._drawn}F\x1b[J" if self._drawn else ""
+        self._stream.write(prefix + "\n".join(lines) + "\n")
+        self._stream.flush()
+        self._drawn = len(lines)
+
+    def _log(self, event):
+        self._stream.write(json.dumps(dict(event=event, **self.snapshot())) + "\n")
+        self._stream.flush()
+
+    def _loop(self, live, interval):
+        while not self._stopping.wait(interval):
+            if live:
+                self._draw()
+            else:
+                self._log("progress")
+
+    def start(self, total, interval=None, stream=None, live=None):
+        """
+        Starts drawing the progress of a run.
+
+        Args:
+            total (int): The ideas the run will generate.
+            interval (float): Seconds between JSON lines when not live.
+            stream: Where to draw; stdout by default.
+            live (bool): Draw the live view; by default only on a terminal.
+        """
+        self.stop()
+        self._stream = stream or sys.stdout
+        live = self._stream.isatty() if live is None else live
+        self._total = total
+        self._started = self.clock()
+        self._budget = RunBudget()
+        self._drawn = 0
+        if live:
+            self._capture = _Capture()
+            self._stdout, sys.stdout = sys.stdout, self._capture
+        interval = LIVE_INTERVAL if live else interval or LOG_INTERVAL
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop,
+            args=(live, interval),
+            name="ideation-dashboard",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops drawing, leaving the final figures and any held-back errors on screen."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._capture is not None:
+            sys.stdout = self._stdout
+            self._draw(final=True)
+            for line in self._capture.errors:
+                print(line, file=self._stream)
+            self._capture = None
+        else:
+            self._log("done")
+
+
+DASHBOARD = Dashboard()
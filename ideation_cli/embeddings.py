@@ -0,0 +1,331 @@
+"""
+embeddings.py - Embedding index and semantic search over saved ideas.
+
+Every saved idea's name, descriptions and tags are embedded once, either by
+the provider's embedding model or, for offline use, by a local hashing
+vectorizer. The vectors are kept next to the output tree in an append-only
+float32 matrix (``vectors.f32``) with one line per row in ``ids.jsonl``
+naming the idea. Searching memory-maps the matrix and scores it with NumPy
+in chunks, so tens of thousands of ideas are searched without loading them
+as Python objects.
+
+``ideation-cli similar "<query>"`` first embeds any ideas added since the
+last search, then prints the closest ideas by cosine similarity.
+
+NumPy is an optional dependency, needed only by this module.
+
+Classes:
+    - EmbeddingIndex: The vector store of one backend, with update and search.
+
+Functions:
+    - hashing_vectors(texts, dim): Embed texts locally with feature hashing.
+    - idea_text(metadata): The text embedded for an idea.
+    - relocate_index(root, moves): Update the index paths of moved ideas.
+    - similar_main(argv): Run the ``similar`` subcommand.
+
+Constants:
+    - INDEX_DIRNAME: The index directory name inside the output path.
+    - BACKENDS: The available embedding backends.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from ideation_cli.generator import EMBEDDING_MODEL, generate_embeddings
+from ideation_cli.utils import iter_idea_dirs
+from ideation_cli.writer import atomic_write
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+INDEX_DIRNAME = ".embeddings"
+BACKENDS = ["hashing", "openai"]
+
+# Dimensions of the local hashing vectorizer.
+HASHING_DIM = 1024
+
+# Ideas embedded per provider call.
+BATCH_SIZE = 64
+
+# Rows scored at a time, bounding the memory used by a search.
+CHUNK_ROWS = 65536
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError(
+            "Semantic search needs NumPy; install it with `pip install numpy`."
+        )
+
+
+def hashing_vectors(texts, dim=HASHING_DIM):
+    """
+    Embeds texts locally by hashing their words and word pairs into ``dim`` buckets.
+
+    Args:
+        texts (list): The texts to embed.
+        dim (int): The number of dimensions.
+
+    Returns:
+        numpy.ndarray: A ``(len(texts), dim)`` float32 matrix.
+    """
+    _require_numpy()
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = _WORD_PATTERN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = int.from_bytes(
+                hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(),
+                "little",
+            )
+            # The top bit gives the sign, so hash collisions tend to cancel out.
+            vectors[row, digest % dim] += 1.0 if digest >> 63 else -1.0
+    return vectors
+
+
+def idea_text(metadata):
+    """Returns the text embedded for an idea: its name, descriptions and tags."""
+    branding = metadata.get("branding_data") or {}
+    tags = branding.get("tags") or []
+    return "\n".join(
+        [
+            str(metadata.get("name", "")),
+            str(branding.get("short_description", "")),
+            str(branding.get("detailed_description", "")),
+            ", ".join(str(tag) for tag in tags),
+        ]
+    )
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class EmbeddingIndex:
+    """The append-only vector store of one embedding backend under an output path."""
+
+    def __init__(self, root, backend="hashing"):
+        _require_numpy()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        self.root = root
+        self.backend = backend
+        self.directory = os.path.join(root, INDEX_DIRNAME, backend)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._ids_path = os.path.join(self.directory, "ids.jsonl")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+
+    def _embed(self, texts):
+        if self.backend == "hashing":
+            return hashing_vectors(texts)
+        return np.asarray(generate_embeddings(texts, EMBEDDING_MODEL), np.float32)
+
+    def _dim(self):
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as file:
+                return json.load(file)["dim"]
+        except FileNotFoundError:
+            return None
+
+    def ids(self):
+        """Returns the idea of each row: its ``path`` relative to the root and its ``name``."""
+        try:
+            with open(self._ids_path, "r", encoding="utf-8") as file:
+                return [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _rows(self, dim):
+        """
+        The number of complete rows, trimming a row left by an interrupted append.
+
+        IDs without a vector, such as after the matrix was lost, are dropped
+        so their ideas are embedded again on the next update.
+        """
+        ids = self.ids()
+        row_bytes = dim * 4
+        try:
+            size = os.path.getsize(self._vectors_path)
+        except FileNotFoundError:
+            size = 0
+        rows = min(len(ids), size // row_bytes)
+        if size > rows * row_bytes:
+            with open(self._vectors_path, "r+b") as file:
+                file.truncate(rows * row_bytes)
+        if rows < len(ids):
+            data = "".join(json.dumps(entry) + "\n" for entry in ids[:rows])
+            atomic_write(self._ids_path, data.encode("utf-8"))
+        return rows
+
+    def update(self):
+        """
+        Embeds the ideas saved since the last update and appends them to the index.
+
+        Returns:
+            int: The number of ideas added.
+        """
+        dim = self._dim()
+        if dim is not None:
+            self._rows(dim)
+        indexed = {entry["path"] for entry in self.ids()}
+        pending = []
+        for dir_path in iter_idea_dirs(self.root):
+            path = os.path.relpath(dir_path, self.root)
+            if path in indexed:
+                continue
+            try:
+                with open(
+                    os.path.join(dir_path, "metadata.json"), "r", encoding="utf-8"
+                ) as file:
+                    metadata = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                continue
+            pending.append((path, metadata))
+        if not pending:
+            return 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        for start in range(0, len(pending), BATCH_SIZE):
+            batch = pending[start : start + BATCH_SIZE]
+            vectors = _normalize(
+                self._embed([idea_text(metadata) for _, metadata in batch])
+            )
+            if dim is None:
+                dim = vectors.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as file:
+                    json.dump({"backend": self.backend, "dim": dim}, file)
+            # Vectors are appended before their IDs, so a crash leaves at most
+            # a partial row without an ID, which is trimmed on the next update.
+            with open(self._vectors_path, "ab") as file:
+                file.write(vectors.tobytes())
+            with open(self._ids_path, "a", encoding="utf-8") as file:
+                for path, metadata in batch:
+                    file.write(
+                        json.dumps({"path": path, "name": metadata.get("name")}) + "\n"
+                    )
+        return len(pending)
+
+    def vectors(self):
+        """
+        Memory-maps the index's vectors.
+
+        Returns:
+            numpy.memmap: The ``(rows, dim)`` matrix of unit vectors, in the
+            order of ``ids()``, or None while the index is empty.
+        """
+        dim = self._dim()
+        if dim is None:
+            return None
+        rows = self._rows(dim)
+        if not rows:
+            return None
+        return np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r", shape=(rows, dim)
+        )
+
+    def search(self, query, k=10):
+        """
+        Finds the ideas most similar to a query.
+
+        Args:
+            query (str): The query text.
+            k (int): The number of results.
+
+        Returns:
+            list: ``(score, entry)`` pairs, best first, where ``entry`` has the
+            idea's ``path`` and ``name``.
+        """
+        vectors = self.vectors()
+        if vectors is None or k <= 0:
+            return []
+        ids = self.ids()
+        rows = vectors.shape[0]
+        query_vector = _normalize(self._embed([query]))[0]
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, CHUNK_ROWS):
+            scores[start : start + CHUNK_ROWS] = (
+                vectors[start : start + CHUNK_ROWS] @ query_vector
+            )
+        k = min(k, rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[row]), ids[row]) for row in top]
+
+
+def relocate_index(root, moves):
+    """
+    Updates the paths of moved ideas in the index of every backend.
+
+    Only ``ids.jsonl`` is rewritten; the vectors stay where they are.
+
+    Args:
+        root (str): The output path.
+        moves (dict): The new path of each moved idea, both relative to ``root``.
+    """
+    directory = os.path.join(root, INDEX_DIRNAME)
+    for backend in BACKENDS:
+        ids_path = os.path.join(directory, backend, "ids.jsonl")
+        try:
+            with open(ids_path, "r", encoding="utf-8") as file:
+                entries = [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            entry["path"] = moves.get(entry["path"], entry["path"])
+        data = "".join(json.dumps(entry) + "\n" for entry in entries)
+        atomic_write(ids_path, data.encode("utf-8"))
+
+
+def similar_main(argv=None):
+    """Runs the ``similar`` subcommand: prints the ideas closest to a query."""
+    parser = argparse.ArgumentParser(
+        prog="ideation-cli similar",
+        description="Find saved ideas similar to a query.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("query", help="What to search for.")
+    parser.add_argument(
+        "--path", type=str, default="ideas", help="Directory where ideas are saved."
+    )
+    parser.add_argument("--top", type=int, default=10, help="How many ideas to show.")
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="hashing",
+        help="Embed with a local hashing vectorizer (offline) or the provider's model.",
+    )
+    parser.add_argument(
+        "--no-update",
+        action="store_true",
+        help="Search the index as it is, without embedding newly saved ideas.",
+    )
+    args = parser.parse_args(argv)
+    if args.top < 1:
+        parser.error("--top must be at least 1")
+
+    try:
+        index = EmbeddingIndex(args.path, args.backend)
+    except RuntimeError as err:
+        print(f"Error: {err}")
+        return
+    if not args.no_update:
+        added = index.update()
+        if added:
+            print(f"Indexed {added} new idea(s).")
+    results = index.search(args.query, args.top)
+    if not results:
+        print(f"No ideas indexed under {args.path}.")
+    for score, entry in results:
+        print(
+            f"{score:.3f}  {entry['name']}  ({os.path.join(args.path, entry['path'])})"
+        )
@@ -0,0 +1,331 @@
+"""
+endpoints.py - Load balancing across API keys and endpoints.
+
+By default every call goes to the single OpenAI client built from the
+environment. With ``--endpoints FILE`` calls are spread over a pool of
+endpoints instead: several OpenAI API keys, OpenAI-compatible base URLs or
+Azure OpenAI deployments, so a large run is not limited to one key's quota.
+
+The file is a JSON list of endpoints::
+
+    [
+        {"name": "main", "api_key_env": "OPENAI_API_KEY", "weight": 2},
+        {"name": "team", "api_key_env": "OPENAI_TEAM_KEY"},
+        {"name": "azure", "azure_endpoint": "https://example.openai.azure.com",
+         "api_version": "2024-06-01", "api_key_env": "AZURE_OPENAI_KEY",
+         "models": {"gpt-4o": "gpt-4o-deployment"}}
+    ]
+
+Keys are read from the named environment variable (``api_key_env``) or given
+inline (``api_key``). ``base_url`` points an endpoint at any compatible
+server, and ``models`` maps model names to the endpoint's deployment names.
+With more than one endpoint the clients do not retry on their own
+(``max_retries`` defaults to 0), since the pool retries on another endpoint.
+
+Each call goes to the healthy endpoint with the fewest outstanding requests
+relative to its weight. An endpoint that answers 429 is rested for its
+``Retry-After`` time, or until its ``x-ratelimit-reset-*`` headers say its
+limits reset; without either it is rested for ``RATE_LIMIT_SECONDS``,
+doubling with each 429 in a row. A call never goes to a resting endpoint
+before its rest is over. One that fails ``MAX_FAILURES`` times in a row (server
+errors, connection errors, rejected keys) is evicted for
+``EVICTION_SECONDS``, then given another chance. A call that fails on one
+endpoint for either reason is retried on the next one.
+
+Classes:
+    - Endpoint: One endpoint, with its client and health.
+    - EndpointPool: The pool and its balancing.
+
+Functions:
+    - load_endpoints(path, http_client): Build endpoints from a configuration file.
+
+Constants:
+    - ENDPOINT_POOL: The process-wide pool used by the generator.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+import openai
+from openai import AzureOpenAI, OpenAI
+
+from ideation_cli.metrics import METRICS
+
+# Consecutive failures after which an endpoint is evicted.
+MAX_FAILURES = 3
+
+# Seconds an evicted endpoint is left out of the rotation.
+EVICTION_SECONDS = 60.0
+
+# Seconds a rate-limited endpoint rests when the response says nothing, doubled per 429 in a row.
+RATE_LIMIT_SECONDS = 10.0
+MAX_RATE_LIMIT_SECONDS = 120.0
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# Outcomes of a call, from the endpoint's point of view.
+OK = "ok"
+RATE_LIMITED = "rate_limited"
+FAILED = "failed"
+
+
+def classify_error(err):
+    """
+    Decides whether an error says something about the endpoint.
+
+    Returns:
+        str: ``rate_limited`` for 429 responses, ``failed`` for connection
+        errors, server errors and rejected keys, and ``ok`` for errors caused
+        by the request itself, which another endpoint would repeat.
+    """
+    if isinstance(err, openai.APIConnectionError):
+        return FAILED
+    if isinstance(err, openai.APIStatusError):
+        if err.status_code == 429:
+            return RATE_LIMITED
+        if err.status_code >= 500 or err.status_code in (401, 403, 404):
+            return FAILED
+    return OK
+
+
+def _parse_duration(value):
+    """Parses a rate-limit reset such as ``1s``, ``6m0s`` or ``20ms`` into seconds."""
+    seconds = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value or ""):
+        seconds += float(amount) * _DURATION_UNITS[unit]
+    return seconds or None
+
+
+def _retry_after(err, consecutive=1):
+    """
+    Returns how long to rest an endpoint after a 429.
+
+    Args:
+        err (Exception): The rate-limit error, with the response's headers.
+        consecutive (int): The endpoint's 429s in a row, including this one.
+    """
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    resets = [
+        _parse_duration(headers.get(name))
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [reset for reset in resets if reset]
+    if resets:
+        return max(resets)
+    return min(RATE_LIMIT_SECONDS * 2 ** (consecutive - 1), MAX_RATE_LIMIT_SECONDS)
+
+
+class Endpoint:
+    """One API endpoint with its client, weight and health."""
+
+    def __init__(self, name, client, weight=1.0, models=None):
+        self.name = name
+        self.client = client
+        self.weight = max(float(weight), 0.01)
+        self.models = models or {}
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.consecutive_failures = 0
+        self.consecutive_rate_limits = 0
+        self.unavailable_until = 0.0
+
+    def model(self, model):
+        """Returns the endpoint's name for a model, e.g. an Azure deployment."""
+        return self.models.get(model, model)
+
+    def as_dict(self, now):
+        return {
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "available_in": round(max(0.0, self.unavailable_until - now), 1),
+        }
+
+
+def _build_client(config, http_client, max_retries):
+    max_retries = config.get("max_retries", max_retries)
+    api_key = config.get("api_key") or os.environ.get(
+        config.get("api_key_env", "OPENAI_API_KEY")
+    )
+    if config.get("azure_endpoint"):
+        return AzureOpenAI(
+            azure_endpoint=config["azure_endpoint"],
+            api_version=config.get("api_version"),
+            api_key=api_key,
+            max_retries=max_retries,
+            http_client=http_client,
+        )
+    return OpenAI(
+        api_key=api_key,
+        base_url=config.get("base_url"),
+        organization=config.get("organization"),
+        max_retries=max_retries,
+        http_client=http_client,
+    )
+
+
+def load_endpoints(path, http_client=None):
+    """
+    Builds endpoints from a configuration file.
+
+    Args:
+        path (str): The JSON configuration file.
+        http_client (httpx.Client): The shared HTTP client for every endpoint.
+
+    Returns:
+        list: The endpoints.
+
+    Raises:
+        ValueError: If the file is not a non-empty list of endpoint objects.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        configs = json.load(file)
+    if not isinstance(configs, list) or not configs:
+        raise ValueError(f"{path} must contain a list of endpoints.")
+    # With several endpoints, a failed call is retried on the next endpoint instead.
+    max_retries = 2 if len(configs) == 1 else 0
+    endpoints = []
+    for index, config in enumerate(configs):
+        if not isinstance(config, dict):
+            raise ValueError(f"Endpoint {index} in {path} is not an object.")
+        endpoints.append(
+            Endpoint(
+                config.get("name", f"endpoint-{index}"),
+                _build_client(config, http_client, max_retries),
+                weight=config.get("weight", 1.0),
+                models=config.get("models"),
+            )
+        )
+    return endpoints
+
+
+class EndpointPool:
+    """Balances calls over endpoints by least outstanding requests per weight."""
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self.clock = clock
+        self.sleep = sleep
+        self.endpoints = []
+
+    def configure(self, endpoints):
+        """Use ``endpoints``; an empty list sends every call to the default client."""
+        with self._lock:
+            self.endpoints = list(endpoints)
+
+    @property
+    def enabled(self):
+        return bool(self.endpoints)
+
+    def acquire(self, exclude=()):
+        """
+        Picks the endpoint for the next call and counts it as outstanding.
+
+        Available endpoints are preferred. When every endpoint is resting or
+        evicted, the one that becomes available first is picked, and ``call``
+        waits for it rather than failing the run.
+
+        Args:
+            exclude (iterable): Endpoints already tried for this call.
+
+        Returns:
+            Endpoint: The endpoint, or None if every endpoint was excluded.
+        """
+        now = self.clock()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+            available = [e for e in candidates if e.unavailable_until <= now]
+            if available:
+                endpoint = min(available, key=lambda e: (e.outstanding + 1) / e.weight)
+            else:
+                endpoint = min(candidates, key=lambda e: e.unavailable_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, outcome=OK, err=None):
+        """Records the outcome of a call on ``endpoint``."""
+        now = self.clock()
+        with self._lock:
+            endpoint.outstanding -= 1
+            if outcome == RATE_LIMITED:
+                endpoint.rate_limited += 1
+                endpoint.consecutive_rate_limits += 1
+                endpoint.unavailable_until = now + _retry_after(
+                    err, endpoint.consecutive_rate_limits
+                )
+            elif outcome == FAILED:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= MAX_FAILURES:
+                    print(
+                        f"Endpoint '{endpoint.name}' failed {endpoint.consecutive_failures} "
+                        f"times in a row; evicting it for {EVICTION_SECONDS:.0f}s."
+                    )
+                    endpoint.unavailable_until = now + EVICTION_SECONDS
+                    endpoint.consecutive_failures = 0
+            else:
+                endpoint.consecutive_failures = 0
+                endpoint.consecutive_rate_limits = 0
+
+    def call(self, default_client, model, request):
+        """
+        Makes an API call on the pool, or on ``default_client`` when no pool is configured.
+
+        Calls that fail because of the endpoint are retried once on each
+        other endpoint.
+
+        Args:
+            default_client (OpenAI): The client used without a pool.
+            model (str): The requested model.
+            request (callable): Makes the call, given a client and the model name to use.
+
+        Returns:
+            The result of ``request``.
+        """
+        if not self.enabled:
+            return request(default_client, model)
+        tried = []
+        while True:
+            endpoint = self.acquire(exclude=tried)
+            # Never call a resting endpoint early; it would only answer 429 again.
+            wait = endpoint.unavailable_until - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+            try:
+                result = request(endpoint.client, endpoint.model(model))
+            except Exception as err:
+                outcome = classify_error(err)
+                self.release(endpoint, outcome, err)
+                tried.append(endpoint)
+                if outcome == OK or len(tried) == len(self.endpoints):
+                    raise
+                METRICS.inc("ideation_api_retries_total", source="endpoint")
+                continue
+            self.release(endpoint)
+            return result
+
+    def stats(self):
+        """Returns the counters and availability of each endpoint, by name."""
+        now = self.clock()
+        with self._lock:
+            return {e.name: e.as_dict(now) for e in self.endpoints}
+
+
+ENDPOINT_POOL = EndpointPool()
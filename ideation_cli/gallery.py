@@ -0,0 +1,391 @@
+"""
+gallery.py - A static HTML gallery of saved ideas.
+
+``ideation-cli gallery`` renders the ideas under ``--path`` as paginated
+static HTML in ``<path>/.gallery``: one page per ``--page-size`` ideas, each
+showing the idea's cover thumbnail, name, game type, short description and
+tags, with links to the full cover and ``metadata.json``.
+
+The build is incremental. ``manifest.json`` records the order the ideas were
+first seen in, the modification times of their files and a signature of
+every page. Ideas keep their place, and new ideas are added at the end, so
+a rebuild only rewrites the pages whose ideas changed, typically the last
+one; the rest are left as they are.
+
+Thumbnails are generated in a process pool and cached in ``thumbs/``, keyed
+by the cover and its modification time, so a cover is only thumbnailed
+again when it changes. Pages load their thumbnails lazily, so browsing tens
+of thousands of ideas only loads one page of small images. Thumbnails need
+Pillow; without it, pages show the full covers instead.
+
+Functions:
+    - make_thumbnail(source, target, size): Write a JPEG thumbnail of a cover.
+    - build_gallery(root, output, page_size, thumb_size, workers, rebuild): Build or update a gallery.
+    - gallery_main(argv): Run the ``gallery`` subcommand.
+
+Constants:
+    - GALLERY_DIRNAME: The gallery directory name inside the output path.
+"""
+
+import argparse
+import hashlib
+import html
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ideation_cli.utils import iter_idea_dirs
+from ideation_cli.writer import atomic_write, write_bytes, write_json
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+GALLERY_DIRNAME = ".gallery"
+MANIFEST_FILENAME = "manifest.json"
+THUMBS_DIRNAME = "thumbs"
+MANIFEST_VERSION = 1
+
+DEFAULT_PAGE_SIZE = 60
+DEFAULT_THUMB_SIZE = 256
+THUMB_QUALITY = 80
+
+STYLE = """
+body { font-family: sans-serif; margin: 2em; background: #f4f4f4; }
+nav { margin: 1em 0; }
+.grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(240px, 1fr)); gap: 1em; }
+.idea { background: #fff; padding: 0.8em; border-radius: 6px; }
+.idea img { width: 100%; height: auto; aspect-ratio: 1; object-fit: cover; background: #ddd; }
+.idea h2 { font-size: 1.1em; margin: 0.4em 0; }
+.type, .tags { color: #666; font-size: 0.85em; }
+"""
+
+
+def make_thumbnail(source, target, size):
+    """
+    Writes a JPEG thumbnail of a cover, at most ``size`` pixels on each side.
+
+    Runs in the worker processes of the thumbnail pool.
+    """
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=THUMB_QUALITY)
+    atomic_write(target, buffer.getvalue())
+    return target
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _thumb_name(cover_path, cover_mtime, size):
+    key = json.dumps([cover_path, cover_mtime, size])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".jpg"
+
+
+def _page_name(number):
+    return f"page-{number:04d}.html"
+
+
+def _load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, json.JSONDecodeError):
+        pass
+    return {"version": MANIFEST_VERSION, "order": [], "ideas": {}, "pages": {}}
+
+
+def _read_card(dir_path):
+    """The parts of an idea's metadata shown on its card."""
+    try:
+        with open(
+            os.path.join(dir_path, "metadata.json"), "r", encoding="utf-8"
+        ) as file:
+            metadata = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        metadata = {}
+    branding = metadata.get("branding_data") or {}
+    return {
+        "name": str(metadata.get("name") or os.path.basename(dir_path)),
+        "game_type": str(metadata.get("game_type") or ""),
+        "description": str(branding.get("short_description") or ""),
+        "tags": [str(tag) for tag in branding.get("tags") or []],
+    }
+
+
+def _render_card(root, output, path, idea):
+    idea_dir = os.path.relpath(os.path.join(root, path), output)
+
+    def link(name):
+        return html.escape(
+            "/".join(os.path.join(idea_dir, name).split(os.sep)), quote=True
+        )
+
+    card = idea["card"]
+    image = ""
+    if idea["cover"]:
+        source = (
+            f"{THUMBS_DIRNAME}/{idea['thumb']}" if idea["thumb"] else link("cover.png")
+        )
+        image = (
+            f'<a href="{link("cover.png")}"><img src="{html.escape(source, quote=True)}" '
+            f'alt="{html.escape(card["name"], quote=True)}" loading="lazy" decoding="async"></a>'
+        )
+    tags = ", ".join(card["tags"])
+    return (
+        f'<div class="idea">{image}'
+        f'<h2><a href="{link("metadata.json")}">{html.escape(card["name"])}</a></h2>'
+        f'<div class="type">{html.escape(card["game_type"])}</div>'
+        f"<p>{html.escape(card['description'])}</p>"
+        f'<div class="tags">{html.escape(tags)}</div></div>'
+    )
+
+
+def _render_page(title, nav, body):
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+        f"<title>{html.escape(title)}</title><style>{STYLE}</style></head>\n"
+        f"<body><h1>{html.escape(title)}</h1><nav>{nav}</nav>\n{body}\n"
+        f"<nav>{nav}</nav></body></html>\n"
+    )
+
+
+def _nav(number, has_next):
+    links = ['<a href="index.html">All pages</a>']
+    if number > 1:
+        links.append(f'<a href="{_page_name(number - 1)}">Previous</a>')
+    if has_next:
+        links.append(f'<a href="{_page_name(number + 1)}">Next</a>')
+    return " | ".join(links)
+
+
+def _generate_thumbnails(jobs, thumb_size, workers):
+    """
+    Generates ``(source, target)`` thumbnails, in a process pool when there are several.
+
+    Returns:
+        set: The targets that could not be generated, such as those of unreadable covers.
+    """
+    failed = set()
+    if workers <= 1 or len(jobs) <= 1:
+        for source, target in jobs:
+            try:
+                make_thumbnail(source, target, thumb_size)
+            except Exception as err:
+                print(f"Error: Failed to thumbnail {source}: {err}")
+                failed.add(target)
+        return failed
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (
+                source,
+                target,
+                executor.submit(make_thumbnail, source, target, thumb_size),
+            )
+            for source, target in jobs
+        ]
+        for source, target, future in futures:
+            try:
+                future.result()
+            except Exception as err:
+                print(f"Error: Failed to thumbnail {source}: {err}")
+                failed.add(target)
+    return failed
+
+
+def build_gallery(
+    root,
+    output=None,
+    page_size=DEFAULT_PAGE_SIZE,
+    thumb_size=DEFAULT_THUMB_SIZE,
+    workers=None,
+    rebuild=False,
+):
+    """
+    Builds the gallery of an output path, rewriting only the pages that changed.
+
+    Args:
+        root (str): The output path.
+        output (str): The gallery directory; ``<root>/.gallery`` by default.
+        page_size (int): Ideas per page.
+        thumb_size (int): The longest side of a thumbnail, in pixels.
+        workers (int): Thumbnail worker processes; one per CPU by default.
+        rebuild (bool): Rewrite every page and thumbnail.
+
+    Returns:
+        dict: The number of ``ideas``, ``pages``, pages ``written`` and
+        ``thumbnails`` generated.
+    """
+    output = output or os.path.join(root, GALLERY_DIRNAME)
+    thumbs_dir = os.path.join(output, THUMBS_DIRNAME)
+    os.makedirs(thumbs_dir, exist_ok=True)
+    manifest_path = os.path.join(output, MANIFEST_FILENAME)
+    manifest = _load_manifest(manifest_path)
+    settings = {"page_size": page_size, "thumb_size": thumb_size}
+    if rebuild or manifest.get("settings") != settings:
+        manifest["pages"] = {}
+
+    # Ideas keep the place they were first seen in, so new ideas only change the last page.
+    found = {
+        os.path.relpath(dir_path, root): dir_path for dir_path in iter_idea_dirs(root)
+    }
+    order = [path for path in manifest["order"] if path in found]
+    known = set(order)
+    order.extend(path for path in sorted(found) if path not in known)
+
+    ideas = {}
+    jobs = []
+    for path in order:
+        dir_path = found[path]
+        cover_path = os.path.join(dir_path, "cover.png")
+        cover_mtime = _mtime(cover_path)
+        metadata_mtime = _mtime(os.path.join(dir_path, "metadata.json"))
+        previous = manifest["ideas"].get(path)
+        if previous and previous["mtime"] == metadata_mtime:
+            card = previous["card"]
+        else:
+            card = _read_card(dir_path)
+        thumb = None
+        if cover_mtime is not None and Image is not None:
+            thumb = _thumb_name(path, cover_mtime, thumb_size)
+            target = os.path.join(thumbs_dir, thumb)
+            if rebuild or not os.path.exists(target):
+                jobs.append((cover_path, target))
+        ideas[path] = {
+            "mtime": metadata_mtime,
+            "cover": cover_mtime,
+            "thumb": thumb,
+            "card": card,
+        }
+
+    if jobs:
+        failed = _generate_thumbnails(jobs, thumb_size, workers or os.cpu_count() or 1)
+        for idea in ideas.values():
+            if idea["thumb"] and os.path.join(thumbs_dir, idea["thumb"]) in failed:
+                idea["thumb"] = None
+
+    pages = [
+        order[start : start + page_size] for start in range(0, len(order), page_size)
+    ]
+    written = 0
+    signatures = {}
+    for number, paths in enumerate(pages, start=1):
+        has_next = number < len(pages)
+        signature = hashlib.sha256(
+            json.dumps([has_next, [[path, ideas[path]] for path in paths]]).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+        signatures[str(number)] = signature
+        page_path = os.path.join(output, _page_name(number))
+        if manifest["pages"].get(str(number)) == signature and os.path.exists(
+            page_path
+        ):
+            continue
+        body = '<div class="grid">\n{}\n</div>'.format(
+            "\n".join(_render_card(root, output, path, ideas[path]) for path in paths)
+        )
+        page = _render_page(f"Ideas, page {number}", _nav(number, has_next), body)
+        write_bytes(page_path, page.encode("utf-8"))
+        written += 1
+
+    # Remove the pages and thumbnails no idea uses any more.
+    current = {_page_name(number) for number in range(1, len(pages) + 1)}
+    for name in os.listdir(output):
+        if name.startswith("page-") and name.endswith(".html") and name not in current:
+            os.remove(os.path.join(output, name))
+    used = {idea["thumb"] for idea in ideas.values() if idea["thumb"]}
+    for name in os.listdir(thumbs_dir):
+        if name not in used and not name.startswith("."):
+            os.remove(os.path.join(thumbs_dir, name))
+
+    index = "<ul>\n{}\n</ul>".format(
+        "\n".join(
+            f'<li><a href="{_page_name(number)}">Page {number}</a> '
+            f"({len(paths)} ideas)</li>"
+            for number, paths in enumerate(pages, start=1)
+        )
+    )
+    write_bytes(
+        os.path.join(output, "index.html"),
+        _render_page(f"Ideas ({len(order)})", "", index).encode("utf-8"),
+    )
+    write_json(
+        manifest_path,
+        {
+            "version": MANIFEST_VERSION,
+            "settings": settings,
+            "order": order,
+            "ideas": ideas,
+            "pages": signatures,
+        },
+    )
+    return {
+        "ideas": len(order),
+        "pages": len(pages),
+        "written": written,
+        "thumbnails": len(jobs),
+    }
+
+
+def gallery_main(argv=None):
+    """Runs the ``gallery`` subcommand: builds or updates the static gallery."""
+    parser = argparse.ArgumentParser(
+        prog="ideation-cli gallery",
+        description="Render saved ideas and their covers as a static HTML gallery.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--path", type=str, default="ideas", help="Directory where ideas are saved."
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        help=f"Directory to write the gallery to; {GALLERY_DIRNAME} under --path by default.",
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Ideas per page."
+    )
+    parser.add_argument(
+        "--thumb-size",
+        type=int,
+        default=DEFAULT_THUMB_SIZE,
+        help="Longest side of a thumbnail, in pixels.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes generating thumbnails; one per CPU by default.",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rewrite every page and thumbnail instead of only those that changed.",
+    )
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        print("Pillow is not installed; pages will show full-size covers.")
+    stats = build_gallery(
+        args.path,
+        args.out,
+        page_size=max(1, args.page_size),
+        thumb_size=args.thumb_size,
+        workers=args.workers,
+        rebuild=args.rebuild,
+    )
+    output = args.out or os.path.join(args.path, GALLERY_DIRNAME)
+    print(
+        f"Gallery of {stats['ideas']} idea(s) on {stats['pages']} page(s): "
+        f"{stats['written']} page(s) written, {stats['thumbnails']} thumbnail(s) generated. "
+        f"Open {os.path.join(output, 'index.html')}"
+    )
@@ -1,35 +1,161 @@
 import json
 import os
+import time
 from typing import Tuple
 
-import requests
 from openai import OpenAI
 
-from ideation_cli.prompts import GAME_NAME_PROMPT, GAME_METADATA_PROMPT
+from ideation_cli import DEFAULT_REFINE_ROUNDS
+from ideation_cli.cassettes import CASSETTE
+from ideation_cli.covers import COVER_STORE
+from ideation_cli.endpoints import ENDPOINT_POOL, OK, classify_error
+from ideation_cli.metrics import METRICS
+from ideation_cli.prompts import (
+    GAME_NAME_PROMPT,
+    GAME_METADATA_PROMPT,
+    GAME_METADATA_REPAIR_PROMPT,
+    GAME_RANKING_PROMPT,
+    GAME_REFINE_PROMPT,
+)
 from ideation_cli.prompts import get_prompt
+from ideation_cli.routing import ROUTER
+from ideation_cli.structured import (
+    METADATA_FIELDS,
+    STRUCTURED_OUTPUT_MODELS,
+    metadata_response_format,
+    parse_partial_json,
+    strip_code_fences,
+    validate_metadata,
+)
+from ideation_cli.transport import TRANSPORT
 from ideation_cli.utils import validate_model
+from ideation_cli.writer import write_bytes
 
-OPENAI_CLIENT = OpenAI()
+# A missing key only fails once a call is made, so --plan and --replay work without one.
+OPENAI_CLIENT = OpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY") or "missing-api-key",
+    http_client=TRANSPORT.client,
+)
+IMAGE_MODEL = "dall-e-3"
+IMAGE_PARAMS = {"model": IMAGE_MODEL, "size": "1024x1024", "quality": "standard"}
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Words kept of the rolling notes carried from one refinement round to the next.
+REFINE_NOTES_WORDS = 60
 DIRNAME = os.path.dirname(__file__)
 
 
+def use_http_client(http_client) -> None:
+    """Rebuilds the OpenAI client on a new shared HTTP client."""
+    global OPENAI_CLIENT
+    OPENAI_CLIENT = OPENAI_CLIENT.with_options(http_client=http_client)
+
+
+def warm_client() -> None:
+    """Opens a connection to the API ahead of the first real request.
+
+    Listing the models is free, and the connection it opens is kept in the
+    client's pool for the requests that follow.
+    """
+    try:
+        OPENAI_CLIENT.models.list()
+    except Exception:
+        pass  # A failed warm-up only means the first request pays for the connection.
+
+
+def _request_chat(model: str, messages: list, params: dict) -> dict:
+    """Makes a chat completion call and returns its content and token usage."""
+    response = ENDPOINT_POOL.call(
+        OPENAI_CLIENT,
+        model,
+        lambda client, endpoint_model: client.chat.completions.create(
+            model=endpoint_model, messages=messages, **params
+        ),
+    )
+    usage = getattr(response, "usage", None)
+    return {
+        "content": response.choices[0].message.content,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+def _start_call(stage: str) -> float:
+    """Counts an API call as in flight and returns its start time."""
+    METRICS.inc("ideation_api_calls_in_flight", stage=stage or "other")
+    return time.monotonic()
+
+
+def _record_call(stage: str, model: str, latency: float, err: Exception = None) -> None:
+    """Counts a finished API call and its latency in the live metrics."""
+    METRICS.inc("ideation_api_calls_in_flight", -1, stage=stage or "other")
+    if err is None:
+        outcome = "ok"
+    else:
+        outcome = classify_error(err)
+        outcome = "error" if outcome == OK else outcome
+    labels = {"stage": stage or "other", "model": model, "outcome": outcome}
+    METRICS.inc("ideation_api_calls_total", **labels)
+    METRICS.observe("ideation_api_call_seconds", latency, **labels)
+
+
+def _chat_result(model: str, messages: list, stage: str = None, **params) -> dict:
+    """Calls OpenAI chat completions, recording the call's latency against its stage.
+
+    Returns:
+        dict: The reply ``content`` with its ``prompt_tokens`` and ``completion_tokens``.
+    """
+    started = _start_call(stage)
+    try:
+        result = CASSETTE.play(
+            "chat",
+            model,
+            {"model": model, "messages": messages, "params": params},
+            lambda: _request_chat(model, messages, params),
+        )
+    except Exception as err:
+        latency = time.monotonic() - started
+        ROUTER.record(stage, model, latency, ok=False, params=params)
+        _record_call(stage, model, latency, err)
+        raise
+    latency = time.monotonic() - started
+    ROUTER.record(
+        stage,
+        model,
+        latency,
+        prompt_tokens=result["prompt_tokens"],
+        completion_tokens=result["completion_tokens"],
+        params=params,
+    )
+    _record_call(stage, model, latency)
+    return result
+
+
+def _chat_completion(model: str, messages: list, stage: str = None, **params) -> str:
+    """Calls OpenAI chat completions and returns the reply's content."""
+    return _chat_result(model, messages, stage, **params)["content"]
+
+
 def _call_openai_chat(
-    model: str, messages: list, temperature: float = 1.0, top_p: float = 1.0
+    model: str,
+    messages: list,
+    temperature: float = 1.0,
+    top_p: float = 1.0,
+    stage: str = None,
 ) -> str:
     """Helper function to call OpenAI chat completions and clean the response."""
-    response = OPENAI_CLIENT.chat.completions.create(
-        model=model, temperature=temperature, top_p=top_p, messages=messages
+    content = _chat_completion(
+        model, messages, stage, temperature=temperature, top_p=top_p
     )
-    content = response.choices[0].message.content
     if content.startswith('"') and content.endswith('"'):
         content = content[1:-1]
-    return content.strip("```json").strip("```")
+    return strip_code_fences(content).strip()
 
 
-def generate_ideas(artifact: str, technique: str, model: str) -> str:
-    """Generates game ideas using a given ideation technique."""
-    prompt = get_prompt(artifact, technique)
-    messages = [
+def build_ideas_messages(artifact: str, technique: str) -> list:
+    """Builds the chat messages used to apply an ideation technique to an artifact."""
+    prompt, _ = get_prompt(artifact, technique)
+    return [
         {
             "role": "system",
             "content": (
@@ -39,19 +165,161 @@ def generate_ideas(artifact: str, technique: str, model: str) -> str:
         },
         {"role": "user", "content": prompt},
     ]
-    return _call_openai_chat(model, messages)
+
+
+def generate_ideas(artifact: str, technique: str, model: str) -> str:
+    """Generates game ideas using a given ideation technique."""
+    messages = build_ideas_messages(artifact, technique)
+    return _call_openai_chat(ROUTER.route("ideas", model), messages, stage="ideas")
+
+
+def build_refine_messages(
+    idea: str, notes: str, round_number: int, rounds: int
+) -> list:
+    """Builds the chat messages for one round of critique and revision."""
+    return [
+        {
+            "role": "system",
+            "content": GAME_REFINE_PROMPT.format(notes_words=REFINE_NOTES_WORDS),
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Round {round_number} of {rounds}.\n"
+                f"Notes on earlier rounds: {notes or 'none yet'}\n"
+                f"Idea:\n{idea}"
+            ),
+        },
+    ]
+
+
+def refine_idea(
+    idea: str, model: str, rounds: int = DEFAULT_REFINE_ROUNDS, temperature: float = 1.0
+) -> Tuple[str, list]:
+    """Improves an idea over rounds of critique and revision.
+
+    The conversation is not resent: each round sends only the current idea and
+    a rolling summary of the earlier rounds, capped at ``REFINE_NOTES_WORDS``
+    words, so every round costs about the same instead of growing with the
+    number of rounds. A round whose reply has no usable revision ends the
+    refinement early, keeping the idea as it was.
+
+    Returns:
+        tuple: The refined idea and, for each completed round, its ``round``
+        number, ``critique`` and ``notes``.
+    """
+    model = ROUTER.route("refine", model)
+    params = {"temperature": temperature}
+    if model in STRUCTURED_OUTPUT_MODELS:
+        params["response_format"] = {"type": "json_object"}
+    notes = ""
+    history = []
+    for number in range(1, rounds + 1):
+        content = _chat_completion(
+            model,
+            build_refine_messages(idea, notes, number, rounds),
+            "refine",
+            **params,
+        )
+        try:
+            reply = parse_partial_json(content or "")
+        except ValueError as e:
+            print(f"Error: Invalid JSON in refinement round {number}: {e}")
+            break
+        revised = reply.get("idea")
+        if not isinstance(revised, str) or not revised.strip():
+            print(f"Error: Refinement round {number} returned no idea.")
+            break
+        idea = revised.strip()
+        notes = " ".join(str(reply.get("notes") or notes).split()[:REFINE_NOTES_WORDS])
+        history.append(
+            {
+                "round": number,
+                "critique": str(reply.get("critique", "")),
+                "notes": notes,
+            }
+        )
+    return idea, history
+
+
+def generate_agent_turn(
+    system_prompt: str, messages: list, model: str, max_tokens: int
+) -> Tuple[str, int]:
+    """Generates one turn of an ideation agent.
+
+    Args:
+        system_prompt (str): The agent's role.
+        messages (list): The conversation the agent replies to.
+        model (str): The run-level model; the ``agents`` stage may route elsewhere.
+        max_tokens (int): The most completion tokens the turn may use.
+
+    Returns:
+        tuple: The reply and the tokens (prompt and completion) it used.
+    """
+    result = _chat_result(
+        ROUTER.route("agents", model),
+        [{"role": "system", "content": system_prompt}] + messages,
+        "agents",
+        max_completion_tokens=max_tokens,
+    )
+    content = (result["content"] or "").strip()
+    return content, result["prompt_tokens"] + result["completion_tokens"]
+
+
+def build_name_messages(prompt: str) -> list:
+    """Builds the chat messages used to generate a game name."""
+    return [
+        {"role": "system", "content": GAME_NAME_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def build_metadata_messages(prompt_task: str, prompt_name: str) -> list:
+    """Builds the chat messages used to generate game metadata."""
+    return [
+        {"role": "system", "content": GAME_METADATA_PROMPT},
+        {
+            "role": "user",
+            "content": f"The game concept is {prompt_task}, and the name of the game is {prompt_name}. Provide the details.",
+        },
+    ]
+
+
+def build_image_prompt_messages(prompt_task: str, prompt_name: str) -> list:
+    """Builds the chat messages used to generate a cover image prompt."""
+    system_message = "You are a creative assistant that generates detailed image prompts for pixel art game covers."
+    user_message = (
+        f"Generate a detailed image prompt for a pixel art cover image for the game '{prompt_name}' with the theme '{prompt_task}'. "
+        "Include style suggestions, specify that the image should be 1024x1024, and mention the essential cover requirements for itch.io (minimum 315x250, recommended 630x500)."
+    )
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": user_message},
+    ]
 
 
 def generate_name(
     prompt: str, model: str, temperature: float = 1.2, top_p: float = 1.0
 ) -> str:
     """Generates a game name based on a prompt."""
-    model = validate_model(model)
-    messages = [
-        {"role": "system", "content": GAME_NAME_PROMPT},
-        {"role": "user", "content": prompt},
-    ]
-    return _call_openai_chat(model, messages, temperature, top_p)
+    model = ROUTER.route("name", validate_model(model))
+    messages = build_name_messages(prompt)
+    return _call_openai_chat(model, messages, temperature, top_p, stage="name")
+
+
+def _request_metadata(
+    model: str, messages: list, fields: list, temperature: float, top_p: float
+) -> dict:
+    """Requests metadata fields once and returns whatever valid JSON could be recovered."""
+    params = {"temperature": temperature, "top_p": top_p}
+    if model in STRUCTURED_OUTPUT_MODELS:
+        params["response_format"] = metadata_response_format(fields)
+    content = _chat_completion(model, messages, "metadata", **params)
+    try:
+        return parse_partial_json(content or "")
+    except ValueError as e:
+        print(f"Error: Invalid JSON in metadata: {e}")
+        return {}
 
 
 def generate_metadata(
@@ -61,46 +329,127 @@ def generate_metadata(
     temperature: float = 1.0,
     top_p: float = 1.0,
 ) -> dict:
-    """Generates game metadata (short and detailed descriptions with tags) as a JSON object."""
-    model = validate_model(model)
-    messages = [
-        {"role": "system", "content": GAME_METADATA_PROMPT},
-        {
-            "role": "user",
-            "content": f"The game concept is {prompt_task}, and the name of the game is {prompt_name}. Provide the details.",
-        },
+    """Generates game metadata (short and detailed descriptions with tags) as a JSON object.
+
+    Models that support it are constrained to the metadata JSON schema. If the
+    response is still missing fields or has invalid ones, a single follow-up
+    call asks for just those fields. Fields that cannot be repaired are left
+    empty, so the result is always a dictionary.
+    """
+    model = ROUTER.route("metadata", validate_model(model))
+    messages = build_metadata_messages(prompt_task, prompt_name)
+    metadata, missing = validate_metadata(
+        _request_metadata(model, messages, METADATA_FIELDS, temperature, top_p)
+    )
+
+    if missing:
+        print(f"Repairing metadata fields: {', '.join(missing)}")
+        repair_messages = messages + [
+            {"role": "assistant", "content": json.dumps(metadata)},
+            {
+                "role": "user",
+                "content": GAME_METADATA_REPAIR_PROMPT.format(
+                    fields=", ".join(missing)
+                ),
+            },
+        ]
+        repaired, _ = validate_metadata(
+            _request_metadata(model, repair_messages, missing, temperature, top_p)
+        )
+        metadata.update(
+            {field: repaired[field] for field in missing if field in repaired}
+        )
+
+    for field in METADATA_FIELDS:
+        if field not in metadata:
+            print(f"Error: Metadata field '{field}' could not be generated.")
+            metadata[field] = [] if field == "tags" else ""
+
+    return {field: metadata[field] for field in METADATA_FIELDS}
+
+
+def build_rank_messages(ideas: list) -> list:
+    """Builds the chat messages used to score a batch of ideas.
+
+    Args:
+        ideas (list): ``(name, short_description)`` pairs, in order.
+    """
+    listing = "\n".join(
+        f"{number}. {name}: {description}"
+        for number, (name, description) in enumerate(ideas, start=1)
+    )
+    return [
+        {"role": "system", "content": GAME_RANKING_PROMPT},
+        {"role": "user", "content": listing},
     ]
-    response = _call_openai_chat(model, messages, temperature, top_p)
-    if isinstance(response, str):
-        try:
-            metadata_json = json.loads(response)
-        except json.JSONDecodeError as e:
-            print(f"Error: Invalid JSON in metadata: {e}")
-            metadata_json = response
-    else:
-        metadata_json = response
 
-    return metadata_json
+
+def generate_scores(ideas: list, model: str) -> list:
+    """Scores a batch of ideas from 1 to 10 in a single call to a small model.
+
+    Args:
+        ideas (list): ``(name, short_description)`` pairs, in order.
+        model (str): The run-level model; the ``rank`` stage routes to a small model.
+
+    Returns:
+        list: One score per idea, or ``None`` where the model gave no usable score.
+    """
+    content = _chat_completion(
+        ROUTER.route("rank", model),
+        build_rank_messages(ideas),
+        stage="rank",
+        temperature=0.0,
+    )
+    try:
+        scores = parse_partial_json(content or "").get("scores", [])
+    except (ValueError, AttributeError) as e:
+        print(f"Error: Invalid JSON in scores: {e}")
+        scores = []
+    scores = [s if isinstance(s, (int, float)) else None for s in scores]
+    return (scores + [None] * len(ideas))[: len(ideas)]
+
+
+def generate_embeddings(texts: list, model: str = EMBEDDING_MODEL) -> list:
+    """Embeds a batch of texts with the provider's embedding model.
+
+    Args:
+        texts (list): The texts to embed.
+        model (str): The embedding model.
+
+    Returns:
+        list: One embedding (a list of floats) per text, in order.
+    """
+    return CASSETTE.play(
+        "embedding",
+        model,
+        {"model": model, "input": texts},
+        lambda: [
+            item.embedding
+            for item in ENDPOINT_POOL.call(
+                OPENAI_CLIENT,
+                model,
+                lambda client, endpoint_model: client.embeddings.create(
+                    model=endpoint_model, input=texts
+                ),
+            ).data
+        ],
+    )
 
 
 def generate_image_prompt(
-    prompt_task: str, prompt_name: str, model: str = "gpt-4", temperature: float = 0.7
+    prompt_task: str, prompt_name: str, model: str = None, temperature: float = 0.7
 ) -> str:
-    """Generates a detailed image prompt for cover art by calling the OpenAI chat API."""
-    system_message = "You are a creative assistant that generates detailed image prompts for pixel art game covers."
-    user_message = (
-        f"Generate a detailed image prompt for a pixel art cover image for the game '{prompt_name}' with the theme '{prompt_task}'. "
-        "Include style suggestions, specify that the image should be 1024x1024, and mention the essential cover requirements for itch.io (minimum 315x250, recommended 630x500)."
-    )
-    response = OPENAI_CLIENT.chat.completions.create(
-        model=model,
+    """Generates a detailed image prompt for cover art by calling the OpenAI chat API.
+
+    The model is taken from the routing table's ``image_prompt`` stage, falling
+    back to ``model`` only when the table leaves the stage unassigned.
+    """
+    content = _chat_completion(
+        ROUTER.route("image_prompt", model),
+        build_image_prompt_messages(prompt_task, prompt_name),
+        stage="image_prompt",
         temperature=temperature,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": user_message},
-        ],
     )
-    content = response.choices[0].message.content
     # Remove unintended leading/trailing quotes, if any.
     if content.startswith('"') and content.endswith('"'):
         content = content[1:-1]
@@ -111,32 +460,74 @@ def generate_cover(
     prompt_task: str,
     prompt_name: str,
     dir_path: str,
-    prompt_model: str = "gpt-4",
+    prompt_model: str = None,
     temperature: float = 0.7,
 ) -> Tuple[str, str]:
     """Generates and saves a pixel art cover image for a game, returning the image path.
 
     It first generates a detailed image prompt using the OpenAI chat API, then uses that prompt to generate the image.
+    When the cover store is enabled, a cover previously generated for the same task
+    and name is linked into ``dir_path`` instead, skipping both calls.
     """
+    image_path = os.path.join(dir_path, "cover.png")
     try:
-        # Generate the image prompt via OpenAI Chat API.
-        image_prompt = generate_image_prompt(
-            prompt_task, prompt_name, model=prompt_model, temperature=temperature
-        )
+        with COVER_STORE.key_lock(prompt_task, prompt_name, IMAGE_PARAMS):
+            cached = COVER_STORE.lookup(prompt_task, prompt_name, IMAGE_PARAMS)
+            if COVER_STORE.enabled:
+                METRICS.inc(
+                    "ideation_cache_requests_total",
+                    cache="cover",
+                    outcome="miss" if cached is None else "hit",
+                )
+            if cached is not None:
+                object_path, image_prompt = cached
+                print("Reusing cached cover image.")
+                return COVER_STORE.link_into(object_path, image_path), image_prompt
 
-        # Use the generated prompt to create the image.
-        response = OPENAI_CLIENT.images.generate(
-            model="dall-e-3",
-            prompt=image_prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1,
-        )
-        image_url = response.data[0].url
-        image_path = os.path.join(dir_path, "cover.png")
-        image_data = requests.get(image_url).content
-        with open(image_path, "wb") as file:
-            file.write(image_data)
+            # Generate the image prompt via OpenAI Chat API.
+            image_prompt = generate_image_prompt(
+                prompt_task, prompt_name, model=prompt_model, temperature=temperature
+            )
+
+            # Use the generated prompt to create the image.
+            started = _start_call("image")
+            try:
+                image_url = CASSETTE.play(
+                    "image",
+                    IMAGE_MODEL,
+                    {"prompt": image_prompt, "params": IMAGE_PARAMS},
+                    lambda: ENDPOINT_POOL.call(
+                        OPENAI_CLIENT,
+                        IMAGE_MODEL,
+                        lambda client, endpoint_model: client.images.generate(
+                            prompt=image_prompt,
+                            n=1,
+                            **dict(IMAGE_PARAMS, model=endpoint_model),
+                        ),
+                    )
+                    .data[0]
+                    .url,
+                )
+                image_data = CASSETTE.play(
+                    "download",
+                    IMAGE_MODEL,
+                    {"url": image_url},
+                    lambda: TRANSPORT.download(image_url),
+                )
+            except Exception as err:
+                _record_call("image", IMAGE_MODEL, time.monotonic() - started, err)
+                raise
+            latency = time.monotonic() - started
+            ROUTER.record("image", IMAGE_MODEL, latency)
+            _record_call("image", IMAGE_MODEL, latency)
+            METRICS.inc("ideation_downloaded_bytes_total", len(image_data))
+
+            if COVER_STORE.enabled:
+                object_path = COVER_STORE.add(
+                    prompt_task, prompt_name, IMAGE_PARAMS, image_prompt, image_data
+                )
+                return COVER_STORE.link_into(object_path, image_path), image_prompt
+        write_bytes(image_path, image_data)
         return image_path, image_prompt
     except Exception as err:
         raise RuntimeError("Failed to generate cover image") from err
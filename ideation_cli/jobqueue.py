@@ -0,0 +1,317 @@
+"""
+jobqueue.py - SQLite-backed job queue for very large runs.
+
+A run of thousands of ideas is too much for one process, and a crash should
+not lose the ideas still to come. ``ideation-cli enqueue`` expands a run into
+one job per idea and stores the jobs in an SQLite database. Any number of
+``ideation-cli worker`` processes, on one machine or on several machines
+sharing the output directory, then lease jobs from it, generate the idea and
+acknowledge the job once its files are written.
+
+A lease expires after ``--lease`` seconds. A job whose worker died is
+leased again by the next worker that asks, up to ``MAX_ATTEMPTS`` attempts,
+after which it is marked failed. Leasing takes SQLite's write lock, so two
+workers never get the same job. Note that SQLite locking relies on the
+shared filesystem's lock support.
+
+Classes:
+    - JobQueue: The job table, with enqueue, lease, ack and fail.
+
+Functions:
+    - enqueue_main(argv): Run the ``enqueue`` subcommand.
+    - worker_main(argv): Run the ``worker`` subcommand.
+    - work(args): Process jobs until the queue is finished.
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+
+from ideation_cli.cli import (
+    configure_agents,
+    configure_cassette,
+    configure_chains,
+    configure_cover_store,
+    configure_endpoints,
+    configure_routing,
+    configure_sampler,
+    configure_transport,
+    process_game_iteration,
+)
+from ideation_cli.server import JOB_OPTIONS, job_args, job_parser
+from ideation_cli.utils import build_parser
+from ideation_cli.writer import WRITER
+
+QUEUE_FILENAME = ".queue.sqlite3"
+
+# Seconds a leased job is reserved for its worker.
+DEFAULT_LEASE = 300
+
+# Attempts after which a job is marked failed instead of being leased again.
+MAX_ATTEMPTS = 3
+
+# Seconds an idle worker waits before asking for a job again.
+DEFAULT_POLL = 5
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT
+)
+"""
+
+
+class JobQueue:
+    """A queue of idea jobs stored in an SQLite database."""
+
+    def __init__(self, path, clock=time.time, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.clock = clock
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; transactions are started explicitly where needed.
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._connection.execute(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def enqueue(self, jobs):
+        """
+        Adds jobs to the queue.
+
+        Args:
+            jobs (list): The options of each job.
+
+        Returns:
+            int: The number of jobs added.
+        """
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.executemany(
+                "INSERT INTO jobs (options) VALUES (?)",
+                [(json.dumps(options),) for options in jobs],
+            )
+        return len(jobs)
+
+    def lease(self, worker, seconds=DEFAULT_LEASE):
+        """
+        Leases the oldest pending job, or a job whose lease has expired.
+
+        Args:
+            worker (str): The leasing worker's ID.
+            seconds (float): How long the lease lasts.
+
+        Returns:
+            tuple: The job ID and its options, or None when nothing can be leased.
+        """
+        now = self.clock()
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            # Expired leases whose job is out of attempts are failed first.
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease expired' "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts),
+            )
+            row = self._connection.execute(
+                "SELECT id, options FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (LEASED, worker, now + seconds, row[0]),
+            )
+        return row[0], json.loads(row[1])
+
+    def ack(self, job_id, worker, result=None):
+        """
+        Marks a leased job done.
+
+        Returns:
+            bool: False if the worker no longer held the lease, e.g. because it
+            expired and another worker took the job.
+        """
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_expires = NULL "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (DONE, result, job_id, LEASED, worker),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Releases a job that failed, marking it failed once it is out of attempts."""
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_expires = NULL WHERE id = ? AND status = ? AND worker = ?",
+                (self.max_attempts, FAILED, PENDING, error, job_id, LEASED, worker),
+            )
+        return cursor.rowcount == 1
+
+    def counts(self):
+        """Returns the number of jobs in each status."""
+        counts = dict.fromkeys([PENDING, LEASED, DONE, FAILED], 0)
+        for status, count in self._connection.execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+
+
+def _add_queue_argument(parser):
+    parser.add_argument(
+        "--queue",
+        type=str,
+        help=f"The job queue database (default: {QUEUE_FILENAME} in --path).",
+    )
+
+
+def _queue_path(args):
+    return args.queue or os.path.join(args.path, QUEUE_FILENAME)
+
+
+def _format_counts(counts):
+    return ", ".join(f"{count} {status}" for status, count in counts.items())
+
+
+def enqueue_main(argv=None):
+    """Runs the ``enqueue`` subcommand: expands a run into one job per idea."""
+    parser = build_parser()
+    parser.prog = "ideation-cli enqueue"
+    parser.description = "Add the ideas of a run to the job queue."
+    _add_queue_argument(parser)
+    args = parser.parse_args(argv)
+    if args.top_k:
+        parser.error("--top-k needs every idea of a run and cannot be queued.")
+
+    options = {
+        option: getattr(args, option)
+        for option in JOB_OPTIONS
+        if getattr(args, option) not in (None, False)
+    }
+    options["count"] = 1
+    queue = JobQueue(_queue_path(args))
+    try:
+        added = queue.enqueue([options] * args.count)
+        print(
+            f"Enqueued {added} job(s) to {queue.path} ({_format_counts(queue.counts())})."
+        )
+    finally:
+        queue.close()
+
+
+def work(args):
+    """
+    Leases and processes jobs until none are pending or leased, or until
+    ``--max-jobs`` jobs were processed.
+
+    Each job's files are flushed to disk before the job is acknowledged, so
+    a worker crash never acknowledges an idea that was not saved.
+    """
+    configure_routing(args)
+    configure_transport(args)
+    configure_endpoints(args)
+    configure_cassette(args)
+    configure_cover_store(args)
+    configure_sampler(args)
+    configure_chains(args)
+    configure_agents(args)
+    queue = JobQueue(_queue_path(args))
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    parser = job_parser()
+    processed = 0
+    WRITER.start()
+    try:
+        while args.max_jobs is None or processed < args.max_jobs:
+            job = queue.lease(worker, args.lease)
+            if job is None:
+                counts = queue.counts()
+                if not counts[PENDING] and not counts[LEASED]:
+                    break
+                # Other workers hold the remaining jobs; retry in case a lease expires.
+                time.sleep(args.poll)
+                continue
+
+            job_id, options = job
+            processed += 1
+            try:
+                result = process_game_iteration(job_args(parser, args, options))
+                WRITER.flush()
+            except Exception as err:
+                print(f"Error: Job {job_id} failed: {err}")
+                queue.fail(job_id, worker, str(err))
+                continue
+            if not queue.ack(job_id, worker, result[0] if result else None):
+                print(f"Job {job_id} lost its lease; another worker may repeat it.")
+        print(f"Worker {worker} finished ({_format_counts(queue.counts())}).")
+    finally:
+        WRITER.close()
+        queue.close()
+
+
+def worker_main(argv=None):
+    """Runs the ``worker`` subcommand, in ``--processes`` processes."""
+    parser = build_parser()
+    parser.prog = "ideation-cli worker"
+    parser.description = "Process jobs from the job queue."
+    _add_queue_argument(parser)
+    group = parser.add_argument_group("worker")
+    group.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE,
+        help="Seconds a job is reserved; jobs of dead workers are retried after this.",
+    )
+    group.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="How many worker processes to run on this machine.",
+    )
+    group.add_argument(
+        "--max-jobs",
+        type=int,
+        help="Stop each worker process after this many jobs.",
+    )
+    group.add_argument(
+        "--poll",
+        type=float,
+        default=DEFAULT_POLL,
+        help="Seconds an idle worker waits before asking for a job again.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        work(args)
+        return
+    processes = [
+        multiprocessing.Process(target=work, args=(args,))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
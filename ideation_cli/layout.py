@@ -0,0 +1,209 @@
+"""
+layout.py - Where ideas are saved under the output path.
+
+Two layouts are supported, chosen with ``--layout``:
+
+- ``flat`` (the default) saves an idea in ``<game_type>/<name>_<timestamp>``.
+- ``sharded`` saves it in ``<game_type>/ab/cd/<name>_<timestamp>_<suffix>``,
+  where ``ab/cd`` are the first hex digits of a hash of the idea's ID. No
+  directory then holds more than 256 shards, so listing a game type and
+  creating an idea directory stay fast with hundreds of thousands of ideas.
+
+Idea directories are created exclusively. In the flat layout an idea that
+would take an existing directory, such as two ideas with the same name in
+the same second, gets a random suffix instead; in the sharded layout every
+ID carries one. Either way no idea is written into another's directory.
+
+``ideation-cli migrate`` moves the ideas of an existing tree into a layout.
+Each idea directory is renamed into place, its ``metadata.json`` cover
+path is updated, and so are the paths of the embedding index.
+
+Functions:
+    - shard(game_id): The shard directories of an idea ID.
+    - make_idea_dir(root, game_type, base_id, layout): Create a new idea's directory.
+    - idea_dir_path(root, game_type, dir_name, layout): Where an idea belongs in a layout.
+    - migrate(root, layout): Move every idea of a tree into a layout.
+    - migrate_main(argv): Run the ``migrate`` subcommand.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+
+from ideation_cli import LAYOUTS
+from ideation_cli.utils import iter_idea_dirs
+from ideation_cli.writer import write_json
+
+# Hex digits of the random suffix that makes an idea ID unique.
+SUFFIX_DIGITS = 8
+
+# Attempts at creating a directory before giving up; a collision is already unlikely.
+MAX_ATTEMPTS = 16
+
+
+def shard(game_id):
+    """Returns the two shard directories of an idea ID, e.g. ``("3f", "a0")``."""
+    digest = hashlib.sha256(game_id.encode("utf-8")).hexdigest()
+    return digest[:2], digest[2:4]
+
+
+def _safe_dir_name(game_id):
+    return (
+        game_id.replace("Title:", "")
+        .replace('"', "")
+        .replace(" ", "_")
+        .replace("/", "_")
+        .replace(os.sep, "_")
+    )
+
+
+def _game_dir(game_type):
+    return game_type.replace(" ", "") if game_type else "default"
+
+
+def idea_dir_path(root, game_dir, dir_name, layout):
+    """Returns the directory of an idea in a layout."""
+    if layout == "sharded":
+        return os.path.join(root, game_dir, *shard(dir_name), dir_name)
+    return os.path.join(root, game_dir, dir_name)
+
+
+def make_idea_dir(root, game_type, base_id, layout="flat"):
+    """
+    Creates the directory of a new idea.
+
+    Args:
+        root (str): The output path.
+        game_type (str): The idea's game type.
+        base_id (str): The ID derived from the idea's name.
+        layout (str): One of ``LAYOUTS``.
+
+    Returns:
+        tuple: The new directory and the idea's ID.
+
+    Raises:
+        FileExistsError: If no free directory was found, which is vanishingly unlikely.
+    """
+    game_id = f"{base_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    candidate = game_id
+    if layout == "sharded":
+        candidate = f"{game_id}_{uuid.uuid4().hex[:SUFFIX_DIGITS]}"
+    for _ in range(MAX_ATTEMPTS):
+        dir_path = idea_dir_path(
+            root, _game_dir(game_type), _safe_dir_name(candidate), layout
+        )
+        os.makedirs(os.path.dirname(dir_path), exist_ok=True)
+        try:
+            os.mkdir(dir_path)
+        except FileExistsError:
+            candidate = f"{game_id}_{uuid.uuid4().hex[:SUFFIX_DIGITS]}"
+            continue
+        return dir_path, candidate
+    raise FileExistsError(f"No free directory for idea {game_id} under {root}")
+
+
+def _remove_empty_parents(path, stop):
+    """Removes empty directories from ``path`` up to, but not including, ``stop``."""
+    stop = os.path.abspath(stop)
+    path = os.path.abspath(path)
+    while path != stop and path.startswith(stop + os.sep):
+        try:
+            os.rmdir(path)
+        except OSError:
+            return
+        path = os.path.dirname(path)
+
+
+def _update_cover_path(root, old, new):
+    """
+    Points a moved idea's recorded cover at its new directory.
+
+    ``image_path`` is kept as it was written, often relative to the directory
+    the run started in, so it is matched on the idea's ``old`` path under the
+    output root and rewritten under the same leading directories.
+    """
+    metadata_path = os.path.join(root, new, "metadata.json")
+    try:
+        with open(metadata_path, "r", encoding="utf-8") as file:
+            metadata = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return
+    cover = metadata.get("cover")
+    if not isinstance(cover, dict) or not cover.get("image_path"):
+        return
+    stored_dir, name = os.path.split(os.path.normpath(cover["image_path"]))
+    stored_parts = stored_dir.split(os.sep)
+    old_parts = old.split(os.sep)
+    if stored_parts[-len(old_parts) :] != old_parts:
+        return
+    prefix = stored_parts[: -len(old_parts)]
+    cover["image_path"] = os.sep.join(prefix + new.split(os.sep) + [name])
+    write_json(metadata_path, metadata)
+
+
+def migrate(root, layout, dry_run=False):
+    """
+    Moves every idea under an output path into a layout.
+
+    An idea's game type is the first directory of its path, and its ID the
+    last, so trees in either layout can be migrated to the other.
+
+    Args:
+        root (str): The output path.
+        layout (str): One of ``LAYOUTS``.
+        dry_run (bool): Only report the moves.
+
+    Returns:
+        list: ``(old, new)`` directory pairs relative to ``root``.
+    """
+    moves = []
+    for dir_path in list(iter_idea_dirs(root)):
+        relative = os.path.relpath(dir_path, root)
+        parts = relative.split(os.sep)
+        if len(parts) < 2:
+            continue
+        target = idea_dir_path(root, parts[0], parts[-1], layout)
+        if os.path.normpath(target) == os.path.normpath(dir_path):
+            continue
+        if os.path.exists(target):
+            print(f"Skipping {relative}: {os.path.relpath(target, root)} exists.")
+            continue
+        moves.append((relative, os.path.relpath(target, root)))
+        if dry_run:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.rename(dir_path, target)
+        _update_cover_path(root, relative, moves[-1][1])
+        _remove_empty_parents(os.path.dirname(dir_path), os.path.join(root, parts[0]))
+    if moves and not dry_run:
+        # Imported here so saving an idea does not pay for the embedding module.
+        from ideation_cli.embeddings import relocate_index
+
+        relocate_index(root, dict(moves))
+    return moves
+
+
+def migrate_main(argv=None):
+    """Runs the ``migrate`` subcommand: moves saved ideas into a layout."""
+    parser = argparse.ArgumentParser(
+        prog="ideation-cli migrate",
+        description="Move saved ideas into the flat or sharded layout.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--path", type=str, default="ideas", help="Directory where ideas are saved."
+    )
+    parser.add_argument(
+        "--layout", choices=LAYOUTS, default="sharded", help="The layout to move to."
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only list the moves.")
+    args = parser.parse_args(argv)
+
+    moves = migrate(args.path, args.layout, args.dry_run)
+    for old, new in moves:
+        print(f"{old} -> {new}")
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {len(moves)} idea(s) to the {args.layout} layout.")
@@ -0,0 +1,374 @@
+"""
+metrics.py - Live metrics for long-running campaigns.
+
+The CLI counts its API calls, retries, rate-limited responses, cache hits,
+downloaded bytes and completed ideas, and times every call in a latency
+histogram. Metrics are labelled by ``stage``, ``model`` and ``outcome``
+where those apply, and rendered in the Prometheus text format, so existing
+dashboards can follow the throughput of an overnight run and spot stalls
+while it is going.
+
+They are exported in one of two ways:
+
+- ``--metrics-port PORT`` serves them at ``http://127.0.0.1:PORT/metrics``.
+- ``--metrics-file FILE`` writes them to a textfile every
+  ``--metrics-interval`` seconds and at exit, atomically, for the node
+  exporter's textfile collector.
+
+``ideation-cli serve`` also serves them at ``/metrics`` on its own API.
+
+Classes:
+    - Metrics: The metric values and their exporters.
+
+Constants:
+    - METRIC_DEFINITIONS: The type and help text of every metric.
+    - LATENCY_BUCKETS: The upper bounds of the latency histogram buckets.
+    - METRICS: The process-wide metrics.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ideation_cli.writer import WRITER, atomic_write
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_INTERVAL = 15.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the latency buckets, in seconds.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+METRIC_DEFINITIONS = {
+    "ideation_api_calls_total": (
+        "counter",
+        "API calls by stage, model and outcome (ok, rate_limited, failed, error).",
+    ),
+    "ideation_api_calls_in_flight": (
+        "gauge",
+        "API calls waiting on a response, by stage.",
+    ),
+    "ideation_api_call_seconds": (
+        "histogram",
+        "Latency of API calls by stage, model and outcome.",
+    ),
+    "ideation_api_retries_total": (
+        "counter",
+        "Requests retried, by source: the API client, or another endpoint of the pool.",
+    ),
+    "ideation_rate_limited_responses_total": (
+        "counter",
+        "HTTP 429 responses, including those retried by the API client.",
+    ),
+    "ideation_cache_requests_total": (
+        "counter",
+        "Cover store and prefetched idea lookups by cache and outcome (hit, miss).",
+    ),
+    "ideation_downloaded_bytes_total": (
+        "counter",
+        "Bytes of cover images downloaded.",
+    ),
+    "ideation_ideas_total": (
+        "counter",
+        "Ideas finished by outcome (ok, skipped, error).",
+    ),
+    "ideation_ideas_in_flight": (
+        "gauge",
+        "Ideas being generated.",
+    ),
+    "ideation_metadata_saves_total": (
+        "counter",
+        "Idea metadata files saved.",
+    ),
+    "ideation_writer_queue_depth": (
+        "gauge",
+        "Writes waiting on the background writer.",
+    ),
+    "ideation_last_idea_timestamp_seconds": (
+        "gauge",
+        "Unix time the last idea finished; a stalled run stops advancing it.",
+    ),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    """Bucket counts, sum and count of the observations of one label set."""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class Metrics:
+    """Counters, gauges and histograms, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._collectors = {}
+        self._server = None
+        self._textfile = None
+        self._stopping = None
+        self._thread = None
+
+    @staticmethod
+    def _key(name, labels):
+        if name not in METRIC_DEFINITIONS:
+            raise KeyError(f"Unknown metric: {name}")
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        """Adds ``amount`` to a counter or gauge."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Sets a gauge."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def observe(self, name, value, **labels):
+        """Records an observation in a histogram."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._values.setdefault(key, _Histogram()).observe(value)
+
+    def collect(self, name, function):
+        """Reads a gauge from ``function`` each time the metrics are rendered."""
+        self._key(name, {})
+        with self._lock:
+            self._collectors[name] = function
+
+    def value(self, name, **labels):
+        """Returns a counter or gauge value, or a histogram's observation count."""
+        key = self._key(name, labels)
+        with self._lock:
+            value = self._values.get(key, 0)
+        return value.count if isinstance(value, _Histogram) else value
+
+    def total(self, name, **labels):
+        """Returns the sum of a counter or gauge over every series matching ``labels``."""
+        self._key(name, labels)
+        wanted = {(key, str(value)) for key, value in labels.items()}
+        with self._lock:
+            return sum(
+                value
+                for (metric, series), value in self._values.items()
+                if metric == name
+                and wanted <= set(series)
+                and not isinstance(value, _Histogram)
+            )
+
+    def quantile(self, name, fraction, **labels):
+        """
+        Estimates a quantile of a histogram over every series matching ``labels``.
+
+        The value is interpolated linearly within its bucket, as Prometheus'
+        ``histogram_quantile`` does.
+
+        Returns:
+            float: The estimate, or None without observations.
+        """
+        self._key(name, labels)
+        wanted = {(key, str(value)) for key, value in labels.items()}
+        buckets = [0] * len(LATENCY_BUCKETS)
+        count = 0
+        with self._lock:
+            for (metric, series), value in self._values.items():
+                if metric != name or not wanted <= set(series):
+                    continue
+                count += value.count
+                buckets = [a + b for a, b in zip(buckets, value.buckets)]
+        if not count:
+            return None
+        rank = fraction * count
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(LATENCY_BUCKETS, buckets):
+            if cumulative >= rank:
+                inside = cumulative - below
+                return lower + (bound - lower) * (
+                    (rank - below) / inside if inside else 1
+                )
+            lower, below = bound, cumulative
+        # Beyond the last bucket there is no upper bound to interpolate to.
+        return LATENCY_BUCKETS[-1]
+
+    def reset(self):
+        """Clears every recorded value, keeping the collectors."""
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, sorted by name and labels so successive
+            renderings can be compared line by line.
+        """
+        with self._lock:
+            collectors = dict(self._collectors)
+        collected = {}
+        for name, function in collectors.items():
+            try:
+                collected[(name, ())] = function()
+            except Exception:
+                continue  # A failing collector must not break the export.
+
+        with self._lock:
+            values = dict(self._values)
+            for key, value in values.items():
+                if isinstance(value, _Histogram):
+                    copied = _Histogram()
+                    copied.buckets = list(value.buckets)
+                    copied.sum, copied.count = value.sum, value.count
+                    values[key] = copied
+        values.update(collected)
+
+        lines = []
+        for name, (kind, description) in sorted(METRIC_DEFINITIONS.items()):
+            series = sorted(
+                (
+                    (labels, value)
+                    for (metric, labels), value in values.items()
+                    if metric == name
+                ),
+                key=lambda item: item[0],
+            )
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(
+                        f"{name}{_format_labels(labels)} {_format_value(value)}"
+                    )
+                    continue
+                for bound, count in zip(
+                    LATENCY_BUCKETS + (float("inf"),), value.buckets + [value.count]
+                ):
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value.sum!r}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Writes the metrics to ``path`` atomically, for a textfile collector."""
+        atomic_write(path, self.render().encode("utf-8"))
+
+    def start(
+        self, port=None, textfile=None, interval=DEFAULT_INTERVAL, host=DEFAULT_HOST
+    ):
+        """
+        Starts exporting the metrics.
+
+        Args:
+            port (int): Serve ``/metrics`` on this port; 0 picks a free port.
+            textfile (str): Rewrite this file every ``interval`` seconds.
+            interval (float): Seconds between textfile writes.
+            host (str): Address the metrics server listens on.
+
+        Returns:
+            tuple: The address the server listens on, or None without a port.
+        """
+        self.stop()
+        address = None
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+            self._server.daemon_threads = True
+            self._server.metrics = self
+            threading.Thread(
+                target=self._server.serve_forever, name="ideation-metrics", daemon=True
+            ).start()
+            address = self._server.server_address[:2]
+        if textfile:
+            self._textfile = textfile
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(
+                target=self._write_periodically,
+                args=(interval,),
+                name="ideation-metrics-file",
+                daemon=True,
+            )
+            self._thread.start()
+        return address
+
+    def _write_periodically(self, interval):
+        while not self._stopping.wait(interval):
+            try:
+                self.write_textfile(self._textfile)
+            except OSError as err:
+                print(f"Error: Failed to write metrics to {self._textfile}: {err}")
+
+    def stop(self):
+        """Stops the exporters, writing the textfile one last time."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            try:
+                self.write_textfile(self._textfile)
+            except OSError as err:
+                print(f"Error: Failed to write metrics to {self._textfile}: {err}")
+            self._textfile = None
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the metrics at ``/metrics``."""
+
+    server_version = "ideation-cli"
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        send_metrics(self, self.server.metrics)
+
+    def log_message(self, *args):
+        pass  # Scrapes every few seconds would drown the run's own output.
+
+
+def send_metrics(handler, metrics):
+    """Writes the metrics as the response of an HTTP request handler."""
+    body = metrics.render().encode("utf-8")
+    handler.send_response(200)
+    handler.send_header("Content-Type", CONTENT_TYPE)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+METRICS = Metrics()
+METRICS.collect("ideation_writer_queue_depth", lambda: WRITER.depth)
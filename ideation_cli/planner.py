@@ -0,0 +1,415 @@
+"""
+planner.py - Dry-run planning for the Ideation CLI.
+
+This module expands a run into the chat and image calls it would make,
+without calling any API. Prompts are built with the same code the generator
+uses, so the estimates follow any change to the prompts. Prompt tokens are
+counted locally with `tiktoken` when it is installed (falling back to a
+characters-per-token heuristic), completion tokens and latencies come from
+the budget defaults, and costs from the budget price table. Covers that the
+cover store already holds are planned as free, and so are ideas that take a
+leaf a technique chain already produced. Chain steps are planned as uncached,
+and agent turns as if every turn fits the idea's token allowance.
+
+Functions:
+    - count_tokens(text, model): Count the tokens of a text for a model.
+    - count_message_tokens(messages, model): Count the prompt tokens of a chat request.
+    - build_plan(args): Expand the run into planned calls and warnings.
+    - summarize_plan(plan, args): Total the planned calls per stage and for the run.
+    - print_plan(plan, args): Print the plan as a table.
+
+Constants:
+    - THEME_TOKEN_WARNING: Theme size in tokens above which a warning is raised.
+    - PROMPT_TOKEN_WARNING: Prompt size in tokens above which a call is flagged.
+"""
+
+import contextlib
+import io
+import math
+from functools import lru_cache
+
+from ideation_cli.agents import BRIEF, REVISION_REQUEST, ROLES
+from ideation_cli.budget import (
+    DEFAULT_STAGE_LATENCY,
+    DEFAULT_STAGE_TOKENS,
+    IMAGE_PRICING,
+    IMAGE_STAGES,
+    estimate_cost,
+)
+from ideation_cli.chains import (
+    CHAINS,
+    MAX_BRANCH_WORKERS,
+    chain_stages,
+    leaves_per_chain,
+)
+from ideation_cli.covers import COVER_STORE
+from ideation_cli.generator import (
+    DEFAULT_REFINE_ROUNDS,
+    IMAGE_MODEL,
+    IMAGE_PARAMS,
+    REFINE_NOTES_WORDS,
+    build_ideas_messages,
+    build_image_prompt_messages,
+    build_metadata_messages,
+    build_name_messages,
+    build_rank_messages,
+    build_refine_messages,
+)
+from ideation_cli.routing import ROUTER
+from ideation_cli.strategies import (
+    apply_ideation_technique,
+    generate_random_game_prompt,
+)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+THEME_TOKEN_WARNING = 500
+PROMPT_TOKEN_WARNING = 4000
+
+# Characters per token used when tiktoken is not available.
+CHARS_PER_TOKEN = 4
+
+# Tokens added by the chat format for every message and for the reply priming.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Stand-in for the generated name when planning the calls that use it.
+PLACEHOLDER_NAME = "Placeholder Game Name"
+
+# Stand-in for the output of a technique chain stage when planning the next one.
+PLACEHOLDER_CHAIN_OUTPUT = (
+    "A few paragraphs developing the game idea with the previous technique, "
+    "describing its mechanics, setting, characters and what makes it different."
+)
+
+# Stand-in for the rolling notes of earlier refinement rounds.
+PLACEHOLDER_NOTES = " ".join(["change"] * REFINE_NOTES_WORDS)
+
+# Stand-in for a generated short description when planning the ranking call.
+PLACEHOLDER_DESCRIPTION = (
+    "A one or two sentence pitch for the game, describing its core mechanic, "
+    "setting and what makes it different."
+)
+
+
+@lru_cache(maxsize=None)
+def _encoding_for(model):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # Encodings are downloaded on first use and may be unavailable.
+        return None
+
+
+def count_tokens(text, model):
+    """
+    Counts the tokens of a text for a model.
+
+    Args:
+        text (str): The text to count.
+        model (str): The model whose tokenizer should be used.
+
+    Returns:
+        int: The number of tokens, estimated from the length when no tokenizer is available.
+    """
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model):
+    """Counts the prompt tokens of a chat request, including the message overhead."""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"], model)
+        for message in messages
+    )
+
+
+def _planned_call(stage, model, messages):
+    prompt_tokens = count_message_tokens(messages, model)
+    completion_tokens = DEFAULT_STAGE_TOKENS[stage][1]
+    return {
+        "stage": stage,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "latency": DEFAULT_STAGE_LATENCY[stage],
+        "cost": estimate_cost(model, prompt_tokens, completion_tokens),
+    }
+
+
+def _planned_image_call():
+    return {
+        "stage": "image",
+        "model": IMAGE_MODEL,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "latency": DEFAULT_STAGE_LATENCY["image"],
+        "cost": IMAGE_PRICING[IMAGE_MODEL],
+    }
+
+
+def _planned_refine_calls(task, model, rounds):
+    """Plans the critique and revision rounds of the round_robin technique."""
+    model = ROUTER.route("refine", model)
+    return [
+        _planned_call(
+            "refine",
+            model,
+            build_refine_messages(
+                task if number == 1 else PLACEHOLDER_CHAIN_OUTPUT,
+                PLACEHOLDER_NOTES if number > 1 else "",
+                number,
+                rounds,
+            ),
+        )
+        for number in range(1, rounds + 1)
+    ]
+
+
+def _planned_agent_calls(task, model):
+    """Plans the concurrent first turns of the agents and the designer's revision."""
+    model = ROUTER.route("agents", model)
+    brief = [{"role": "user", "content": BRIEF.format(task=task)}]
+    calls = [
+        _planned_call("agents", model, [{"role": "system", "content": prompt}] + brief)
+        for prompt in ROLES.values()
+    ]
+    for call in calls:
+        # The first turns run concurrently, so they share one turn's wall time.
+        call["latency"] /= len(calls)
+    revision = REVISION_REQUEST.format(
+        critic=PLACEHOLDER_NOTES, marketer=PLACEHOLDER_NOTES
+    )
+    calls.append(
+        _planned_call(
+            "agents",
+            model,
+            [{"role": "system", "content": ROLES["designer"]}]
+            + brief
+            + [
+                {"role": "assistant", "content": PLACEHOLDER_CHAIN_OUTPUT},
+                {"role": "user", "content": revision},
+            ],
+        )
+    )
+    return calls
+
+
+def _planned_chain_calls(task, stages, model, rounds):
+    """Plans the calls of one run of a technique chain on a task."""
+    calls = []
+    branches = 1
+    for depth, (technique, count) in enumerate(stages):
+        branches *= count
+        artifact = task if depth == 0 else PLACEHOLDER_CHAIN_OUTPUT
+        if technique == "round_robin":
+            stage_calls = _planned_refine_calls(artifact, model, rounds)
+        else:
+            messages = build_ideas_messages(artifact, technique)
+            stage_calls = [
+                _planned_call("ideas", ROUTER.route("ideas", model), messages)
+            ]
+        for call in stage_calls:
+            # The branches of a stage run concurrently, so they share its wall time.
+            call["latency"] *= math.ceil(branches / MAX_BRANCH_WORKERS) / branches
+            calls.extend(dict(call) for _ in range(branches))
+    return calls
+
+
+def build_plan(args):
+    """
+    Expands the run described by ``args`` into the calls it would make.
+
+    Random prompts and ideation techniques are resolved locally, exactly as a
+    real run would, but their progress messages are suppressed.
+
+    Args:
+        args: The parsed command-line arguments.
+
+    Returns:
+        dict: ``ideas``, a list with the planned calls for each idea, and
+        ``warnings``, a list of messages about oversized prompts.
+    """
+    warnings = []
+    if args.theme:
+        theme_tokens = count_tokens(args.theme, args.model)
+        if theme_tokens > THEME_TOKEN_WARNING:
+            warnings.append(
+                f"Theme is {theme_tokens} tokens; it is repeated in every prompt of every idea."
+            )
+
+    stages = chain_stages(args.ideation_technique)
+    leaves = CHAINS.pending(args) if stages else 0
+    rounds = getattr(args, "rounds", DEFAULT_REFINE_ROUNDS)
+    ideas = []
+    for _ in range(args.count):
+        calls = []
+        if stages and leaves:
+            # The idea takes a leaf of a chain that already ran.
+            leaves -= 1
+            task = PLACEHOLDER_CHAIN_OUTPUT
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                if args.randomize:
+                    task, _ = generate_random_game_prompt(args.game_type, args.theme)
+                else:
+                    task = args.task
+                refine = args.ideation_technique == "round_robin"
+                if task and args.ideation_technique and not stages and not refine:
+                    task, _ = apply_ideation_technique(task, args.ideation_technique)
+            if not task:
+                continue
+            if refine:
+                calls.extend(_planned_refine_calls(task, args.model, rounds))
+            if stages:
+                calls.extend(_planned_chain_calls(task, stages, args.model, rounds))
+                leaves = leaves_per_chain(stages) - 1
+                task = PLACEHOLDER_CHAIN_OUTPUT
+        if getattr(args, "agents", False):
+            calls.extend(_planned_agent_calls(task, args.model))
+            task = PLACEHOLDER_CHAIN_OUTPUT
+
+        name = args.name or PLACEHOLDER_NAME
+        if not args.name:
+            calls.append(
+                _planned_call(
+                    "name",
+                    ROUTER.route("name", args.model),
+                    build_name_messages(task),
+                )
+            )
+        calls.append(
+            _planned_call(
+                "metadata",
+                ROUTER.route("metadata", args.model),
+                build_metadata_messages(task, name),
+            )
+        )
+        if args.image and not COVER_STORE.lookup(task, name, IMAGE_PARAMS, touch=False):
+            calls.append(
+                _planned_call(
+                    "image_prompt",
+                    ROUTER.route("image_prompt", args.model),
+                    build_image_prompt_messages(task, name),
+                )
+            )
+            calls.append(_planned_image_call())
+        ideas.append(calls)
+
+    if args.image and args.top_k:
+        # Two-phase runs render covers only for the top ideas, after ranking.
+        for calls in ideas[args.top_k :]:
+            calls[:] = [call for call in calls if call["stage"] not in IMAGE_STAGES]
+        if args.rank == "model" and ideas:
+            ideas[0].append(
+                _planned_call(
+                    "rank",
+                    ROUTER.route("rank", args.model),
+                    build_rank_messages(
+                        [(PLACEHOLDER_NAME, PLACEHOLDER_DESCRIPTION)] * len(ideas)
+                    ),
+                )
+            )
+
+    oversized = sum(
+        1
+        for calls in ideas
+        for call in calls
+        if call["prompt_tokens"] > PROMPT_TOKEN_WARNING
+    )
+    if oversized:
+        warnings.append(
+            f"{oversized} call(s) have prompts over {PROMPT_TOKEN_WARNING} tokens."
+        )
+    return {"ideas": ideas, "warnings": warnings}
+
+
+def summarize_plan(plan, args):
+    """
+    Totals the planned calls per stage and for the whole run.
+
+    Wall time assumes ideas run ``args.concurrency`` at a time, with the
+    stages of each idea running one after another.
+
+    Returns:
+        dict: ``stages``, the totals keyed by stage and model, and ``total``,
+        the run totals including the estimated wall time.
+    """
+    stages = {}
+    for calls in plan["ideas"]:
+        for call in calls:
+            key = (call["stage"], call["model"])
+            totals = stages.setdefault(
+                key,
+                {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0},
+            )
+            totals["calls"] += 1
+            totals["prompt_tokens"] += call["prompt_tokens"]
+            totals["completion_tokens"] += call["completion_tokens"]
+            totals["cost"] += call["cost"]
+
+    idea_latencies = sorted(
+        (sum(call["latency"] for call in calls) for calls in plan["ideas"]),
+        reverse=True,
+    )
+    concurrency = max(1, args.concurrency)
+    # Each wave of concurrent ideas takes as long as its slowest idea.
+    wall_time = sum(idea_latencies[::concurrency])
+
+    return {
+        "stages": stages,
+        "total": {
+            "ideas": len(plan["ideas"]),
+            "chat_calls": sum(
+                t["calls"] for (stage, _), t in stages.items() if stage != "image"
+            ),
+            "images": sum(
+                t["calls"] for (stage, _), t in stages.items() if stage == "image"
+            ),
+            "prompt_tokens": sum(t["prompt_tokens"] for t in stages.values()),
+            "completion_tokens": sum(t["completion_tokens"] for t in stages.values()),
+            "cost": sum(t["cost"] for t in stages.values()),
+            "wall_time": wall_time,
+        },
+    }
+
+
+def print_plan(plan, args):
+    """Prints the plan as a table, followed by any warnings and budget checks."""
+    summary = summarize_plan(plan, args)
+    total = summary["total"]
+    concurrency = max(1, args.concurrency)
+    print(f"Plan: {total['ideas']} idea(s) at concurrency {concurrency}")
+    print(
+        f"{'Stage':<14}{'Model':<16}{'Calls':>6}{'Prompt tok':>12}{'Output tok':>12}{'Cost':>10}"
+    )
+    for (stage, model), totals in sorted(summary["stages"].items()):
+        print(
+            f"{stage:<14}{model:<16}{totals['calls']:>6}{totals['prompt_tokens']:>12}"
+            f"{totals['completion_tokens']:>12}{'$%.4f' % totals['cost']:>10}"
+        )
+    print(
+        f"Total: {total['chat_calls']} chat call(s), {total['images']} image(s), "
+        f"~{total['prompt_tokens'] + total['completion_tokens']} tokens, "
+        f"~${total['cost']:.4f}, ~{total['wall_time']:.0f}s wall time"
+    )
+    if tiktoken is None:
+        print(
+            "Note: tiktoken is not installed, prompt tokens are estimated from length."
+        )
+    for warning in plan["warnings"]:
+        print(f"Warning: {warning}")
+    if args.max_cost is not None and total["cost"] > args.max_cost:
+        print(f"Warning: Estimated cost exceeds --max-cost ${args.max_cost:.2f}.")
+    if args.max_seconds is not None and total["wall_time"] > args.max_seconds:
+        print(
+            f"Warning: Estimated wall time exceeds --max-seconds {args.max_seconds:g}s."
+        )
@@ -0,0 +1,282 @@
+"""
+profiling.py - Built-in CPU and memory profiling for the Ideation CLI.
+
+With ``--profile DIR`` the run is profiled without external tools:
+
+- ``run.pstats``: cProfile of the whole run on the main thread.
+- ``iteration-NNN.pstats``: cProfile of each idea, on the thread that generated it.
+- ``memory-NNN.txt``: the tracemalloc allocations that grew since the
+  previous idea finished, with the peak RSS. The reports are plain text in a
+  stable order, so two of them (or two runs) can be compared with ``diff``.
+- ``importtime.txt``: the slowest imports of the CLI, measured in a fresh
+  interpreter with ``python -X importtime``.
+
+At exit the hottest functions of all profiles are printed, along with the
+time spent per package (``openai``, ``httpx``, ``json``, ``PIL``, ...), which
+separates client overhead, JSON handling and image buffers at a glance. The
+profiles can be explored further with ``python -m pstats DIR/run.pstats``.
+
+Classes:
+    - Profiler: The run and per-iteration profiler.
+
+Constants:
+    - PROFILER: The process-wide profiler used by the CLI.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import subprocess
+import sys
+import sysconfig
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Frames kept per allocation traceback.
+TRACEBACK_FRAMES = 10
+
+# Allocation sites listed in each memory report.
+MEMORY_LINES = 25
+
+_STDLIB = os.path.normcase(sysconfig.get_paths()["stdlib"])
+_IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def package_of(filename):
+    """
+    Names the package a profiled function belongs to.
+
+    Args:
+        filename (str): The function's source file, as recorded by cProfile.
+
+    Returns:
+        str: ``ideation_cli.<module>`` for this package, the top-level package
+        for installed packages, the module name for the standard library, and
+        ``builtins`` for C functions.
+    """
+    if filename == "~" or filename.startswith("<"):
+        return "builtins"
+    parts = os.path.normcase(filename).replace("\\", "/").split("/")
+    if "ideation_cli" in parts:
+        module = parts[-1].rsplit(".", 1)[0]
+        return f"ideation_cli.{module}"
+    if "site-packages" in parts or "dist-packages" in parts:
+        index = max(
+            i
+            for i, part in enumerate(parts)
+            if part in ("site-packages", "dist-packages")
+        )
+        if index + 1 < len(parts):
+            return parts[index + 1].rsplit(".", 1)[0]
+    if os.path.normcase(filename).startswith(_STDLIB):
+        relative = os.path.relpath(os.path.normcase(filename), _STDLIB)
+        return relative.replace("\\", "/").split("/")[0].rsplit(".", 1)[0]
+    return parts[-1].rsplit(".", 1)[0]
+
+
+def import_times(module="ideation_cli.cli"):
+    """
+    Measures the imports of a module in a fresh interpreter.
+
+    Returns:
+        list: ``(cumulative_us, self_us, depth, name)`` tuples, slowest first.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+    rows.sort(reverse=True)
+    return rows
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Profiler:
+    """Profiles a run as a whole and each of its iterations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(self, directory=None, top=20):
+        """
+        Sets where profiles are written; without a directory, profiling is off.
+
+        Args:
+            directory (str): Directory for the profiles and reports.
+            top (int): Number of hotspots printed at exit.
+        """
+        self.directory = directory
+        self.top = top
+        self._profile = None
+        self._iterations = 0
+        self._snapshot = None
+        self._paths = []
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def start(self):
+        """Starts profiling the run on the calling thread and tracing allocations."""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+        self._snapshot = self._take_snapshot()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def call(self, function, *args):
+        """
+        Calls ``function`` with ``args``, profiling it as one iteration when enabled.
+
+        Returns:
+            The result of ``function``.
+        """
+        if not self.enabled:
+            return function(*args)
+        with self._lock:
+            self._iterations += 1
+            number = self._iterations
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Interpreters where only one profiler can be active at a time
+            # record the iteration in the run profile instead.
+            profile = None
+        try:
+            return function(*args)
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._dump(profile, f"iteration-{number:03d}.pstats")
+            self._write_memory_report(f"memory-{number:03d}.txt", f"iteration {number}")
+
+    def stop(self):
+        """Stops profiling, writes the run profile and reports, and prints the hotspots."""
+        if self._profile is None:
+            return
+        self._profile.disable()
+        self._dump(self._profile, "run.pstats")
+        self._profile = None
+        self._write_memory_report("memory-end.txt", "end of run")
+        tracemalloc.stop()
+        self._write_import_times()
+        print(self.summary())
+        print(f"Profiles written to {self.directory}.")
+
+    def _dump(self, profile, filename):
+        path = os.path.join(self.directory, filename)
+        profile.dump_stats(path)
+        with self._lock:
+            self._paths.append(path)
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ]
+        )
+
+    def _write_memory_report(self, filename, label):
+        snapshot = self._take_snapshot()
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"# Memory after {label}",
+            f"traced: {current / 1024:.1f} KiB (peak {peak / 1024:.1f} KiB)",
+        ]
+        rss = _peak_rss_mb()
+        if rss is not None:
+            lines.append(f"peak rss: {rss:.1f} MiB")
+        lines.append(f"# Top {MEMORY_LINES} allocation sites by growth")
+        for stat in snapshot.compare_to(previous, "lineno")[:MEMORY_LINES]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+7d} blocks  "
+                f"{frame.filename}:{frame.lineno}"
+            )
+        with open(
+            os.path.join(self.directory, filename), "w", encoding="utf-8"
+        ) as file:
+            file.write("\n".join(lines) + "\n")
+
+    def _write_import_times(self):
+        rows = import_times()
+        with open(
+            os.path.join(self.directory, "importtime.txt"), "w", encoding="utf-8"
+        ) as file:
+            file.write("# cumulative_us  self_us  module\n")
+            for cumulative_us, self_us, depth, name in rows:
+                file.write(f"{cumulative_us:12d} {self_us:8d}  {'  ' * depth}{name}\n")
+
+    def stats(self):
+        """Returns the combined ``pstats.Stats`` of every profile written so far."""
+        with self._lock:
+            paths = list(self._paths)
+        if not paths:
+            return None
+        stats = pstats.Stats(paths[0], stream=io.StringIO())
+        for path in paths[1:]:
+            stats.add(path)
+        return stats
+
+    def summary(self):
+        """Returns the hottest functions and the time spent per package, as text."""
+        stats = self.stats()
+        if stats is None:
+            return "No profiles recorded."
+        functions = []
+        packages = {}
+        for (filename, line, name), (
+            _,
+            calls,
+            tottime,
+            cumtime,
+            _,
+        ) in stats.stats.items():
+            functions.append((tottime, calls, cumtime, f"{filename}:{line}({name})"))
+            package = package_of(filename)
+            packages[package] = packages.get(package, 0.0) + tottime
+        functions.sort(reverse=True)
+        lines = [f"Top {self.top} functions by own time:"]
+        lines.append(f"{'own s':>9} {'total s':>9} {'calls':>9}  function")
+        for tottime, calls, cumtime, label in functions[: self.top]:
+            lines.append(f"{tottime:9.3f} {cumtime:9.3f} {calls:9d}  {label}")
+        lines.append("Own time by package:")
+        for package, tottime in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[: self.top]:
+            lines.append(f"{tottime:9.3f}  {package}")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
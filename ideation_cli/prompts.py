@@ -31,6 +31,26 @@ GAME_METADATA_PROMPT = (
     'as valid JSON: {"short_description": str, "detailed_description": str, "tags": list}'
 )
 
+GAME_METADATA_REPAIR_PROMPT = (
+    "The following fields were missing or invalid: {fields}. "
+    "Reply with valid JSON containing only these fields, keeping the rest of the metadata as it is."
+)
+
+GAME_REFINE_PROMPT = (
+    "You are a game design panel refining one idea over several rounds. Each round you are given the idea as "
+    "it stands and brief notes on the earlier rounds. Critique the idea's weakest points, then revise the idea "
+    "to address them, building on the notes rather than undoing earlier changes. Answer with only valid JSON: "
+    '{{"critique": str, "idea": str, "notes": str}} where notes summarises the changes of every round so far '
+    "in at most {notes_words} words."
+)
+
+GAME_RANKING_PROMPT = (
+    "You are a game jam judge. Score each numbered game idea from 1 to 10 for originality, clarity and "
+    "how well it could be built in a short jam. Answer with only valid JSON: "
+    '{"scores": [int, ...]} with one score per idea, in the order given.'
+)
+
+
 def get_prompt(artifact, technique):
     """Returns a prompt template based on the selected ideation technique."""
     templates = {
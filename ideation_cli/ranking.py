@@ -0,0 +1,108 @@
+"""
+ranking.py - Idea ranking for the Ideation CLI.
+
+This module scores a batch of generated ideas so that expensive follow-up
+work, such as rendering cover images, is only spent on the most promising
+ones. Ideas are scored locally with cheap heuristics (complete metadata, a
+reasonably detailed description, a useful set of tags and novelty within the
+batch) or, optionally, by a single call to a small model.
+
+Functions:
+    - heuristic_score(output, others): Score one idea against the rest of the batch.
+    - rank_ideas(outputs, method, model): Score a batch and return the indices, best first.
+"""
+
+import re
+
+from ideation_cli.generator import generate_scores
+
+# Detailed descriptions within this many words score highest.
+IDEAL_DESCRIPTION_WORDS = (60, 250)
+
+# Tag counts within this range score highest.
+IDEAL_TAG_COUNT = (3, 10)
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _words(output):
+    branding = output.get("branding_data") or {}
+    text = f"{branding.get('short_description', '')} {branding.get('detailed_description', '')}"
+    return set(_WORD_PATTERN.findall(text.lower()))
+
+
+def _in_range_score(value, ideal):
+    low, high = ideal
+    if value < low:
+        return value / low
+    if value > high:
+        return max(0.0, 1 - (value - high) / high)
+    return 1.0
+
+
+def heuristic_score(output, others):
+    """
+    Scores one idea from 0 to 1 with local heuristics.
+
+    Args:
+        output (dict): The idea's saved output, including ``branding_data``.
+        others (list): The outputs of the other ideas in the batch.
+
+    Returns:
+        float: The weighted score of completeness, description length, tags and novelty.
+    """
+    branding = output.get("branding_data") or {}
+    fields = ["short_description", "detailed_description", "tags"]
+    completeness = sum(1 for field in fields if branding.get(field)) / len(fields)
+
+    detail_words = len(str(branding.get("detailed_description", "")).split())
+    detail = _in_range_score(detail_words, IDEAL_DESCRIPTION_WORDS)
+    tags = _in_range_score(len(branding.get("tags") or []), IDEAL_TAG_COUNT)
+
+    words = _words(output)
+    overlap = 0.0
+    for other in others:
+        other_words = _words(other)
+        if words and other_words:
+            overlap = max(overlap, len(words & other_words) / len(words | other_words))
+    novelty = 1 - overlap
+
+    return 0.3 * completeness + 0.3 * detail + 0.1 * tags + 0.3 * novelty
+
+
+def rank_ideas(outputs, method="heuristic", model=None):
+    """
+    Scores a batch of ideas and orders them best first.
+
+    With the ``model`` method a single call scores the whole batch; ideas the
+    model did not score fall back to their heuristic score.
+
+    Args:
+        outputs (list): The saved outputs of the ideas.
+        method (str): ``heuristic`` or ``model``.
+        model (str): The run-level model, used by the ``model`` method.
+
+    Returns:
+        tuple: The indices of ``outputs`` ordered best first, and the score of each idea.
+    """
+    scores = [
+        heuristic_score(output, outputs[:index] + outputs[index + 1 :])
+        for index, output in enumerate(outputs)
+    ]
+    if method == "model" and outputs:
+        model_scores = generate_scores(
+            [
+                (
+                    output.get("name", ""),
+                    (output.get("branding_data") or {}).get("short_description", ""),
+                )
+                for output in outputs
+            ],
+            model,
+        )
+        scores = [
+            score if model_score is None else model_score / 10
+            for score, model_score in zip(scores, model_scores)
+        ]
+    order = sorted(range(len(outputs)), key=lambda index: scores[index], reverse=True)
+    return order, scores
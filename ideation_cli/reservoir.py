@@ -0,0 +1,210 @@
+"""
+reservoir.py - Prefetched ideas for instant interactive results.
+
+In interactive mode the user spends a while answering questions, and then
+waits for several API calls in a row. With ``--prefetch N`` the CLI uses
+that time: as soon as the questions that decide an idea (random selection,
+ideation technique and model) are answered, it warms the API connection and
+generates up to N random ideas (prompt, name and metadata) for those
+settings in a background thread, while the remaining questions are asked. A
+random idea requested with the same settings is then taken from the pool
+instead of being generated. Prefetched ideas are held in memory until the
+output directory has been answered, then saved there, so ideas left over,
+or still finishing when the questions were answered, are ready for the next
+session.
+
+Ideas are only prefetched and used for randomized runs without a fixed name,
+whose result does not depend on anything but the settings.
+
+Classes:
+    - Reservoir: The persisted pool, with its background filler.
+
+Functions:
+    - settings_key(args): The settings an idea was generated for.
+
+Constants:
+    - RESERVOIR_FILENAME: The pool file name inside the output path.
+    - RESERVOIR: The process-wide pool used by the CLI.
+"""
+
+import json
+import os
+import sys
+import threading
+
+from ideation_cli.writer import write_json
+
+RESERVOIR_FILENAME = ".reservoir.json"
+
+# The options a prefetched idea must match to be used.
+SETTINGS = [
+    "model",
+    "theme",
+    "game_type",
+    "ideation_technique",
+    "rounds",
+    "agents",
+    "temperature",
+    "top_p",
+]
+
+
+def settings_key(args):
+    """Returns a key for the settings that determine a random idea."""
+    return json.dumps([getattr(args, setting, None) for setting in SETTINGS])
+
+
+class _MutedThreadOutput:
+    """Standard output that drops what one thread prints.
+
+    Keeps the filler's progress messages from drawing over the interactive
+    questions.
+    """
+
+    def __init__(self, stream, thread):
+        self._stream = stream
+        self._thread = thread
+
+    def write(self, text):
+        if threading.current_thread() is self._thread:
+            return len(text)
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class Reservoir:
+    """A persisted pool of prefetched ideas, keyed by their settings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stdout = None
+        self.path = None
+        self._pool = {}
+
+    def configure(self, path, keep_prefetched=False):
+        """
+        Load the pool saved at ``path``; ``path=None`` disables the pool.
+
+        Args:
+            path (str): The pool file, or None.
+            keep_prefetched (bool): Add the ideas prefetched so far to the
+                loaded pool and save them there, instead of dropping them.
+        """
+        with self._lock:
+            prefetched = self._pool if keep_prefetched else {}
+            self.path = path
+            self._pool = {}
+            if path is None:
+                self._pool = prefetched
+                return
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    self._pool = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+            if prefetched:
+                for key, drafts in prefetched.items():
+                    self._pool.setdefault(key, []).extend(drafts)
+                self._save()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    @staticmethod
+    def eligible(args):
+        """Whether ideas for ``args`` can come from the pool."""
+        return bool(getattr(args, "randomize", False)) and not getattr(
+            args, "name", None
+        )
+
+    def _save(self):
+        if self.path is None:
+            return  # Held in memory until the pool has a file.
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        write_json(self.path, self._pool)
+
+    def count(self, args):
+        with self._lock:
+            return len(self._pool.get(settings_key(args), []))
+
+    def add(self, args, draft):
+        """Adds a prefetched idea for the settings of ``args``."""
+        with self._lock:
+            self._pool.setdefault(settings_key(args), []).append(draft)
+            self._save()
+
+    def take(self, args):
+        """
+        Takes a prefetched idea matching ``args``.
+
+        Returns:
+            dict: The idea's ``task``, ``game_type``, ``name`` and ``metadata``,
+            or None when the pool is disabled, ``args`` are not eligible or no
+            idea matches.
+        """
+        if not self.enabled or not self.eligible(args):
+            return None
+        key = settings_key(args)
+        with self._lock:
+            drafts = self._pool.get(key)
+            if not drafts:
+                return None
+            draft = drafts.pop(0)
+            if not drafts:
+                del self._pool[key]
+            self._save()
+        return draft
+
+    def start(self, args, produce, size, warm=None):
+        """
+        Fills the pool for ``args`` in a background thread.
+
+        Args:
+            args (argparse.Namespace): The settings to prefetch ideas for.
+            produce (callable): Generates one idea for ``args``.
+            size (int): How many ideas to keep for these settings.
+            warm (callable): Called first, to open the API connection.
+        """
+        if not self.eligible(args) or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._fill, args=(args, produce, size, warm), daemon=True
+        )
+        self._stdout = sys.stdout
+        sys.stdout = _MutedThreadOutput(self._stdout, self._thread)
+        self._thread.start()
+
+    def _fill(self, args, produce, size, warm):
+        if warm is not None:
+            warm()
+        while not self._stop.is_set() and self.count(args) < size:
+            try:
+                draft = produce(args)
+            except Exception:
+                return  # Prefetching is best effort; the run generates its own ideas.
+            if draft is None:
+                return
+            self.add(args, draft)
+
+    def stop(self):
+        """Stop prefetching after the idea in progress, without waiting for it."""
+        self._stop.set()
+
+    def close(self):
+        """Stop prefetching and wait for the idea in progress to be saved."""
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._stdout is not None:
+            sys.stdout = self._stdout
+            self._stdout = None
+
+
+RESERVOIR = Reservoir()
@@ -0,0 +1,303 @@
+"""
+routing.py - Per-stage model routing for the Ideation CLI.
+
+Each stage of the idea pipeline (naming, metadata, image prompts, ...) is
+assigned its own chat model, so cheap stages do not pay flagship-model
+latency. The router records the observed latency and error rate of every
+call and, when a stage breaches its latency SLO, falls back to the next
+faster model in the stage's fallback list. Reasoning models only accept the
+default sampling parameters, so they are skipped for calls that set their
+own temperature or top_p.
+
+Classes:
+    - ModelRouter: Resolves the model for a stage and tracks call statistics.
+
+Functions:
+    - parse_stage_assignment(value): Parse a ``STAGE=VALUE`` command-line option.
+
+Constants:
+    - STAGES: The pipeline stages that call a chat model.
+    - DEFAULT_STAGE_MODELS: The default routing table (``None`` means ``--model``).
+    - DEFAULT_STAGE_SLOS: The default latency SLO per stage, in seconds.
+    - DEFAULT_STAGE_FALLBACKS: The models each stage may fall back to, slowest first.
+    - FIXED_SAMPLING_MODELS: Models that only accept the default sampling parameters.
+    - ROUTER: The process-wide router used by the generator.
+
+Usage:
+    ```python
+    from ideation_cli.routing import ROUTER
+
+    model = ROUTER.route("name", "gpt-4o")  # -> "gpt-4o-mini"
+    ROUTER.record("name", model, latency=0.8)
+    ```
+"""
+
+import argparse
+import contextvars
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ["ideas", "refine", "agents", "name", "metadata", "image_prompt", "rank"]
+
+DEFAULT_STAGE_MODELS = {
+    "ideas": None,
+    "refine": None,
+    "agents": None,
+    "name": "gpt-4o-mini",
+    "metadata": None,
+    "image_prompt": "gpt-4o-mini",
+    "rank": "gpt-4o-mini",
+}
+
+DEFAULT_STAGE_SLOS = {
+    "ideas": 30.0,
+    "refine": 30.0,
+    "agents": 30.0,
+    "name": 8.0,
+    "metadata": 30.0,
+    "image_prompt": 20.0,
+    "rank": 20.0,
+}
+
+# Fallbacks from slowest to fastest; a stage moves to the next model after its current one.
+_REASONING_FALLBACKS = [
+    "o1-preview",
+    "o1-mini",
+    "o4-mini",
+    "gpt-4o",
+    "gpt-4o-mini",
+    "gpt-3.5-turbo",
+]
+_FAST_FALLBACKS = ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"]
+
+DEFAULT_STAGE_FALLBACKS = {
+    "ideas": _REASONING_FALLBACKS,
+    "refine": _REASONING_FALLBACKS,
+    "agents": _REASONING_FALLBACKS,
+    "name": _FAST_FALLBACKS,
+    "metadata": _REASONING_FALLBACKS,
+    "image_prompt": _FAST_FALLBACKS,
+    "rank": _FAST_FALLBACKS,
+}
+
+FIXED_SAMPLING_MODELS = {"o1-mini", "o1-preview", "o4-mini"}
+
+# Number of recent calls kept per stage and model when checking the SLO.
+WINDOW_SIZE = 20
+
+# Calls needed before a stage/model pair can be judged against its SLO.
+MIN_SAMPLES = 3
+
+# Percentile of the recent latencies compared against the SLO.
+SLO_PERCENTILE = 0.9
+
+# Error rate above which a stage/model pair is treated as breaching its SLO.
+MAX_ERROR_RATE = 0.5
+
+# The model every stage is pinned to in the current context, if any.
+_PINNED_MODEL = contextvars.ContextVar("pinned_model", default=None)
+
+
+def accepts_sampling(model, params):
+    """Return True if a model accepts a call's temperature and top_p."""
+    if model not in FIXED_SAMPLING_MODELS:
+        return True
+    return all((params or {}).get(name, 1) == 1 for name in ("temperature", "top_p"))
+
+
+def _percentile(values, fraction):
+    """Return the value at the given fraction of the sorted values."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+class StageStats:
+    """Rolling latency and error statistics for one stage/model pair."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.recent = deque(maxlen=WINDOW_SIZE)
+
+    def add(self, latency, ok, prompt_tokens=0, completion_tokens=0):
+        self.calls += 1
+        self.total_latency += latency
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if not ok:
+            self.errors += 1
+        self.recent.append((latency, ok))
+
+    @property
+    def error_rate(self):
+        if not self.recent:
+            return 0.0
+        return sum(1 for _, ok in self.recent if not ok) / len(self.recent)
+
+    @property
+    def mean_latency(self):
+        return self.total_latency / self.calls if self.calls else 0.0
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return 0.0
+        return _percentile([latency for latency, _ in self.recent], fraction)
+
+    def breaches(self, slo):
+        """Return True when the recent calls are too slow or fail too often."""
+        if len(self.recent) < MIN_SAMPLES:
+            return False
+        return self.percentile(SLO_PERCENTILE) > slo or self.error_rate > MAX_ERROR_RATE
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "mean_latency": round(self.mean_latency, 3),
+            "p50_latency": round(self.percentile(0.5), 3),
+            "p90_latency": round(self.percentile(SLO_PERCENTILE), 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class ModelRouter:
+    """Assigns a model to each pipeline stage and falls back on SLO breaches."""
+
+    def __init__(self, stage_models=None, stage_slos=None):
+        self.stage_models = dict(DEFAULT_STAGE_MODELS)
+        self.stage_slos = dict(DEFAULT_STAGE_SLOS)
+        self.stage_fallbacks = dict(DEFAULT_STAGE_FALLBACKS)
+        self._lock = threading.Lock()
+        self.configure(stage_models, stage_slos)
+
+    def configure(self, stage_models=None, stage_slos=None):
+        """Override the routing table and SLOs, clearing any fallbacks taken."""
+        with self._lock:
+            self.stage_models.update(stage_models or {})
+            self.stage_slos.update(stage_slos or {})
+            self._fallbacks = {}
+            self._stats = {}
+
+    @contextmanager
+    def pinned(self, model):
+        """Route every stage to one model for the calls made in this context.
+
+        The routing table is left as it is, so calls made elsewhere, such as
+        by other ideas of the run, are routed as usual. Worker threads
+        started inside the context must run in a copy of it to be pinned too.
+        """
+        token = _PINNED_MODEL.set(model)
+        try:
+            yield
+        finally:
+            _PINNED_MODEL.reset(token)
+
+    def route(self, stage, default_model):
+        """Return the model to use for a stage.
+
+        Args:
+            stage (str): The pipeline stage making the call.
+            default_model (str): The run-level model (``--model``), used when
+                the routing table has no entry for the stage.
+
+        Returns:
+            str: The model name, after any latency fallback, or the pinned
+            model inside ``pinned``.
+        """
+        pinned = _PINNED_MODEL.get()
+        if pinned is not None:
+            return pinned
+        with self._lock:
+            model = self.stage_models.get(stage) or default_model
+            while (stage, model) in self._fallbacks:
+                model = self._fallbacks[(stage, model)]
+            return model
+
+    def record(
+        self,
+        stage,
+        model,
+        latency,
+        ok=True,
+        prompt_tokens=0,
+        completion_tokens=0,
+        params=None,
+    ):
+        """Record one call and fall back to a faster model if the SLO is breached.
+
+        ``params`` are the call's sampling parameters; fallbacks that would
+        reject them are skipped.
+        """
+        if stage is None:
+            return
+        with self._lock:
+            stats = self._stats.setdefault((stage, model), StageStats())
+            stats.add(latency, ok, prompt_tokens, completion_tokens)
+            slo = self.stage_slos.get(stage)
+            if slo is None or not stats.breaches(slo):
+                return
+            if (stage, model) in self._fallbacks:
+                return
+            fallback = self._next_model(stage, model, params)
+            if fallback is None:
+                return
+            self._fallbacks[(stage, model)] = fallback
+        print(
+            f"Stage '{stage}' breached its {slo:g}s latency SLO on {model}, "
+            f"falling back to {fallback}."
+        )
+
+    def _next_model(self, stage, model, params):
+        candidates = self.stage_fallbacks.get(stage, [])
+        if model in candidates:
+            candidates = candidates[candidates.index(model) + 1 :]
+        for candidate in candidates:
+            if candidate != model and accepts_sampling(candidate, params):
+                return candidate
+        return None
+
+    def stats(self):
+        """Return a snapshot of the recorded statistics keyed by stage and model."""
+        with self._lock:
+            return {
+                stage: {
+                    model: stats.as_dict()
+                    for (s, model), stats in self._stats.items()
+                    if s == stage
+                }
+                for stage in sorted({s for s, _ in self._stats})
+            }
+
+
+def parse_stage_assignment(value):
+    """
+    Parses a ``STAGE=VALUE`` command-line option.
+
+    Args:
+        value (str): The raw option value, e.g. ``name=gpt-4o-mini``.
+
+    Returns:
+        tuple: The stage name and the assigned value.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is malformed or the stage is unknown.
+    """
+    stage, sep, assigned = value.partition("=")
+    stage = stage.strip()
+    if not sep or not assigned.strip():
+        raise argparse.ArgumentTypeError(f"expected STAGE=VALUE, got '{value}'")
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage '{stage}', choose from {', '.join(STAGES)}"
+        )
+    return stage, assigned.strip()
+
+
+ROUTER = ModelRouter()
@@ -0,0 +1,125 @@
+"""
+sampler.py - Coverage-maximising random choices for the Ideation CLI.
+
+Independent ``random.choice`` calls often repeat themselves: a ``--count 20``
+run can draw the same game type or oblique strategy several times and spend
+API calls on near-identical ideas. The sampler instead deals from a shuffled
+deck per list (game types, genres, oblique strategies), so no item repeats
+until every item of its list has been drawn. The draws are remembered in the
+output tree, so the next run carries on with the items not yet explored
+instead of starting over.
+
+With ``--avoid-saturated`` the game types that ``ideation-cli clusters``
+found saturated, whose ideas keep landing in crowded regions of idea-space,
+are left out of the decks, as long as other game types remain.
+
+``--seed`` makes the draws reproducible for a given history. The history is
+written after every draw; processes sharing an output path each keep their
+own deck, so the history only approximately covers their combined draws.
+
+Classes:
+    - SeedSampler: The per-list decks and their history.
+
+Functions:
+    - saturated_game_types(root): The game types the last clusters report found saturated.
+
+Constants:
+    - HISTORY_FILENAME: The history file name inside the output path.
+    - SATURATION_FILENAME: The clusters report file, relative to the output path.
+    - SAMPLER: The process-wide sampler used by the strategies.
+"""
+
+import json
+import os
+import random
+import threading
+
+from ideation_cli.writer import write_json
+
+HISTORY_FILENAME = ".sampler.json"
+SATURATION_FILENAME = os.path.join(".clusters", "saturation.json")
+
+
+def saturated_game_types(root):
+    """
+    Returns the game types found saturated by the last ``ideation-cli clusters`` run.
+
+    Args:
+        root (str): The output path.
+
+    Returns:
+        list: The saturated game types, or an empty list without a report.
+    """
+    try:
+        with open(
+            os.path.join(root, SATURATION_FILENAME), "r", encoding="utf-8"
+        ) as file:
+            return list(json.load(file).get("saturated_game_types", []))
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return []
+
+
+class SeedSampler:
+    """Draws from lists without replacement, carrying the draws over between runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(self, seed=None, history_path=None, avoid=()):
+        """
+        Resets the decks, seeding them and loading the history of earlier runs.
+
+        Args:
+            seed (int): Seed for reproducible draws, or None for random ones.
+            history_path (str): File to remember draws in, or None to keep them in memory.
+            avoid (list): Items to leave out of every deck, unless nothing else is left.
+        """
+        with self._lock:
+            self._random = random.Random(seed)
+            self.history_path = history_path
+            self.avoid = set(avoid)
+            self._decks = {}
+            self._used = {}
+            if history_path:
+                try:
+                    with open(history_path, "r", encoding="utf-8") as file:
+                        self._used = json.load(file)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    pass
+
+    def choice(self, pool, items):
+        """
+        Draws the next item of a list.
+
+        Args:
+            pool (str): The name of the list, under which its draws are remembered.
+            items (list): The items to draw from.
+
+        Returns:
+            The drawn item.
+        """
+        items = list(dict.fromkeys(items))
+        items = [item for item in items if item not in self.avoid] or items
+        with self._lock:
+            used = self._used.setdefault(pool, [])
+            deck = self._decks.get(pool)
+            if deck is None:
+                seen = set(used)
+                deck = [item for item in items if item not in seen]
+                self._random.shuffle(deck)
+            if not deck:
+                # Every item has been drawn; start a new round over the whole list.
+                used.clear()
+                deck = list(items)
+                self._random.shuffle(deck)
+            item = deck.pop()
+            self._decks[pool] = deck
+            used.append(item)
+            if self.history_path:
+                os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+                write_json(self.history_path, self._used)
+        return item
+
+
+SAMPLER = SeedSampler()
@@ -0,0 +1,353 @@
+"""
+server.py - Long-running daemon mode for the Ideation CLI.
+
+``ideation-cli serve`` keeps one process running and accepts idea jobs over a
+local HTTP API, on a TCP port or a Unix socket. Every job shares the warm
+state of the process: the OpenAI client and its connection pool, the model
+router's latency and error statistics, the cover store and the background
+writer. A Makefile target or script can submit jobs without paying for
+imports, client setup and TLS handshakes on every run.
+
+Endpoints:
+    - POST /jobs: Run a job. The body is a JSON object of run options, e.g.
+      ``{"task": "...", "count": 3, "image": true}``. Results are streamed
+      back as newline-delimited JSON events: one ``idea`` event per completed
+      idea, then a ``done`` or ``error`` event.
+    - GET /health: Liveness check with the number of running jobs.
+    - GET /stats: Router, connection and endpoint statistics, running jobs
+      and the writer queue depth.
+    - GET /metrics: Live metrics in the Prometheus text format.
+
+Jobs use the options the server was started with as defaults. Output
+location, routing and cover store options are fixed for the whole server,
+so only the options in ``JOB_OPTIONS`` can be set per job, and flags can only
+be switched on.
+
+Functions:
+    - build_serve_parser(): Build the parser for ``serve``.
+    - job_parser(): Build the parser that validates job options.
+    - job_args(parser, defaults, options): Build the arguments of a job.
+    - run_job(args, emit): Run a job, emitting its events.
+    - make_server(args): Create the HTTP server for the serve options.
+    - main(argv): Run the ``serve`` subcommand.
+"""
+
+import copy
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ideation_cli.cli import (
+    configure_agents,
+    configure_cassette,
+    configure_chains,
+    configure_cover_store,
+    configure_endpoints,
+    configure_metrics,
+    configure_routing,
+    configure_sampler,
+    configure_transport,
+    run_iterations,
+    run_two_phase,
+)
+from ideation_cli.endpoints import ENDPOINT_POOL
+from ideation_cli.metrics import METRICS, send_metrics
+from ideation_cli.routing import ROUTER
+from ideation_cli.transport import TRANSPORT
+from ideation_cli.utils import build_parser
+from ideation_cli.writer import WRITER
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Run options a job may set; everything else is fixed when the server starts.
+JOB_OPTIONS = [
+    "task",
+    "name",
+    "randomize",
+    "game_type",
+    "theme",
+    "ideation_technique",
+    "rounds",
+    "agents",
+    "image",
+    "count",
+    "model",
+    "temperature",
+    "top_p",
+    "concurrency",
+    "max_seconds",
+    "max_cost",
+    "top_k",
+    "rank",
+]
+
+
+def build_serve_parser():
+    """
+    Builds the parser for ``serve``: the run options, used as job defaults,
+    plus where to listen.
+    """
+    parser = build_parser()
+    parser.prog = "ideation-cli serve"
+    parser.description = "Serve idea jobs over a local HTTP API."
+    group = parser.add_argument_group("server")
+    group.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_HOST,
+        help="Address to listen on.",
+    )
+    group.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="TCP port to listen on.",
+    )
+    group.add_argument(
+        "--socket",
+        type=str,
+        help="Listen on this Unix socket instead of a TCP port.",
+    )
+    return parser
+
+
+def _raise_error(message):
+    raise ValueError(message)
+
+
+def job_parser():
+    """Builds a run options parser that raises ValueError instead of exiting."""
+    parser = build_parser()
+    parser.error = _raise_error
+    return parser
+
+
+def job_args(parser, defaults, options):
+    """
+    Builds the arguments of a job from its JSON options.
+
+    Options are validated by the run options parser, so they accept the same
+    values as on the command line.
+
+    Args:
+        parser (argparse.ArgumentParser): The run options parser.
+        defaults (argparse.Namespace): The server's options.
+        options (dict): The job's options.
+
+    Returns:
+        argparse.Namespace: The job's arguments.
+
+    Raises:
+        ValueError: If an option is not supported or not valid.
+    """
+    if not isinstance(options, dict):
+        raise ValueError("A job must be a JSON object of options.")
+    unsupported = sorted(set(options) - set(JOB_OPTIONS))
+    if unsupported:
+        raise ValueError(f"Unsupported job option(s): {', '.join(unsupported)}")
+
+    argv = []
+    for key, value in options.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv.extend([flag, str(value)])
+    return parser.parse_args(argv, namespace=copy.copy(defaults))
+
+
+def run_job(args, emit):
+    """
+    Runs a job, emitting an ``idea`` event per completed idea and a final
+    ``done`` or ``error`` event.
+
+    Args:
+        args (argparse.Namespace): The job's arguments.
+        emit (callable): Called with each event dictionary.
+    """
+
+    def emit_idea(result):
+        dir_path, output = result
+        emit({"event": "idea", "dir_path": dir_path, "output": output})
+
+    try:
+        if args.image and args.top_k:
+            # Covers are only rendered once every idea is ranked.
+            results = run_two_phase(args)
+            for result in results:
+                emit_idea(result)
+        else:
+            results = run_iterations(args, on_result=emit_idea)
+        emit({"event": "done", "ideas": len(results)})
+    except Exception as err:
+        emit({"event": "error", "message": str(err)})
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """Handles the job API requests."""
+
+    server_version = "ideation-cli"
+
+    def address_string(self):
+        # Unix socket clients have no host address.
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "jobs": self.server.jobs})
+        elif self.path == "/stats":
+            self._send_json(
+                200,
+                {
+                    "jobs": self.server.jobs,
+                    "writer_queue": WRITER.depth,
+                    "router": ROUTER.stats(),
+                    "transport": TRANSPORT.stats(),
+                    "endpoints": ENDPOINT_POOL.stats(),
+                },
+            )
+        elif self.path == "/metrics":
+            send_metrics(self, METRICS)
+        else:
+            self._send_json(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self._send_json(404, {"error": f"Not found: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            options = json.loads(self.rfile.read(length) or b"{}")
+            args = job_args(self.server.parser, self.server.defaults, options)
+        except ValueError as err:
+            self._send_json(400, {"error": str(err)})
+            return
+
+        # The response has no length; the stream ends when the connection closes.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        connected = True
+
+        def emit(event):
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except OSError:
+                # The client went away; let the job finish and save its ideas.
+                connected = False
+
+        with self.server.lock:
+            self.server.jobs += 1
+        try:
+            run_job(args, emit)
+        finally:
+            with self.server.lock:
+                self.server.jobs -= 1
+
+
+class _TCPJobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _UnixJobServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+else:  # pragma: no cover - platforms without Unix sockets
+    _UnixJobServer = None
+
+
+def make_server(args):
+    """
+    Creates the HTTP server for the serve options, bound but not yet serving.
+
+    Args:
+        args (argparse.Namespace): The serve options.
+
+    Returns:
+        socketserver.BaseServer: The server.
+
+    Raises:
+        RuntimeError: If Unix sockets are unsupported, or ``--socket`` names
+            an existing file that is not a socket.
+    """
+    if args.socket:
+        if _UnixJobServer is None:
+            raise RuntimeError("Unix sockets are not supported on this platform.")
+        try:
+            mode = os.lstat(args.socket).st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            # Only a socket left by an earlier server is replaced, never another file.
+            if not stat.S_ISSOCK(mode):
+                raise RuntimeError(
+                    f"{args.socket} exists and is not a socket; refusing to replace it."
+                )
+            os.remove(args.socket)
+        server = _UnixJobServer(args.socket, JobHandler)
+    else:
+        server = _TCPJobServer((args.host, args.port), JobHandler)
+
+    server.parser = job_parser()
+    server.defaults = args
+    server.jobs = 0
+    server.lock = threading.Lock()
+    return server
+
+
+def main(argv=None):
+    """Runs the ``serve`` subcommand until interrupted."""
+    args = build_serve_parser().parse_args(argv)
+    configure_routing(args)
+    configure_transport(args)
+    configure_endpoints(args)
+    configure_cassette(args)
+    configure_cover_store(args)
+    configure_sampler(args)
+    configure_chains(args)
+    configure_agents(args)
+    configure_metrics(args)
+    try:
+        server = make_server(args)
+    except RuntimeError as err:
+        print(f"Error: {err}")
+        METRICS.stop()
+        sys.exit(1)
+    WRITER.start()
+
+    if args.socket:
+        print(f"Serving on unix:{args.socket}")
+    else:
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        WRITER.close()
+        METRICS.stop()
@@ -13,7 +13,7 @@ Constants:
 
 Dependencies:
     - os
-    - random
+    - ideation_cli.sampler.SAMPLER
     - ideation_cli.utils.load_json
 
 Usage:
@@ -28,8 +28,8 @@ Usage:
 """
 
 import os
-import random
 
+from ideation_cli.sampler import SAMPLER
 from ideation_cli.utils import load_json
 from ideation_cli.prompts import get_prompt
 
@@ -57,14 +57,14 @@ def generate_random_game_prompt(
     game_genres = load_json(f"{DIRNAME}/config/game_genres.json")["all_genres"]
     casual_mobile_games = load_json(f"{DIRNAME}/config/casual_mobile_games.json")["casual_mobile_games"]
 
-    # Randomly select a game type if none is provided
+    # Randomly select a game type if none is provided, without repeats until the list is exhausted
     if game_type is None:
         if genre == "classic_games":
-            game_type = random.choice(classic_games)
+            game_type = SAMPLER.choice("classic_games", classic_games)
         elif genre == "casual_mobile_games":
-            game_type = random.choice(casual_mobile_games)
+            game_type = SAMPLER.choice("casual_mobile_games", casual_mobile_games)
         else:
-            game_type = random.choice(game_genres)
+            game_type = SAMPLER.choice("game_genres", game_genres)
 
     # Construct the game development prompt without conflating the game type and the theme
     prompt = f"Develop a basic '{game_type}' game"
@@ -95,8 +95,8 @@ def apply_oblique_strategy(prompt):
         "oblique_strategies"
     ]
 
-    # Select a random strategy from the list
-    strategy = random.choice(oblique_strategies)
+    # Select a random strategy from the list, without repeats until the list is exhausted
+    strategy = SAMPLER.choice("oblique_strategies", oblique_strategies)
 
     # Append the selected strategy to the prompt
     prompt += f" Modify it by applying the oblique strategy: '{strategy}'."
@@ -0,0 +1,184 @@
+"""
+structured.py - Structured-output helpers for the Ideation CLI.
+
+This module holds the JSON schema for game metadata together with the
+tolerant parsing and validation used to turn a model response into a
+metadata dictionary. Responses wrapped in markdown fences, preceded by prose
+or cut off mid-object are recovered instead of being stored as raw strings,
+and validation reports exactly which fields need to be asked for again.
+
+Functions:
+    - strip_code_fences(text): Remove a surrounding markdown code fence.
+    - parse_partial_json(text): Parse the first JSON object in a possibly truncated text.
+    - validate_metadata(data): Split metadata into valid fields and the fields to repair.
+    - metadata_response_format(fields): Build a JSON-schema response format for the given fields.
+
+Constants:
+    - METADATA_FIELDS: The required metadata fields, in order.
+    - METADATA_SCHEMA: The JSON schema for a complete metadata object.
+    - STRUCTURED_OUTPUT_MODELS: Models that support JSON-schema constrained output.
+"""
+
+import json
+import re
+
+METADATA_FIELDS = ["short_description", "detailed_description", "tags"]
+
+_FIELD_SCHEMAS = {
+    "short_description": {"type": "string"},
+    "detailed_description": {"type": "string"},
+    "tags": {"type": "array", "items": {"type": "string"}},
+}
+
+METADATA_SCHEMA = {
+    "type": "object",
+    "properties": {field: _FIELD_SCHEMAS[field] for field in METADATA_FIELDS},
+    "required": METADATA_FIELDS,
+    "additionalProperties": False,
+}
+
+STRUCTURED_OUTPUT_MODELS = {"gpt-4o", "gpt-4o-mini", "o4-mini"}
+
+_FENCE_PATTERN = re.compile(r"^\s*```[\w-]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+
+
+def strip_code_fences(text):
+    """
+    Removes a surrounding markdown code fence such as ```json ... ```.
+
+    Unlike ``str.strip("```json")`` this removes the fence as a prefix and
+    suffix, leaving any leading ``j``, ``s``, ``o`` or ``n`` characters of the
+    content intact.
+
+    Args:
+        text (str): The raw model response.
+
+    Returns:
+        str: The response without the fence, or unchanged if it had none.
+    """
+    match = _FENCE_PATTERN.match(text)
+    return match.group(1) if match else text
+
+
+def parse_partial_json(text):
+    """
+    Parses the first JSON object or array found in a text, tolerating truncation.
+
+    Leading prose, code fences and trailing text are ignored. When the value
+    is cut off (for example because the response hit its token limit), open
+    strings and containers are closed; if that still does not parse, the
+    incomplete trailing member is dropped.
+
+    Args:
+        text (str): The raw model response.
+
+    Returns:
+        dict | list: The parsed value.
+
+    Raises:
+        ValueError: If no JSON value can be recovered.
+    """
+    text = strip_code_fences(text)
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        raise ValueError("No JSON object found in response")
+    start = min(starts)
+
+    closers = []
+    in_string = False
+    escaped = False
+    last_member_end = None
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not closers or closers[-1] != char:
+                raise ValueError(f"Unbalanced '{char}' at position {index}")
+            closers.pop()
+            if not closers:
+                return json.loads(text[start : index + 1])
+        elif char == ",":
+            last_member_end = (index, list(closers))
+
+    # The value was truncated: try closing it as-is, then without the last member.
+    body = text[start:]
+    if in_string:
+        body = (body[:-1] if escaped else body) + '"'
+    candidates = [body.rstrip().rstrip(",") + "".join(reversed(closers))]
+    if last_member_end is not None:
+        index, member_closers = last_member_end
+        candidates.append(text[start:index] + "".join(reversed(member_closers)))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Could not recover JSON from truncated response")
+
+
+def validate_metadata(data):
+    """
+    Splits metadata into its valid fields and the fields that need repair.
+
+    Tags given as a comma-separated string are converted to a list rather than
+    being treated as invalid.
+
+    Args:
+        data (dict): The parsed metadata.
+
+    Returns:
+        tuple: A dictionary of valid fields and a list of missing or invalid field names.
+    """
+    if not isinstance(data, dict):
+        return {}, list(METADATA_FIELDS)
+
+    valid = {}
+    for field in ("short_description", "detailed_description"):
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            valid[field] = value.strip()
+
+    tags = data.get("tags")
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+        valid["tags"] = tags
+
+    return valid, [field for field in METADATA_FIELDS if field not in valid]
+
+
+def metadata_response_format(fields=None):
+    """
+    Builds a JSON-schema ``response_format`` for the given metadata fields.
+
+    Args:
+        fields (list): The fields to request; all metadata fields by default.
+
+    Returns:
+        dict: The ``response_format`` argument for a chat completion.
+    """
+    fields = fields or METADATA_FIELDS
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "game_metadata",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {field: _FIELD_SCHEMAS[field] for field in fields},
+                "required": list(fields),
+                "additionalProperties": False,
+            },
+        },
+    }
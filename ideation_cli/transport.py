@@ -0,0 +1,171 @@
+"""
+transport.py - Shared HTTP transport for the Ideation CLI.
+
+Every API call and cover download goes through one `httpx` client: the
+OpenAI client is built on it and covers are downloaded with it. Its
+connection pool is sized for the run's concurrency and keeps connections
+alive between requests, so concurrent ideas reuse warm TLS connections
+instead of paying for a handshake per request. HTTP/2 is used when the
+optional `h2` package is installed (``pip install httpx[http2]``), which
+multiplexes concurrent requests over a single connection.
+
+The transport counts requests, new connections and TLS handshakes through
+httpcore's trace extension, to report how well connections are reused. It
+also counts the API client's own retries and every 429 response in the
+live metrics, including those the client retries without surfacing them.
+
+Classes:
+    - Transport: The shared client, its configuration and statistics.
+
+Functions:
+    - pool_size(concurrency): The connection pool size for a concurrency.
+
+Constants:
+    - TRANSPORT: The process-wide transport.
+"""
+
+import threading
+
+import httpx
+
+from ideation_cli.metrics import METRICS
+
+try:
+    import h2  # noqa: F401 - only needed to enable HTTP/2 in httpx
+except ImportError:  # pragma: no cover - optional dependency
+    HTTP2_AVAILABLE = False
+else:
+    HTTP2_AVAILABLE = True
+
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 120.0
+
+# Seconds an idle connection is kept open for reuse.
+KEEPALIVE_EXPIRY = 60.0
+
+# Connections per concurrent idea: one to the API and one for a cover download.
+CONNECTIONS_PER_WORKER = 2
+
+# The smallest pool, for runs with little or no concurrency.
+MIN_POOL_SIZE = 10
+
+
+def pool_size(concurrency):
+    """Returns the connection pool size for ``concurrency`` ideas at a time."""
+    return max(MIN_POOL_SIZE, CONNECTIONS_PER_WORKER * max(1, concurrency))
+
+
+class Transport:
+    """The shared HTTP client used by every stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.client = None
+        self.http2 = False
+        self.configure()
+
+    def configure(
+        self,
+        concurrency=1,
+        http2=True,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+    ):
+        """
+        Builds the client for a run, replacing (and closing) the previous one.
+
+        Args:
+            concurrency (int): The number of ideas generated at the same time.
+            http2 (bool): Use HTTP/2 when the `h2` package is installed.
+            connect_timeout (float): Seconds to wait for a connection.
+            read_timeout (float): Seconds to wait for a response.
+
+        Returns:
+            httpx.Client: The new client.
+        """
+        size = pool_size(concurrency)
+        previous = self.client
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.client = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=size,
+                max_keepalive_connections=size,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            event_hooks={
+                "request": [self._trace_request],
+                "response": [self._count_response],
+            },
+        )
+        self.reset_stats()
+        if previous is not None:
+            previous.close()
+        return self.client
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {
+                "requests": 0,
+                "connections": 0,
+                "tls_handshakes": 0,
+            }
+
+    def _trace_request(self, request):
+        with self._lock:
+            self._stats["requests"] += 1
+        request.extensions["trace"] = self._trace
+        # The OpenAI client numbers its attempts at a request in this header.
+        if request.headers.get("x-stainless-retry-count", "0") != "0":
+            METRICS.inc("ideation_api_retries_total", source="client")
+
+    @staticmethod
+    def _count_response(response):
+        if response.status_code == 429:
+            METRICS.inc("ideation_rate_limited_responses_total")
+
+    def _trace(self, event, info):
+        if event == "connection.connect_tcp.complete":
+            key = "connections"
+        elif event == "connection.start_tls.complete":
+            key = "tls_handshakes"
+        else:
+            return
+        with self._lock:
+            self._stats[key] += 1
+
+    def download(self, url):
+        """Downloads a file and returns its content."""
+        response = self.client.get(url)
+        response.raise_for_status()
+        return response.content
+
+    def stats(self):
+        """
+        Returns the request and connection counts of the current client.
+
+        Returns:
+            dict: ``requests``, ``connections`` (new TCP connections),
+            ``tls_handshakes``, ``reused`` (the share of requests sent on an
+            existing connection) and ``http2``.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["requests"]
+        stats["reused"] = (
+            max(0.0, 1 - stats["connections"] / requests) if requests else 0.0
+        )
+        stats["http2"] = self.http2
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        return (
+            f"Connections: {stats['requests']} request(s) over {stats['connections']} "
+            f"new connection(s), {stats['reused']:.0%} reused"
+            f"{', HTTP/2' if stats['http2'] else ''}."
+        )
+
+
+TRANSPORT = Transport()
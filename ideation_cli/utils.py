@@ -11,7 +11,9 @@ Functions:
     - apply_oblique_strategy(prompt): Modify a prompt using a random Oblique Strategy.
     - validate_model(model): Ensure a model name is valid, defaulting to a predefined model.
     - create_game_id(prompt_name): Generate a game ID by removing spaces from the prompt name.
+    - build_parser(): Build the argument parser for the CLI's run options.
     - parse_arguments(): Parse command-line arguments for the CLI.
+    - iter_idea_dirs(root): Yield the directories of the saved ideas under an output path.
 
 Constants:
     - MODEL_CHOICES: A predefined list of available model options.
@@ -28,22 +30,36 @@ Usage:
 import argparse
 import os
 import sys
-from json import dump, load
+from json import load
 
 import questionary
 
-from . import MODEL_CHOICES, IDEATION_TECHNIQUES
-
-
-def parse_arguments():
+from . import (
+    MODEL_CHOICES,
+    IDEATION_TECHNIQUES,
+    LAYOUTS,
+    RANK_METHODS,
+    DEFAULT_REFINE_ROUNDS,
+)
+from .agents import DEFAULT_CONCURRENCY, DEFAULT_MAX_TOKENS
+from .chains import technique_chain
+from .covers import DEFAULT_MAX_MB
+from .metrics import DEFAULT_INTERVAL, METRICS
+from .routing import parse_stage_assignment
+from .transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from .writer import write_json
+
+
+def build_parser():
     """
-    Parses command-line arguments for the Ideation CLI.
+    Builds the argument parser for the Ideation CLI's run options.
 
     This function sets up argument parsing for various options related to game
-    generation, branding, and customization of software prompts.
+    generation, branding, and customization of software prompts. Subcommands
+    that run ideas, such as ``serve``, extend this parser with their own options.
 
     Returns:
-        argparse.Namespace: An object containing the parsed command-line arguments.
+        argparse.ArgumentParser: The parser.
     """
 
     parser = argparse.ArgumentParser(
@@ -61,9 +77,43 @@ def parse_arguments():
     # Ideation technique selection
     parser.add_argument(
         "--ideation-technique",
-        type=str,
-        choices=IDEATION_TECHNIQUES,
-        help="Select an ideation technique from available choices.",
+        type=technique_chain,
+        metavar="TECHNIQUE[,TECHNIQUE*N...]",
+        help=(
+            "Select an ideation technique, or chain several, e.g. scamper,crazy_eights*8: "
+            "each stage develops the previous one's output, *N fans out into N branches. "
+            f"Choices: {', '.join(IDEATION_TECHNIQUES)}."
+        ),
+    )
+
+    # Rounds of critique and revision for the round_robin technique
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=DEFAULT_REFINE_ROUNDS,
+        metavar="K",
+        help="Rounds of critique and revision applied by the round_robin technique.",
+    )
+
+    # Multi-agent ideation
+    parser.add_argument(
+        "--agents",
+        action="store_true",
+        help="Develop each idea with designer, critic and marketer agents working concurrently.",
+    )
+    parser.add_argument(
+        "--agent-concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        metavar="N",
+        help="Most agent turns in flight at once, across all ideas.",
+    )
+    parser.add_argument(
+        "--agent-max-tokens",
+        type=int,
+        default=DEFAULT_MAX_TOKENS,
+        metavar="TOKENS",
+        help="Most tokens the agent turns of one idea may use; turns that no longer fit are skipped.",
     )
 
     # Flag to generate cover images, descriptions, and tags for branding
@@ -88,6 +138,14 @@ def parse_arguments():
         help="Directory where ideas will be saved.",
     )
 
+    # Layout of the idea directories under the output path
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS,
+        default="flat",
+        help="Save ideas in <game_type>/<id>, or sharded in <game_type>/ab/cd/<id> for very large trees.",
+    )
+
     # Argument to specify the type of game to create
     parser.add_argument(
         "--game-type",
@@ -148,6 +206,214 @@ def parse_arguments():
         help="A theme for the ideation engine to work with",
     )
 
+    # Number of ideas generated at the same time
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="How many ideas to generate concurrently.",
+    )
+
+    # Wall-clock budget for the whole run
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Stop starting new ideas once the run would exceed this many seconds.",
+    )
+
+    # Spend budget for the whole run
+    parser.add_argument(
+        "--max-cost",
+        type=float,
+        help="Stop starting new ideas once the run would exceed this cost in USD.",
+    )
+
+    # Always generate new cover images instead of reusing cached ones
+    parser.add_argument(
+        "--fresh-images",
+        action="store_true",
+        help="Generate new cover images even when a cached cover matches the request.",
+    )
+
+    # Size limit of the cover image store
+    parser.add_argument(
+        "--cover-cache-mb",
+        type=int,
+        default=DEFAULT_MAX_MB,
+        help="Size limit of the cover image store; least recently used covers are evicted.",
+    )
+
+    # Two-phase mode: generate every idea, then render covers for the best ones only
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        help="With --image, generate all ideas first and render covers only for the top K.",
+    )
+
+    # How ideas are ranked in two-phase mode
+    parser.add_argument(
+        "--rank",
+        type=str,
+        choices=RANK_METHODS,
+        default="heuristic",
+        help="Rank ideas with local heuristics or a single call to a small model.",
+    )
+
+    # Dry run: estimate the calls, tokens, time and cost without calling any API
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the calls, tokens, wall time and cost the run would need, without running it.",
+    )
+
+    # Built-in profiling
+    parser.add_argument(
+        "--profile",
+        type=str,
+        metavar="DIR",
+        help="Profile CPU time and memory per idea and write the reports to DIR.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        help="Number of hotspots printed at the end of a profiled run.",
+    )
+
+    # Live metrics for dashboards
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve live Prometheus metrics at http://127.0.0.1:PORT/metrics.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        metavar="FILE",
+        help="Write live Prometheus metrics to FILE for a textfile collector.",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help="Seconds between writes of --metrics-file.",
+    )
+
+    # Live progress view
+    parser.add_argument(
+        "--dashboard",
+        action="store_true",
+        help="Show live progress in place on a terminal, or log it as JSON lines otherwise.",
+    )
+    parser.add_argument(
+        "--dashboard-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between JSON progress lines when stdout is not a terminal.",
+    )
+
+    # Reproducible, non-repeating random prompts
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed the random game type and strategy draws for reproducible runs.",
+    )
+    parser.add_argument(
+        "--avoid-saturated",
+        action="store_true",
+        help="Leave the game types reported saturated by `ideation-cli clusters` out of random draws.",
+    )
+
+    # Shared HTTP transport
+    parser.add_argument(
+        "--no-http2",
+        action="store_true",
+        help="Use HTTP/1.1 even when HTTP/2 support (the h2 package) is installed.",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="Seconds to wait for a connection to the API.",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help="Seconds to wait for an API response.",
+    )
+
+    # Pool of API keys and endpoints to balance calls over
+    parser.add_argument(
+        "--endpoints",
+        type=str,
+        metavar="FILE",
+        help="JSON file listing API keys and endpoints to load-balance calls over.",
+    )
+
+    # Record API traffic, or replay it offline
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="DIR",
+        help="Record every API call and its latency to a cassette in DIR.",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        metavar="DIR",
+        help="Serve API calls from the cassette in DIR instead of the network.",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        metavar="SCALE",
+        help="With --replay, wait for each recorded latency times SCALE (1 reproduces them).",
+    )
+
+    # Interactive mode: prefetch random ideas while the questions are answered
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        metavar="N",
+        help="In interactive mode, keep a pool of N prefetched random ideas for the current settings.",
+    )
+
+    # Per-stage model routing, e.g. --stage-model name=gpt-4o-mini
+    parser.add_argument(
+        "--stage-model",
+        type=parse_stage_assignment,
+        action="append",
+        default=[],
+        metavar="STAGE=MODEL",
+        help="Route a pipeline stage (ideas, refine, name, metadata, image_prompt, rank) to a specific model.",
+    )
+
+    # Per-stage latency SLO, e.g. --stage-slo name=5
+    parser.add_argument(
+        "--stage-slo",
+        type=parse_stage_assignment,
+        action="append",
+        default=[],
+        metavar="STAGE=SECONDS",
+        help="Latency SLO for a stage; when breached the stage falls back to the next model.",
+    )
+
+    return parser
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments for the Ideation CLI.
+
+    Returns:
+        argparse.Namespace: An object containing the parsed command-line arguments.
+    """
+    parser = build_parser()
+
     # If no command-line arguments (other than the script name) are given, print help and exit.
     if len(sys.argv) == 1:
         parser.print_help()
@@ -205,10 +471,14 @@ def load_json(filepath):
         return load(file)
 
 
-def use_interactive_mode():
+def use_interactive_mode(on_settings=None):
     """
     Runs an interactive prompt to gather user input for generating ideas.
 
+    The questions that decide how an idea is generated come first; once they
+    are answered ``on_settings`` is called with those answers, so the caller
+    can start work while the remaining questions are asked.
+
     This function prompts the user for each option available via the command-line:
         - randomize (bool): Enable random game and strategy selection.
         - oblique_strategy (bool): Apply an Oblique Strategy.
@@ -221,6 +491,10 @@ def use_interactive_mode():
         - count (int): How many ideas to generate.
         - name (str): The name to use (if not provided, a random one will be generated based on the task).
 
+    Args:
+        on_settings (callable): Called with the ``randomize``,
+            ``ideation_technique`` and ``model`` answers.
+
     Returns:
         dict: A dictionary containing the interactive input for each option.
     """
@@ -228,6 +502,27 @@ def use_interactive_mode():
     # Boolean flags
     randomize = questionary.confirm("Enable random game and strategy selection?").ask()
 
+    # Choice for ideation technique
+    ideation_technique = questionary.select(
+        "Choose an ideation technique:",
+        choices=IDEATION_TECHNIQUES,
+        default="Oblique Strategy",
+    ).ask()
+
+    # Choice for AI model
+    model = questionary.select(
+        "Select an AI model:", choices=MODEL_CHOICES, default="gpt-4o"
+    ).ask()
+
+    if on_settings is not None:
+        on_settings(
+            {
+                "randomize": randomize,
+                "ideation_technique": ideation_technique,
+                "model": model,
+            }
+        )
+
     cover = questionary.confirm("Generate a cover image?").ask()
 
     # Text inputs
@@ -244,18 +539,6 @@ def use_interactive_mode():
 
     name = questionary.text("Enter a name to use (leave blank for random):").ask()
 
-    # Choice for ideation technique
-    ideation_technique = questionary.select(
-        "Choose an ideation technique:",
-        choices=IDEATION_TECHNIQUES,
-        default="Oblique Strategy",
-    ).ask()
-
-    # Choice for AI model
-    model = questionary.select(
-        "Select an AI model:", choices=MODEL_CHOICES, default="gpt-4o"
-    ).ask()
-
     # Numeric input for count
     count_input = questionary.text(
         "How many ideas should be generated? (Default: 1)"
@@ -278,13 +561,31 @@ def use_interactive_mode():
     }
 
 
+def iter_idea_dirs(root):
+    """
+    Yields the directory of every saved idea under an output path.
+
+    Hidden directories, such as the cover store and other indexes, are skipped.
+
+    Args:
+        root (str): The output path.
+
+    Yields:
+        str: Each directory holding a ``metadata.json``, in sorted order.
+    """
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(name for name in dir_names if not name.startswith("."))
+        if "metadata.json" in file_names:
+            yield dir_path
+
+
 def save_args_to_json(data, dir_path):
     """Save arguments to a timestamped JSON file, ensuring the directory exists."""
     # Define file path
     json_file = os.path.join(dir_path, "metadata.json")
 
-    # Save data to JSON
-    with open(json_file, "w", encoding="utf-8") as file_obj:
-        dump(data, file_obj, indent=4)
+    # Save data to JSON atomically, on the background writer when it is running.
+    write_json(json_file, data)
+    METRICS.inc("ideation_metadata_saves_total")
 
     # print(f"Saved run output to {json_file}")
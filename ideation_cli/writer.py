@@ -0,0 +1,297 @@
+"""
+writer.py - Atomic, background file persistence for the Ideation CLI.
+
+All output files (idea metadata, cover images and store indexes) are written
+through this module. Every write goes to a temporary file in the target
+directory which is fsynced and then renamed over the target, so a crash
+never leaves a truncated file behind.
+
+While the background writer is running, writes are queued on a bounded queue
+and performed by a single thread, so iterations waiting on the network never
+wait on the disk. The thread takes writes off the queue in batches: the file
+fsyncs of a batch are issued together on a small pool of threads, so the
+device can flush them at once, and each directory is fsynced once per batch.
+Renames and links then run in the order they were queued, so a link to a
+file queued earlier always sees the finished file. A failed operation
+is recorded, its temp file removed, and the writer carries on; closing the
+writer drains the queue and reports the failures. When the writer is not
+running, the same atomic writes happen inline.
+
+Classes:
+    - BackgroundWriter: The queue and thread performing writes.
+
+Functions:
+    - atomic_write(path, data): Write bytes to a file atomically, inline.
+    - write_bytes(path, data): Write bytes atomically, in the background if possible.
+    - write_json(path, data): Write a JSON document atomically, in the background if possible.
+    - link(source, target): Hard-link (or copy) a file, after any queued writes.
+    - is_pending(path): Whether a write to the path is still queued.
+
+Constants:
+    - WRITER: The process-wide background writer.
+"""
+
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Maximum number of queued operations before producers block.
+DEFAULT_QUEUE_SIZE = 256
+
+# Maximum number of operations handled per batch.
+DEFAULT_BATCH_SIZE = 32
+
+# Number of threads issuing the fsyncs of a batch concurrently.
+FSYNC_WORKERS = 4
+
+_STOP = object()
+
+
+def _fsync_directory(directory):
+    """Fsync a directory so a rename inside it is durable (not supported everywhere)."""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_temp(path, data):
+    """Write data to a temporary file next to ``path`` and return its name and descriptor."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    return tmp_path, fd
+
+
+def _fsync_and_close(fd):
+    """Fsync and close a descriptor, returning the error instead of raising it."""
+    try:
+        os.fsync(fd)
+    except OSError as err:
+        return err
+    finally:
+        os.close(fd)
+    return None
+
+
+def _link_or_copy(source, target):
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def atomic_write(path, data):
+    """
+    Writes bytes to a file atomically.
+
+    Args:
+        path (str): The file to write.
+        data (bytes): The content.
+    """
+    tmp_path, fd = _write_temp(path, data)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(path))
+
+
+class BackgroundWriter:
+    """Performs file writes on a background thread from a bounded queue."""
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._queue = None
+        self._thread = None
+        self._fsyncs = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self.errors = []
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def depth(self):
+        """The number of operations waiting in the queue."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Start the writer thread if it is not already running."""
+        if self.running:
+            return
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self.errors = []
+        self._fsyncs = ThreadPoolExecutor(
+            max_workers=FSYNC_WORKERS, thread_name_prefix="ideation-fsync"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="ideation-writer", daemon=True
+        )
+        self._thread.start()
+
+    def flush(self):
+        """Block until every operation queued so far has been performed."""
+        if self.running:
+            self._queue.join()
+
+    def close(self):
+        """Drain the queue, stop the writer thread and report any failed writes."""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._fsyncs.shutdown()
+        self._fsyncs = None
+        for path, err in self.errors:
+            print(f"Error: Failed to write {path}: {err}")
+
+    def submit(self, kind, path, payload):
+        """Queue an operation, blocking while the queue is full."""
+        with self._pending_lock:
+            self._pending[path] = self._pending.get(path, 0) + 1
+        self._queue.put((kind, path, payload))
+
+    def is_pending(self, path):
+        with self._pending_lock:
+            return path in self._pending
+
+    def _done(self, path):
+        with self._pending_lock:
+            self._pending[path] -= 1
+            if not self._pending[path]:
+                del self._pending[path]
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+            operations = [operation for operation in batch if operation is not _STOP]
+            try:
+                self._process(operations)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _fail(self, path, err, tmp_path=None):
+        self.errors.append((path, err))
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self._done(path)
+
+    def _process(self, batch):
+        """Write a batch: temp files and concurrent fsyncs, then renames and links in queue order."""
+        written = []
+        for position, (kind, path, payload) in enumerate(batch):
+            if kind != "write":
+                continue
+            try:
+                tmp_path, fd = _write_temp(path, payload)
+            except OSError as err:
+                self._fail(path, err)
+                continue
+            written.append((position, path, tmp_path, fd))
+
+        fsync_map = self._fsyncs.map if self._fsyncs is not None else map
+        fds = [fd for _, _, _, fd in written]
+        prepared = {}
+        for (position, path, tmp_path, _), err in zip(
+            written, fsync_map(_fsync_and_close, fds)
+        ):
+            if err is not None:
+                self._fail(path, err, tmp_path)
+            else:
+                prepared[position] = tmp_path
+
+        directories = set()
+        for position, (kind, path, payload) in enumerate(batch):
+            if kind == "write" and position not in prepared:
+                continue  # Already reported as failed.
+            try:
+                if kind == "write":
+                    os.replace(prepared[position], path)
+                else:
+                    _link_or_copy(payload, path)
+            except OSError as err:
+                self._fail(path, err, prepared.get(position))
+                continue
+            directories.add(os.path.dirname(path))
+            self._done(path)
+
+        for directory in directories:
+            _fsync_directory(directory)
+
+
+WRITER = BackgroundWriter()
+
+
+def write_bytes(path, data):
+    """
+    Writes bytes to a file atomically, on the background writer when it is running.
+
+    Args:
+        path (str): The file to write.
+        data (bytes): The content.
+    """
+    if WRITER.running:
+        WRITER.submit("write", path, bytes(data))
+    else:
+        atomic_write(path, data)
+
+
+def write_json(path, data):
+    """Writes a JSON document atomically, on the background writer when it is running."""
+    write_bytes(path, json.dumps(data, indent=4).encode("utf-8"))
+
+
+def link(source, target):
+    """
+    Hard-links ``source`` to ``target``, copying when linking fails.
+
+    On the background writer the link runs after every write queued before
+    it, so ``source`` may itself still be queued.
+    """
+    if WRITER.running:
+        WRITER.submit("link", target, source)
+    else:
+        _link_or_copy(source, target)
+
+
+def is_pending(path):
+    """Returns True while a write or link to ``path`` is still queued."""
+    return WRITER.is_pending(path)
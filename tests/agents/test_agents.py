@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from ideation_cli import agents
+from ideation_cli.agents import AgentTeam, TokenBudget
+
+pytestmark = pytest.mark.unit
+
+
+class FakeTurn:
+    """Replies with the agent's role, recording each turn and the turns in flight."""
+
+    def __init__(self, delay=0.0, tokens=150):
+        self.delay = delay
+        self.tokens = tokens
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, system_prompt, messages, model, max_tokens):
+        role = next(
+            name for name, prompt in agents.ROLES.items() if prompt == system_prompt
+        )
+        with self._lock:
+            self.calls.append((role, messages, max_tokens))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return f"{role} reply {len(messages)}", self.tokens
+
+
+def test_work_revises_the_design_with_the_notes():
+    team = AgentTeam()
+    turn = FakeTurn()
+
+    task, transcript = team.work("A puzzle game", "gpt-4o", turn)
+
+    assert task == "designer reply 3"
+    assert sorted(entry["agent"] for entry in transcript[:3]) == [
+        "critic",
+        "designer",
+        "marketer",
+    ]
+    assert transcript[-1]["agent"] == "designer"
+    revision = turn.calls[-1][1]
+    assert "critic reply 1" in revision[-1]["content"]
+    assert "marketer reply 1" in revision[-1]["content"]
+    assert revision[0]["content"] == agents.BRIEF.format(task="A puzzle game")
+
+
+def test_first_turns_run_concurrently():
+    team = AgentTeam()
+    turn = FakeTurn(delay=0.1)
+
+    team.work("A puzzle game", "gpt-4o", turn)
+
+    assert turn.peak == 3
+
+
+def test_concurrency_is_shared_across_ideas():
+    team = AgentTeam()
+    team.configure(concurrency=2)
+    turn = FakeTurn(delay=0.05)
+
+    threads = [
+        threading.Thread(target=team.work, args=(f"Idea {n}", "gpt-4o", turn))
+        for n in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(turn.calls) == 12
+    assert turn.peak == 2
+
+
+def test_turns_that_do_not_fit_the_budget_are_skipped(capsys):
+    team = AgentTeam()
+    # Room for the three first turns, but not for the revision.
+    team.configure(max_tokens=3 * agents.TURN_MAX_TOKENS)
+    turn = FakeTurn(tokens=agents.TURN_MAX_TOKENS)
+
+    task, transcript = team.work("A puzzle game", "gpt-4o", turn)
+
+    assert len(turn.calls) == 3
+    assert task == "designer reply 1"
+    assert "skipping" in capsys.readouterr().out
+
+
+def test_work_keeps_the_task_without_a_design():
+    team = AgentTeam()
+    team.configure(max_tokens=10)
+
+    task, transcript = team.work("A puzzle game", "gpt-4o", FakeTurn())
+
+    assert task == "A puzzle game"
+    assert transcript == []
+
+
+def test_token_budget_returns_unused_tokens():
+    budget = TokenBudget(1000)
+
+    reserved = budget.reserve(100)
+    budget.settle(100 + reserved, 250)
+
+    assert reserved == agents.TURN_MAX_TOKENS
+    assert budget.remaining == 750
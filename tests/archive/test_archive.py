@@ -0,0 +1,106 @@
+import json
+import os
+import tarfile
+
+import pytest
+
+from ideation_cli.archive import IdeaArchive, index_path, pack, unpack_main
+
+pytestmark = pytest.mark.unit
+
+
+def save_idea(root, path, name, cover=None):
+    dir_path = os.path.join(root, *path.split("/"))
+    os.makedirs(dir_path)
+    with open(os.path.join(dir_path, "metadata.json"), "w", encoding="utf-8") as file:
+        json.dump({"name": name}, file)
+    if cover is not None:
+        with open(os.path.join(dir_path, "cover.png"), "wb") as file:
+            file.write(cover)
+
+
+@pytest.fixture
+def packed(tmp_path):
+    root = tmp_path / "ideas"
+    save_idea(str(root), "Puzzle/Tides_1", "Tides", cover=b"\x89PNG" + b"t" * 1000)
+    save_idea(str(root), "Puzzle/Empty_2", "Empty", cover=b"")
+    save_idea(str(root), "Racing/Drift_3", "Drift")
+    # Hidden stores and indexes are not packed.
+    os.makedirs(root / ".covers")
+    (root / ".covers" / "x.png").write_bytes(b"x")
+    archive_path = str(tmp_path / "ideas.tar")
+    pack(str(root), archive_path)
+    return archive_path
+
+
+def test_pack_writes_a_plain_tar(packed):
+    with tarfile.open(packed) as tar:
+        names = tar.getnames()
+        cover = tar.extractfile("Puzzle/Tides_1/cover.png").read()
+
+    assert sorted(names) == [
+        "Puzzle/Empty_2/cover.png",
+        "Puzzle/Empty_2/metadata.json",
+        "Puzzle/Tides_1/cover.png",
+        "Puzzle/Tides_1/metadata.json",
+        "Racing/Drift_3/metadata.json",
+    ]
+    assert cover == b"\x89PNG" + b"t" * 1000
+
+
+def test_archive_lists_and_reads_single_ideas(packed):
+    with IdeaArchive(packed) as archive:
+        ideas = {entry["path"]: entry["name"] for entry in archive.ideas()}
+        metadata = archive.metadata("Racing/Drift_3")
+        cover = archive.read("Puzzle/Tides_1", "cover.png")
+
+    assert ideas == {
+        "Puzzle/Empty_2": "Empty",
+        "Puzzle/Tides_1": "Tides",
+        "Racing/Drift_3": "Drift",
+    }
+    assert metadata == {"name": "Drift"}
+    assert cover.startswith(b"\x89PNG")
+
+
+def test_archive_rebuilds_a_missing_index(packed):
+    with IdeaArchive(packed) as archive:
+        expected = archive.ideas()
+    os.remove(index_path(packed))
+
+    with IdeaArchive(packed) as archive:
+        assert archive.ideas() == expected
+        assert archive.metadata("Puzzle/Tides_1") == {"name": "Tides"}
+
+
+def test_unpack_extracts_selected_covers(packed, tmp_path):
+    out = tmp_path / "out"
+
+    unpack_main([packed, "--path", str(out), "--idea", "Puzzle/*", "--covers-only"])
+
+    assert (
+        (out / "Puzzle" / "Tides_1" / "cover.png").read_bytes().startswith(b"\x89PNG")
+    )
+    assert (out / "Puzzle" / "Empty_2" / "cover.png").read_bytes() == b""
+    assert not (out / "Puzzle" / "Tides_1" / "metadata.json").exists()
+    assert not (out / "Racing").exists()
+
+
+def test_unpack_round_trips_the_tree(packed, tmp_path):
+    out = tmp_path / "out"
+
+    unpack_main([packed, "--path", str(out)])
+
+    source = tmp_path / "ideas"
+    for path in ["Puzzle/Tides_1/cover.png", "Racing/Drift_3/metadata.json"]:
+        assert (out / path).read_bytes() == (source / path).read_bytes()
+
+
+def test_extract_rejects_paths_outside_the_destination(packed, tmp_path):
+    with IdeaArchive(packed) as archive:
+        archive.index["ideas"][0]["path"] = "../escaped"
+        with pytest.raises(ValueError):
+            archive.extract(str(tmp_path / "out"))
+
+    assert not (tmp_path / "escaped").exists()
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,106 @@
+import argparse
+
+import pytest
+
+from ideation_cli import budget
+from ideation_cli.budget import CHEAP, FULL, NO_IMAGE, STOP, RunBudget
+from ideation_cli.routing import ModelRouter
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_budget(**kwargs):
+    clock = FakeClock()
+    return RunBudget(router=ModelRouter(), clock=clock, **kwargs), clock
+
+
+def test_estimate_cost_uses_model_pricing():
+    # gpt-4o-mini: $0.15 / $0.60 per million tokens.
+    assert budget.estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(
+        0.75
+    )
+
+
+def test_unlimited_budget_keeps_requested_mode():
+    run_budget, _ = make_budget()
+    assert run_budget.plan(10, [], 1, "gpt-4o", image=True) == FULL
+    assert run_budget.plan(10, [], 1, "gpt-4o", image=False) == NO_IMAGE
+
+
+def test_spent_includes_chat_tokens_and_images():
+    run_budget, _ = make_budget()
+    run_budget.router.record(
+        "metadata", "gpt-4o", 1.0, prompt_tokens=1_000_000, completion_tokens=0
+    )
+    run_budget.router.record("image", "dall-e-3", 10.0)
+    assert run_budget.spent() == pytest.approx(2.50 + 0.04)
+
+
+def test_predict_stage_uses_live_measurements():
+    run_budget, _ = make_budget()
+    assert run_budget.predict_stage("name", "gpt-4o-mini")[0] == (
+        budget.DEFAULT_STAGE_LATENCY["name"]
+    )
+    run_budget.router.record("name", "gpt-4o-mini", 0.5)
+    run_budget.router.record("name", "gpt-4o-mini", 1.5)
+    assert run_budget.predict_stage("name", "gpt-4o-mini")[0] == pytest.approx(1.0)
+
+
+def test_tight_deadline_drops_images_first():
+    full_latency = sum(budget.DEFAULT_STAGE_LATENCY[s] for s in ["name", "metadata"])
+    image_latency = budget.DEFAULT_STAGE_LATENCY["image_prompt"] + (
+        budget.DEFAULT_STAGE_LATENCY["image"]
+    )
+    run_budget, _ = make_budget(max_seconds=full_latency + image_latency / 2)
+    assert run_budget.plan(1, [], 1, "gpt-4o", image=True) == NO_IMAGE
+
+
+def test_tight_cost_switches_to_cheap_model():
+    run_budget, _ = make_budget()
+    _, text_cost = run_budget.predict_idea("gpt-4o", NO_IMAGE)
+    _, cheap_cost = run_budget.predict_idea("gpt-4o", CHEAP)
+    run_budget.max_cost = 10 * (text_cost + cheap_cost) / 2
+    assert run_budget.plan(10, [], 1, "gpt-4o", image=True) == CHEAP
+
+
+def test_exhausted_budget_stops():
+    run_budget, clock = make_budget(max_seconds=60)
+    clock.now = 61
+    assert run_budget.plan(3, [], 1, "gpt-4o", image=False) == STOP
+
+
+def test_idea_stages_follow_the_run_options():
+    plain = budget.idea_stages(argparse.Namespace(ideation_technique=None))
+    assert set(plain) == {"name", "metadata"}
+
+    refined = budget.idea_stages(
+        argparse.Namespace(ideation_technique="round_robin", rounds=2, agents=True)
+    )
+    assert refined["refine"] == (2, 2)
+    assert refined["agents"] == (budget.AGENT_TURNS, budget.AGENT_SERIAL_TURNS)
+
+    # A chain of 2 x 3 branches yields six ideas, which share its eight calls.
+    chained = budget.idea_stages(
+        argparse.Namespace(ideation_technique="scamper*2,mash_up*3", name="Fixed")
+    )
+    assert chained["ideas"][0] == pytest.approx(8 / 6)
+    assert "name" not in chained
+
+
+def test_expensive_options_are_priced():
+    plain, _ = make_budget()
+    agents = RunBudget(
+        router=ModelRouter(),
+        stages=budget.idea_stages(argparse.Namespace(agents=True)),
+    )
+    assert agents.predict_idea("gpt-4o", NO_IMAGE)[1] > (
+        plain.predict_idea("gpt-4o", NO_IMAGE)[1]
+    )
@@ -0,0 +1,99 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from ideation_cli import generator
+from ideation_cli.cassettes import Cassette
+
+pytestmark = pytest.mark.unit
+
+
+def record(directory, calls):
+    cassette = Cassette()
+    cassette.configure(record=str(directory))
+    for kind, model, request, response in calls:
+        assert cassette.play(kind, model, request, lambda: response) == response
+    return cassette
+
+
+def test_replay_serves_recordings_in_order(tmp_path):
+    record(
+        tmp_path,
+        [
+            ("chat", "gpt-4o", {"prompt": "name"}, {"content": "First"}),
+            ("chat", "gpt-4o", {"prompt": "name"}, {"content": "Second"}),
+            ("download", "dall-e-3", {"url": "u"}, b"\x89PNG"),
+        ],
+    )
+    assert sorted(os.listdir(tmp_path)) == ["chat.jsonl", "download.jsonl"]
+
+    cassette = Cassette()
+    cassette.configure(replay=str(tmp_path))
+
+    def offline():
+        raise AssertionError("Replay must not make real calls.")
+
+    assert cassette.play("chat", "gpt-4o", {"prompt": "name"}, offline) == {
+        "content": "First"
+    }
+    assert cassette.play("chat", "gpt-4o", {"prompt": "name"}, offline) == {
+        "content": "Second"
+    }
+    assert cassette.play("download", "dall-e-3", {"url": "u"}, offline) == b"\x89PNG"
+    assert cassette.misses == 0
+
+
+def test_inexact_requests_replay_same_model(tmp_path):
+    record(tmp_path, [("chat", "gpt-4o", {"prompt": "a"}, {"content": "A"})])
+    cassette = Cassette()
+    cassette.configure(replay=str(tmp_path))
+    assert cassette.play("chat", "gpt-4o", {"prompt": "b"}, None) == {"content": "A"}
+    assert cassette.misses == 1
+    with pytest.raises(LookupError):
+        cassette.play("chat", "o4-mini", {"prompt": "b"}, None)
+
+
+def test_replay_reproduces_scaled_latency(tmp_path):
+    record(tmp_path, [("chat", "gpt-4o", {}, {"content": "A"})])
+    lines = (
+        (tmp_path / "chat.jsonl")
+        .read_text()
+        .replace('"latency": 0.0', '"latency": 2.0')
+    )
+    (tmp_path / "chat.jsonl").write_text(lines)
+
+    slept = []
+    cassette = Cassette(sleep=slept.append)
+    cassette.configure(replay=str(tmp_path), latency_scale=0.5)
+    cassette.play("chat", "gpt-4o", {}, None)
+    assert slept == [1.0]
+
+
+def test_invalid_configurations(tmp_path):
+    with pytest.raises(ValueError, match="cannot be used together"):
+        Cassette().configure(record=str(tmp_path), replay=str(tmp_path))
+    with pytest.raises(ValueError, match="No recordings"):
+        Cassette().configure(replay=str(tmp_path))
+
+
+def test_generator_round_trip(monkeypatch, tmp_path):
+    response = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3),
+        choices=[SimpleNamespace(message=SimpleNamespace(content="Recorded Name"))],
+    )
+
+    cassette = Cassette()
+    monkeypatch.setattr(generator, "CASSETTE", cassette)
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions, "create", lambda **kwargs: response
+    )
+    cassette.configure(record=str(tmp_path))
+    assert generator.generate_name("task", "gpt-4o") == "Recorded Name"
+
+    def offline(**kwargs):
+        raise AssertionError("Replay must not make real calls.")
+
+    monkeypatch.setattr(generator.OPENAI_CLIENT.chat.completions, "create", offline)
+    cassette.configure(replay=str(tmp_path))
+    assert generator.generate_name("task", "gpt-4o") == "Recorded Name"
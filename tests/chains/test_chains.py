@@ -0,0 +1,156 @@
+import argparse
+import json
+import threading
+
+import pytest
+
+from ideation_cli.chains import (
+    TechniqueChains,
+    chain_stages,
+    leaves_per_chain,
+    parse_technique_chain,
+    technique_chain,
+)
+from ideation_cli.routing import ROUTER
+
+pytestmark = pytest.mark.unit
+
+
+class FakeArgs:
+    def __init__(self, **overrides):
+        self.task = "A puzzle game"
+        self.model = "gpt-4o"
+        self.ideation_technique = "scamper,crazy_eights*3"
+        self.randomize = False
+        self.theme = None
+        self.game_type = "Puzzle"
+        for key, value in overrides.items():
+            setattr(self, key, value)
+
+
+class FakeStep:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, technique, artifact, model):
+        with self._lock:
+            self.calls.append((technique, artifact))
+            return f"{artifact} > {technique}#{len(self.calls)}"
+
+
+def resolve():
+    return "A puzzle game", "Puzzle"
+
+
+def test_parse_technique_chain():
+    assert parse_technique_chain("scamper, crazy_eights*8") == [
+        ("scamper", 1),
+        ("crazy_eights", 8),
+    ]
+    assert technique_chain(" scamper ,mash_up*1") == "scamper,mash_up"
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_technique_chain("scamper,unknown")
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_technique_chain("crazy_eights*0")
+
+
+def test_single_technique_is_not_a_chain():
+    assert chain_stages(None) is None
+    assert chain_stages("scamper") is None
+    assert chain_stages("crazy_eights*2") == [("crazy_eights", 2)]
+    assert leaves_per_chain([("scamper", 1), ("crazy_eights", 3), ("mash_up", 2)]) == 6
+
+
+def test_expand_feeds_each_stage_into_the_next():
+    step = FakeStep()
+    leaves = TechniqueChains().expand(
+        "Task", [("scamper", 1), ("crazy_eights", 3), ("mash_up", 1)], "gpt-4o", step
+    )
+    assert len(leaves) == 3
+    assert len(step.calls) == 1 + 3 + 3
+    for leaf in leaves:
+        assert [s["technique"] for s in leaf["steps"]] == [
+            "scamper",
+            "crazy_eights",
+            "mash_up",
+        ]
+        assert leaf["steps"][1]["output"].startswith(leaf["steps"][0]["output"])
+        assert leaf["task"] == leaf["steps"][-1]["output"]
+    # Each branch of a fan-out is a separate variant.
+    assert len({leaf["task"] for leaf in leaves}) == 3
+
+
+def test_take_hands_out_leaves_before_running_again(tmp_path):
+    chains = TechniqueChains()
+    chains.configure(str(tmp_path / ".chains.json"))
+    step = FakeStep()
+    args = FakeArgs()
+
+    leaves = [
+        chains.take(args, parse_technique_chain(args.ideation_technique), resolve, step)
+        for _ in range(3)
+    ]
+    assert len(step.calls) == 4
+    assert len({leaf["task"] for leaf in leaves}) == 3
+    assert leaves[0]["game_type"] == "Puzzle"
+    assert chains.pending(args) == 0
+
+    # Once the leaves are used up, the chain runs again from a fresh first stage.
+    chains.take(args, parse_technique_chain(args.ideation_technique), resolve, step)
+    assert len(step.calls) == 8
+
+
+def test_extended_chain_reuses_cached_stages(tmp_path):
+    path = tmp_path / ".chains.json"
+    chains = TechniqueChains()
+    chains.configure(str(path))
+    step = FakeStep()
+    short = FakeArgs(ideation_technique="scamper,opposite_thinking")
+    chains.take(short, parse_technique_chain(short.ideation_technique), resolve, step)
+    assert len(step.calls) == 2
+    assert len(json.loads(path.read_text())["steps"]) == 2
+
+    # A new process extending the chain only pays for the new stage.
+    chains = TechniqueChains()
+    chains.configure(str(path))
+    longer = FakeArgs(ideation_technique="scamper,opposite_thinking,mash_up")
+    leaf = chains.take(
+        longer, parse_technique_chain(longer.ideation_technique), resolve, step
+    )
+    assert len(step.calls) == 3
+    assert step.calls[-1][0] == "mash_up"
+    assert [s["technique"] for s in leaf["steps"]] == [
+        "scamper",
+        "opposite_thinking",
+        "mash_up",
+    ]
+
+
+def test_take_without_task_returns_none():
+    chains = TechniqueChains()
+    step = FakeStep()
+    args = FakeArgs()
+    assert chains.take(args, [("scamper", 2)], lambda: (None, None), step) is None
+    assert step.calls == []
+
+
+def test_steps_are_cached_per_effective_model(monkeypatch):
+    monkeypatch.setattr(ROUTER, "stage_models", {})
+    chains = TechniqueChains()
+    step = FakeStep()
+    stages = [("scamper", 1)]
+
+    chains.expand("Task", stages, "gpt-4o", step)
+    chains.expand("Task", stages, "gpt-4o", step)
+    assert len(step.calls) == 1
+
+    # A step run on a pinned cheap model is not reused for the run-level model.
+    with ROUTER.pinned("gpt-4o-mini"):
+        chains.expand("Task", stages, "gpt-4o", step)
+    assert len(step.calls) == 2
+
+    # Nor is one cached before --stage-model changed the ideas model.
+    monkeypatch.setattr(ROUTER, "stage_models", {"ideas": "o1-mini"})
+    chains.expand("Task", stages, "gpt-4o", step)
+    assert len(step.calls) == 3
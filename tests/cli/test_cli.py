@@ -1,11 +1,20 @@
 import json
 import os
 import tempfile
+import threading
 from datetime import datetime
 
 import pytest
 
-from ideation_cli.cli import cli, process_game_iteration
+from ideation_cli.budget import CHEAP, CHEAP_MODEL, FULL, NO_IMAGE, STOP
+from ideation_cli.cli import (
+    cli,
+    process_game_iteration,
+    run_cli,
+    run_iterations,
+    run_two_phase,
+)
+from ideation_cli.covers import COVER_STORE
 
 pytestmark = pytest.mark.unit
 
@@ -26,10 +35,12 @@ def fake_generate_name(task, model, temperature, top_p):
 
 
 def fake_generate_metadata(task, name, model):
-    # Return a JSON string.
-    return (
-        '{"short_description": "short", "detailed_description": "detailed", "tags": []}'
-    )
+    # generate_metadata always returns a validated dictionary.
+    return {
+        "short_description": "short",
+        "detailed_description": "detailed",
+        "tags": [],
+    }
 
 
 def fake_generate_cover(task, name, dir_path):
@@ -72,6 +83,11 @@ def make_fake_args(**overrides):
     args.path = tempfile.gettempdir()
     args.image = False
     args.randomize = False
+    args.concurrency = 1
+    args.max_seconds = None
+    args.max_cost = None
+    args.top_k = None
+    args.rank = "heuristic"
     for key, value in overrides.items():
         setattr(args, key, value)
     return args
@@ -210,10 +226,19 @@ def fake_parse_arguments():
     a.path = tempfile.gettempdir()
     a.image = False
     a.randomize = False
+    a.concurrency = 1
+    a.max_seconds = None
+    a.max_cost = None
+    a.plan = False
+    a.top_k = None
+    a.rank = "heuristic"
+    a.fresh_images = False
+    a.cover_cache_mb = 1024
+    a.prefetch = 0
     return a
 
 
-def fake_use_interactive_mode():
+def fake_use_interactive_mode(on_settings=None):
     return {"task": "Interactive Task", "game_type": "Interactive Game"}
 
 
@@ -239,8 +264,297 @@ def test_cli(monkeypatch):
     monkeypatch.setattr(
         "ideation_cli.cli.process_game_iteration", fake_process_game_iteration
     )
+    # cli() points the process-wide cover store at the output path; restore it afterwards.
+    monkeypatch.setattr(COVER_STORE, "root", COVER_STORE.root)
 
     cli()
     assert (
         fake_process_game_iteration.called
     ), "process_game_iteration was not called in cli()"
+
+
+def test_cli_dispatches_subcommands(monkeypatch):
+    seen = []
+    monkeypatch.setattr("ideation_cli.server.main", seen.append)
+    monkeypatch.setattr("sys.argv", ["ideation-cli", "serve", "--port", "9000"])
+    cli()
+    assert seen == [["--port", "9000"]]
+
+
+# --- Tests for run_iterations ---
+
+
+def test_run_iterations_runs_count_concurrently(monkeypatch):
+    seen = []
+
+    def fake_iteration(args):
+        seen.append(args)
+        return "dir", {"name": "Generated Name"}
+
+    monkeypatch.setattr("ideation_cli.cli.process_game_iteration", fake_iteration)
+
+    results = run_iterations(make_fake_args(count=5, concurrency=3))
+    assert len(results) == 5
+    assert len(seen) == 5
+
+
+def test_run_iterations_degrades_then_stops_on_budget(monkeypatch, capsys):
+    modes = iter([FULL, NO_IMAGE, STOP])
+    monkeypatch.setattr(
+        "ideation_cli.cli.RunBudget.plan", lambda self, *args: next(modes)
+    )
+    seen = []
+
+    def fake_iteration(args):
+        seen.append(args.image)
+        return "dir", {}
+
+    monkeypatch.setattr("ideation_cli.cli.process_game_iteration", fake_iteration)
+
+    results = run_iterations(make_fake_args(count=5, image=True, max_cost=1.0))
+    assert len(results) == 2
+    # The first idea keeps its cover, the second one is degraded to text only.
+    assert seen == [True, False]
+    assert "Budget exhausted, skipping 3 remaining idea(s)." in capsys.readouterr().out
+
+
+def test_run_iterations_pins_the_cheap_model_for_one_idea_only(monkeypatch, capsys):
+    from ideation_cli.routing import ROUTER
+
+    modes = iter([CHEAP, FULL])
+    monkeypatch.setattr(
+        "ideation_cli.cli.RunBudget.plan", lambda self, *args: next(modes)
+    )
+    table = dict(ROUTER.stage_models)
+    models = []
+
+    def fake_iteration(args):
+        models.append(ROUTER.route("metadata", args.model))
+        return "dir", {}
+
+    monkeypatch.setattr("ideation_cli.cli.process_game_iteration", fake_iteration)
+
+    run_iterations(make_fake_args(count=2, max_cost=1.0))
+    assert models == [CHEAP_MODEL, "test-model"]
+    assert ROUTER.stage_models == table
+    assert f"using {CHEAP_MODEL} for this idea" in capsys.readouterr().out
+
+
+def test_run_iterations_survives_failed_iteration(monkeypatch, capsys):
+    def fake_iteration(args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("ideation_cli.cli.process_game_iteration", fake_iteration)
+
+    assert run_iterations(make_fake_args(count=2)) == []
+    assert "Idea generation failed: boom" in capsys.readouterr().out
+
+
+def test_run_iterations_counts_ideas_in_metrics(monkeypatch):
+    from ideation_cli.metrics import METRICS
+
+    outcomes = iter([("dir", {}), None, RuntimeError("boom")])
+
+    def fake_iteration(args):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr("ideation_cli.cli.process_game_iteration", fake_iteration)
+    METRICS.reset()
+
+    run_iterations(make_fake_args(count=3))
+    assert METRICS.value("ideation_ideas_total", outcome="ok") == 1
+    assert METRICS.value("ideation_ideas_total", outcome="skipped") == 1
+    assert METRICS.value("ideation_ideas_total", outcome="error") == 1
+    assert METRICS.value("ideation_ideas_in_flight") == 0
+
+
+# --- Tests for run_two_phase ---
+
+
+def test_run_two_phase_renders_covers_for_top_k_only(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        "ideation_cli.cli.apply_ideation_technique", fake_apply_ideation_technique
+    )
+    monkeypatch.setattr("ideation_cli.cli.create_game_id", fake_create_game_id)
+    monkeypatch.setattr("ideation_cli.cli.save_args_to_json", fake_save_args_to_json)
+    monkeypatch.setattr(
+        "ideation_cli.cli.generate_cover",
+        lambda task, name, dir_path: (fake_generate_cover(task, name, dir_path), "p"),
+    )
+
+    names = iter(["First", "Second", "Third"])
+    monkeypatch.setattr("ideation_cli.cli.generate_name", lambda *args: next(names))
+
+    def fake_metadata(task, name, model):
+        # The second idea has the most complete metadata and should rank first.
+        detail = "word " * 80 if name == "Second" else "short"
+        return {
+            "short_description": name,
+            "detailed_description": detail,
+            "tags": ["a", "b", "c"],
+        }
+
+    monkeypatch.setattr("ideation_cli.cli.generate_metadata", fake_metadata)
+
+    args = make_fake_args(count=3, image=True, top_k=1, path=str(tmp_path))
+    ranked = run_two_phase(args)
+
+    assert [output["name"] for _, output in ranked][0] == "Second"
+    covers = [output["cover"] for _, output in ranked]
+    assert covers[0] is not None
+    assert covers[1:] == [None, None]
+    assert [output["rank"]["position"] for _, output in ranked] == [1, 2, 3]
+
+
+def test_process_game_iteration_uses_prefetched_idea(monkeypatch, tmp_path):
+    from ideation_cli.reservoir import RESERVOIR
+
+    def fail(*args):
+        raise AssertionError("A prefetched idea should not be generated again.")
+
+    monkeypatch.setattr("ideation_cli.cli.generate_name", fail)
+    monkeypatch.setattr("ideation_cli.cli.generate_metadata", fail)
+    monkeypatch.setattr("ideation_cli.cli.save_args_to_json", fake_save_args_to_json)
+    monkeypatch.setattr(RESERVOIR, "path", None)
+    monkeypatch.setattr(RESERVOIR, "_pool", {})
+    RESERVOIR.configure(str(tmp_path / "reservoir.json"))
+
+    args = make_fake_args(randomize=True, path=str(tmp_path))
+    draft = {
+        "task": "Prefetched task",
+        "game_type": "Puzzle",
+        "name": "Prefetched",
+        "metadata": fake_generate_metadata(None, None, None),
+    }
+    RESERVOIR.add(args, draft)
+
+    dir_path, output = process_game_iteration(args)
+    assert output["name"] == "Prefetched"
+    assert output["branding_data"] == draft["metadata"]
+    assert dir_path.startswith(str(tmp_path / "Puzzle"))
+
+
+def test_interactive_prefetch_matches_the_answers(monkeypatch, tmp_path):
+    import questionary
+
+    from ideation_cli.reservoir import RESERVOIR, RESERVOIR_FILENAME
+    from ideation_cli.utils import parse_arguments
+
+    answers = {
+        "random game": True,
+        "cover": False,
+        "ideation technique": "scamper",
+        "AI model": "gpt-4o-mini",
+        "directory": str(tmp_path / "answered"),
+        "How many": "1",
+    }
+    prefetched = threading.Event()
+
+    class Answer:
+        def __init__(self, prompt):
+            self.prompt = prompt
+
+        def ask(self):
+            if "task prompt" in self.prompt:
+                # Keep the questions on screen until an idea has been prefetched.
+                prefetched.wait(5)
+            return next(
+                (value for key, value in answers.items() if key in self.prompt), ""
+            )
+
+    for kind in ("confirm", "text", "select"):
+        monkeypatch.setattr(questionary, kind, lambda prompt, **kwargs: Answer(prompt))
+    drafted = []
+
+    def fake_draft_idea(args):
+        drafted.append((args.ideation_technique, args.model))
+        prefetched.set()
+        return {
+            "task": "task",
+            "game_type": "Puzzle",
+            "name": "Prefetched",
+            "metadata": {},
+        }
+
+    taken = []
+    monkeypatch.setattr("ideation_cli.cli.draft_idea", fake_draft_idea)
+    monkeypatch.setattr("ideation_cli.cli.warm_client", lambda: None)
+    monkeypatch.setattr(
+        "ideation_cli.cli.run_iterations",
+        lambda args: taken.append(RESERVOIR.take(args)),
+    )
+    monkeypatch.setattr(COVER_STORE, "root", COVER_STORE.root)
+    monkeypatch.setattr(RESERVOIR, "path", None)
+    monkeypatch.setattr(RESERVOIR, "_pool", {})
+    monkeypatch.setattr(
+        "sys.argv",
+        ["ideation-cli", "--interactive", "--prefetch", "1", "--path", str(tmp_path)],
+    )
+
+    run_cli(parse_arguments())
+    # The idea was prefetched for the answered technique and model, and is used.
+    assert drafted[0] == ("scamper", "gpt-4o-mini")
+    assert taken[0]["name"] == "Prefetched"
+    # The pool lives under the answered output path, not the one on the command line.
+    assert RESERVOIR.path == os.path.join(
+        str(tmp_path / "answered"), RESERVOIR_FILENAME
+    )
+    assert not os.path.exists(os.path.join(str(tmp_path), RESERVOIR_FILENAME))
+
+
+def test_process_game_iteration_runs_a_technique_chain(monkeypatch, tmp_path):
+    from ideation_cli.chains import CHAINS
+
+    calls = []
+
+    def fake_generate_ideas(artifact, technique, model):
+        calls.append(technique)
+        return f"{artifact} via {technique} {len(calls)}"
+
+    monkeypatch.setattr("ideation_cli.cli.generate_ideas", fake_generate_ideas)
+    monkeypatch.setattr("ideation_cli.cli.generate_name", fake_generate_name)
+    monkeypatch.setattr("ideation_cli.cli.generate_metadata", fake_generate_metadata)
+    monkeypatch.setattr("ideation_cli.cli.save_args_to_json", fake_save_args_to_json)
+    CHAINS.configure(str(tmp_path / ".chains.json"))
+
+    args = make_fake_args(
+        path=str(tmp_path), ideation_technique="scamper,crazy_eights*2"
+    )
+    _, first = process_game_iteration(args)
+    _, second = process_game_iteration(args)
+    CHAINS.configure(None)
+
+    # Both ideas come from one run of the chain.
+    assert calls == ["scamper", "crazy_eights", "crazy_eights"]
+    assert first["task"] != second["task"]
+    assert [step["technique"] for step in first["chain"]] == [
+        "scamper",
+        "crazy_eights",
+    ]
+    assert first["task"] == first["chain"][-1]["output"]
+
+
+def test_process_game_iteration_develops_the_task_with_agents(monkeypatch, tmp_path):
+    def fake_generate_agent_turn(system_prompt, messages, model, max_tokens):
+        return f"Developed: {messages[0]['content']}", 100
+
+    monkeypatch.setattr(
+        "ideation_cli.cli.generate_agent_turn", fake_generate_agent_turn
+    )
+    monkeypatch.setattr("ideation_cli.cli.generate_name", fake_generate_name)
+    monkeypatch.setattr("ideation_cli.cli.generate_metadata", fake_generate_metadata)
+    monkeypatch.setattr("ideation_cli.cli.save_args_to_json", fake_save_args_to_json)
+
+    args = make_fake_args(path=str(tmp_path), agents=True)
+    _, output = process_game_iteration(args)
+
+    assert output["task"] == "Developed: The game idea: Test Task"
+    assert len(output["agents"]) == 4
+    assert {turn["agent"] for turn in output["agents"]} == {
+        "designer",
+        "critic",
+        "marketer",
+    }
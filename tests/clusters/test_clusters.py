@@ -0,0 +1,121 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ideation_cli.clusters import (
+    _ClusterState,
+    clusters_main,
+    saturation_report,
+    update_clusters,
+)
+from ideation_cli.embeddings import EmbeddingIndex
+from ideation_cli.sampler import saturated_game_types
+
+pytestmark = pytest.mark.unit
+
+SPACE = ["Defend a space station from asteroids", "Pilot a starship past asteroids"]
+OCEAN = ["Guide fish home through ocean tides", "Dive for pearls in ocean tides"]
+
+
+def save_idea(root, game_type, name, description, technique=None):
+    dir_path = os.path.join(root, game_type, name.replace(" ", ""))
+    os.makedirs(dir_path)
+    with open(os.path.join(dir_path, "metadata.json"), "w") as file:
+        json.dump(
+            {
+                "name": name,
+                "game_type": game_type,
+                "ideation_technique": technique,
+                "branding_data": {"short_description": description},
+            },
+            file,
+        )
+
+
+def save_campaign(root, prefix, count):
+    for i in range(count):
+        save_idea(root, "Shooter", f"{prefix} Space {i}", SPACE[i % 2], "scamper")
+    save_idea(root, "Puzzle", f"{prefix} Ocean", OCEAN[0])
+
+
+@pytest.fixture
+def index(tmp_path):
+    root = str(tmp_path)
+    save_campaign(root, "First", 6)
+    save_idea(root, "Puzzle", "Second Ocean", OCEAN[1])
+    index = EmbeddingIndex(root)
+    index.update()
+    return index
+
+
+def test_clusters_separate_topics(index):
+    centroids, folded = update_clusters(index, k=2)
+    assert folded == 8 and centroids.shape == (2, 1024)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0)
+
+    report = saturation_report(index, centroids, top=2, threshold=1.2)
+    assert [cluster["size"] for cluster in report["clusters"]] == [6, 2]
+    assert [cluster["game_type"] for cluster in report["clusters"]] == [
+        "Shooter",
+        "Puzzle",
+    ]
+    assert len(report["clusters"][0]["representatives"]) == 2
+    # Six of eight ideas in one of two clusters is 1.5 times an even share.
+    assert report["game_types"]["Shooter"] == {"ideas": 6, "saturation": 1.5}
+    assert report["game_types"]["Puzzle"] == {"ideas": 2, "saturation": 0.5}
+    assert report["techniques"]["scamper"]["ideas"] == 6
+    assert report["techniques"]["none"]["ideas"] == 2
+    assert report["saturated_game_types"] == ["Shooter"]
+
+
+def test_only_new_ideas_are_folded_in(index):
+    update_clusters(index, k=2)
+    assert update_clusters(index, k=2)[1] == 0
+
+    save_campaign(index.root, "Later", 2)
+    index.update()
+    centroids, folded = update_clusters(index, k=2)
+    assert folded == 3
+    sizes = [c["size"] for c in saturation_report(index, centroids)["clusters"]]
+    assert sizes == [8, 3]
+
+    # A different number of clusters starts over.
+    assert update_clusters(index, k=3)[1] == 11
+    assert update_clusters(index, k=3, reset=True)[1] == 11
+
+
+def test_a_rebuilt_index_starts_over(index):
+    centroids, _ = update_clusters(index, k=2)
+    saturation_report(index, centroids)
+    save_idea(index.root, "Arcade", "Late Ocean", OCEAN[0])
+    index.update()
+    centroids, _ = update_clusters(index, k=2)
+    saturation_report(index, centroids)
+
+    # Rebuilding the index re-embeds the ideas in directory order, so the
+    # late Arcade idea moves from the last row to the first.
+    os.remove(os.path.join(index.directory, "vectors.f32"))
+    index.update()
+    assert index.ids()[0]["path"] == os.path.join("Arcade", "LateOcean")
+
+    centroids, folded = update_clusters(index, k=2)
+    assert folded == 9
+    report = saturation_report(index, centroids)
+    assert report["game_types"]["Arcade"]["ideas"] == 1
+    labels = _ClusterState(index).labels(9)
+    assert [label["path"] for label in labels] == [e["path"] for e in index.ids()]
+    assert labels[0]["game_type"] == "Arcade"
+
+
+def test_too_few_ideas_are_not_clustered(index):
+    assert update_clusters(index, k=20) == (None, 0)
+
+
+def test_clusters_main_saves_the_saturation_report(index, capsys):
+    clusters_main(["--path", index.root, "--clusters", "2", "--threshold", "1.2"])
+    out = capsys.readouterr().out
+    assert "Clustered 8 new idea(s)." in out
+    assert "Saturated game types: Shooter." in out
+    assert saturated_game_types(index.root) == ["Shooter"]
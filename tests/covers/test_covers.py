@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from ideation_cli.covers import CoverStore, normalize_prompt
+
+pytestmark = pytest.mark.unit
+
+PARAMS = {"model": "dall-e-3", "size": "1024x1024", "quality": "standard"}
+
+
+def test_normalize_prompt():
+    assert normalize_prompt('  "A  Whirlpool\n devouring ships" ') == (
+        "a whirlpool devouring ships"
+    )
+
+
+def test_lookup_misses_until_added(tmp_path):
+    store = CoverStore(str(tmp_path))
+    assert store.lookup("task", "name", PARAMS) is None
+
+    object_path = store.add("task", "name", PARAMS, "pixel art prompt", b"png")
+    assert store.lookup("Task", "NAME", PARAMS) == (object_path, "pixel art prompt")
+    # Different generation parameters are a different cover.
+    assert store.lookup("task", "name", dict(PARAMS, quality="hd")) is None
+
+
+def test_index_persists_between_instances(tmp_path):
+    CoverStore(str(tmp_path)).add("task", "name", PARAMS, "prompt", b"png")
+    assert CoverStore(str(tmp_path)).lookup("task", "name", PARAMS) is not None
+
+
+def test_same_image_prompt_is_stored_once(tmp_path):
+    store = CoverStore(str(tmp_path))
+    first = store.add("task one", "name", PARAMS, "same prompt", b"png")
+    second = store.add("task two", "name", PARAMS, "Same  prompt", b"png")
+    assert first == second
+
+
+def test_link_into_creates_hard_link(tmp_path):
+    store = CoverStore(str(tmp_path / "store"))
+    object_path = store.add("task", "name", PARAMS, "prompt", b"png")
+    image_path = str(tmp_path / "cover.png")
+    CoverStore.link_into(object_path, image_path)
+    assert os.path.samefile(object_path, image_path)
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    store = CoverStore(str(tmp_path), max_bytes=10)
+    old_path = store.add("old", "name", PARAMS, "old prompt", b"x" * 6)
+    new_path = store.add("new", "name", PARAMS, "new prompt", b"y" * 6)
+
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
+    assert store.lookup("old", "name", PARAMS) is None
+    assert store.lookup("new", "name", PARAMS) is not None
+
+
+def test_hits_are_recorded_in_the_index_not_on_the_image(tmp_path):
+    store = CoverStore(str(tmp_path), max_bytes=10)
+    used_path = store.add("used", "name", PARAMS, "used prompt", b"x" * 4)
+    idle_path = store.add("idle", "name", PARAMS, "idle prompt", b"y" * 4)
+    os.utime(used_path, (0, 0))
+
+    assert store.lookup("used", "name", PARAMS) is not None
+    # Idea covers are hard links to the image, so its mtime must not change.
+    assert os.path.getmtime(used_path) == 0
+    store.add("new", "name", PARAMS, "new prompt", b"z" * 4)
+
+    assert os.path.exists(used_path)
+    assert not os.path.exists(idle_path)
+
+
+def test_stores_sharing_a_directory_keep_each_others_entries(tmp_path):
+    first = CoverStore(str(tmp_path))
+    second = CoverStore(str(tmp_path))
+    first.lookup("task one", "name", PARAMS)
+    second.lookup("task two", "name", PARAMS)
+
+    first.add("task one", "name", PARAMS, "prompt one", b"png")
+    second.add("task two", "name", PARAMS, "prompt two", b"png")
+
+    fresh = CoverStore(str(tmp_path))
+    assert fresh.lookup("task one", "name", PARAMS) is not None
+    assert fresh.lookup("task two", "name", PARAMS) is not None
@@ -0,0 +1,91 @@
+import io
+import json
+import sys
+
+import pytest
+
+from ideation_cli.dashboard import Dashboard
+from ideation_cli.metrics import Metrics
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TerminalStream(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def make_metrics():
+    metrics = Metrics()
+    labels = {"stage": "name", "model": "gpt-4o-mini", "outcome": "ok"}
+    for latency in (0.2, 0.4, 0.4, 3.0):
+        metrics.inc("ideation_api_calls_total", **labels)
+        metrics.observe("ideation_api_call_seconds", latency, **labels)
+    metrics.inc("ideation_api_calls_in_flight", 2, stage="metadata")
+    metrics.inc("ideation_ideas_total", 3, outcome="ok")
+    metrics.inc("ideation_ideas_total", outcome="error")
+    metrics.inc("ideation_ideas_in_flight", 2)
+    metrics.inc("ideation_api_retries_total", 5)
+    metrics.inc("ideation_cache_requests_total", 3, cache="cover", outcome="hit")
+    metrics.inc("ideation_cache_requests_total", cache="cover", outcome="miss")
+    return metrics
+
+
+def test_snapshot_summarises_the_run():
+    clock = FakeClock()
+    dashboard = Dashboard(make_metrics(), clock)
+    dashboard.start(10, interval=60, stream=io.StringIO(), live=False)
+    clock.now = 120.0
+
+    snapshot = dashboard.snapshot()
+    dashboard.stop()
+
+    assert snapshot["ideas"] == {"done": 4, "failed": 1, "in_flight": 2, "total": 10}
+    assert snapshot["ideas_per_minute"] == 2.0
+    assert snapshot["eta"] == 180.0
+    assert snapshot["retries"] == 5
+    assert snapshot["cache_hit_rate"] == 0.75
+    assert set(snapshot["stages"]) == {"name", "metadata"}
+    name = snapshot["stages"]["name"]
+    assert name["calls"] == 4
+    assert 0.25 < name["p50"] <= 0.5
+    assert 2.5 < name["p95"] <= 5.0
+    assert snapshot["stages"]["metadata"]["in_flight"] == 2
+
+
+def test_log_mode_writes_json_lines():
+    stream = io.StringIO()
+    dashboard = Dashboard(make_metrics(), FakeClock())
+
+    dashboard.start(10, interval=60, stream=stream, live=False)
+    dashboard.stop()
+
+    [line] = stream.getvalue().splitlines()
+    event = json.loads(line)
+    assert event["event"] == "done"
+    assert event["ideas"]["done"] == 4
+
+
+def test_live_mode_holds_back_messages_but_not_errors(monkeypatch):
+    stream = TerminalStream()
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    dashboard = Dashboard(make_metrics(), FakeClock())
+
+    dashboard.start(10, stream=stream)
+    print("Generated name: Tides")
+    print("Error: Idea generation failed: boom")
+    dashboard.stop()
+
+    output = stream.getvalue()
+    assert "Generated name" not in output
+    assert output.startswith("Ideas 4/10 done, 2 in flight, 1 failed")
+    assert output.rstrip().endswith("Error: Idea generation failed: boom")
+    assert sys.stdout is not dashboard._capture
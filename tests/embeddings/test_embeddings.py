@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ideation_cli.embeddings import (
+    EmbeddingIndex,
+    hashing_vectors,
+    idea_text,
+    similar_main,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def save_idea(root, game_dir, name, description, tags=()):
+    dir_path = os.path.join(root, game_dir, name.replace(" ", ""))
+    os.makedirs(dir_path)
+    with open(os.path.join(dir_path, "metadata.json"), "w") as file:
+        json.dump(
+            {
+                "name": name,
+                "branding_data": {
+                    "short_description": description,
+                    "detailed_description": "",
+                    "tags": list(tags),
+                },
+            },
+            file,
+        )
+
+
+@pytest.fixture
+def ideas(tmp_path):
+    root = str(tmp_path)
+    save_idea(
+        root, "Puzzle", "Tide Pools", "Slide ocean tiles to guide fish home", ["ocean"]
+    )
+    save_idea(
+        root, "Racing", "Turbo Kart", "Drift a kart around volcano tracks", ["cars"]
+    )
+    save_idea(root, "Shooter", "Star Guard", "Defend a space station from asteroids")
+    # Hidden directories such as the cover store are not ideas.
+    save_idea(root, ".covers", "Hidden", "Ocean fish tiles")
+    return root
+
+
+def test_hashing_vectors_are_deterministic():
+    first, second = hashing_vectors(["ocean fish", "ocean fish"])
+    assert np.array_equal(first, second)
+    assert first.dtype == np.float32 and first.shape == (1024,)
+    assert np.count_nonzero(first) == 3  # Two words and one word pair.
+
+
+def test_idea_text_includes_tags():
+    assert idea_text({"name": "A", "branding_data": {"tags": ["x", "y"]}}).endswith(
+        "x, y"
+    )
+
+
+def test_update_is_incremental(ideas):
+    index = EmbeddingIndex(ideas)
+    assert index.update() == 3
+    assert index.update() == 0
+
+    save_idea(ideas, "Puzzle", "Reef Rescue", "Guide fish through the coral reef")
+    assert index.update() == 1
+    assert [entry["name"] for entry in index.ids()][-1] == "Reef Rescue"
+    assert os.path.getsize(os.path.join(index.directory, "vectors.f32")) == 4 * 1024 * 4
+
+
+def test_search_ranks_by_cosine_similarity(ideas):
+    index = EmbeddingIndex(ideas)
+    index.update()
+    results = index.search("fish in the ocean", k=2)
+    assert results[0][1] == {
+        "path": os.path.join("Puzzle", "TidePools"),
+        "name": "Tide Pools",
+    }
+    assert len(results) == 2
+    assert results[0][0] > results[1][0]
+
+
+def test_interrupted_append_is_trimmed(ideas):
+    index = EmbeddingIndex(ideas)
+    index.update()
+    with open(os.path.join(index.directory, "vectors.f32"), "ab") as file:
+        file.write(b"\0" * 100)
+    save_idea(ideas, "Puzzle", "Reef Rescue", "Guide fish through the coral reef")
+    index.update()
+    assert index.search("coral reef fish", k=1)[0][1]["name"] == "Reef Rescue"
+
+
+def test_similar_command(ideas, capsys):
+    similar_main(["ocean fish tiles", "--path", ideas, "--top", "1"])
+    out = capsys.readouterr().out
+    assert "Indexed 3 new idea(s)." in out
+    assert "Tide Pools" in out and "Turbo Kart" not in out
+
+
+def test_lost_matrix_is_rebuilt(ideas):
+    index = EmbeddingIndex(ideas)
+    index.update()
+    os.remove(os.path.join(index.directory, "vectors.f32"))
+    assert index.search("ocean fish", k=3) == []
+    assert index.update() == 3
+    assert index.search("ocean fish", k=1)[0][1]["name"] == "Tide Pools"
+
+
+def test_non_positive_top_is_rejected(ideas, capsys):
+    index = EmbeddingIndex(ideas)
+    index.update()
+    assert index.search("ocean fish", k=0) == []
+    with pytest.raises(SystemExit):
+        similar_main(["ocean fish", "--path", ideas, "--top", "0"])
+    assert "--top must be at least 1" in capsys.readouterr().err
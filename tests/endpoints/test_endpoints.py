@@ -0,0 +1,201 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ideation_cli.endpoints import (
+    EVICTION_SECONDS,
+    FAILED,
+    MAX_FAILURES,
+    RATE_LIMIT_SECONDS,
+    RATE_LIMITED,
+    Endpoint,
+    EndpointPool,
+    _retry_after,
+    load_endpoints,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_outstanding_per_weight():
+    pool = EndpointPool()
+    heavy, light = Endpoint("heavy", None, weight=2), Endpoint("light", None)
+    pool.configure([heavy, light])
+    picked = [pool.acquire().name for _ in range(6)]
+    # The double-weight endpoint takes twice as many concurrent calls.
+    assert picked.count("heavy") == 4
+    assert picked.count("light") == 2
+
+
+def test_failing_endpoint_is_evicted_then_readmitted(capsys):
+    clock = Clock()
+    pool = EndpointPool(clock=clock)
+    bad, good = Endpoint("bad", None), Endpoint("good", None)
+    pool.configure([bad, good])
+
+    for _ in range(MAX_FAILURES):
+        pool.release(pool.acquire(exclude=[good]), FAILED)
+    assert "Endpoint 'bad' failed 3 times in a row" in capsys.readouterr().out
+    assert {pool.acquire().name for _ in range(4)} == {"good"}
+
+    clock.now += EVICTION_SECONDS
+    good.outstanding = 10
+    assert pool.acquire().name == "bad"
+
+
+def test_call_without_pool_uses_default_client():
+    pool = EndpointPool()
+    assert pool.call("default", "gpt-4o", lambda client, model: (client, model)) == (
+        "default",
+        "gpt-4o",
+    )
+
+
+class RateLimitError(Exception):
+    def __init__(self, headers):
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def test_rest_follows_the_rate_limit_headers_then_backs_off():
+    assert _retry_after(RateLimitError({"retry-after-ms": "1500"})) == 1.5
+    assert _retry_after(RateLimitError({"retry-after": "7"})) == 7.0
+    reset = {"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"}
+    assert _retry_after(RateLimitError(reset)) == 360.0
+    assert _retry_after(RateLimitError({})) == RATE_LIMIT_SECONDS
+    assert _retry_after(RateLimitError({}), consecutive=3) == 4 * RATE_LIMIT_SECONDS
+
+
+def test_resting_endpoint_is_not_called_early(monkeypatch):
+    from ideation_cli import endpoints
+    from ideation_cli.metrics import METRICS
+
+    clock = Clock()
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        clock.now += seconds
+
+    pool = EndpointPool(clock=clock, sleep=sleep)
+    first, second = Endpoint("first", "a"), Endpoint("second", "b")
+    pool.configure([first, second])
+    second.unavailable_until = 5.0
+    monkeypatch.setattr(endpoints, "classify_error", lambda err: RATE_LIMITED)
+    METRICS.reset()
+
+    def request(client, model):
+        if client == "a":
+            raise RateLimitError({"retry-after": "30"})
+        return clock.now
+
+    # The first endpoint is rate limited; the second is only called once its rest is over.
+    assert pool.call(None, "gpt-4o", request) == 5.0
+    assert waits == [5.0]
+    assert METRICS.value("ideation_api_retries_total", source="endpoint") == 1
+
+
+# --- Against local stub endpoints ---
+
+
+def make_stub(status, calls, retry_after="30"):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append(body["model"])
+            if status != 200:
+                payload = json.dumps({"error": {"message": "slow down"}}).encode()
+                self.send_response(status)
+                self.send_header("Retry-After", retry_after)
+            else:
+                payload = json.dumps(
+                    {
+                        "id": "chatcmpl-1",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "finish_reason": "stop",
+                                "message": {"role": "assistant", "content": "Hi"},
+                            }
+                        ],
+                    }
+                ).encode()
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def start(status, calls):
+        server = make_stub(status, calls)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_rate_limited_endpoint_fails_over(stubs, tmp_path):
+    limited_calls, ok_calls = [], []
+    config = tmp_path / "endpoints.json"
+    config.write_text(
+        json.dumps(
+            [
+                {
+                    "name": "limited",
+                    "base_url": stubs(429, limited_calls),
+                    "api_key": "a",
+                },
+                {
+                    "name": "ok",
+                    "base_url": stubs(200, ok_calls),
+                    "api_key": "b",
+                    "models": {"gpt-4o": "gpt-4o-deployment"},
+                },
+            ]
+        )
+    )
+    pool = EndpointPool()
+    pool.configure(load_endpoints(str(config)))
+
+    def chat(client, model):
+        return client.chat.completions.create(
+            model=model, messages=[{"role": "user", "content": "Hello"}]
+        )
+
+    for _ in range(3):
+        assert pool.call(None, "gpt-4o", chat).choices[0].message.content == "Hi"
+
+    # The limited endpoint is tried once, then rests for its Retry-After time.
+    assert limited_calls == ["gpt-4o"]
+    assert ok_calls == ["gpt-4o-deployment"] * 3
+    stats = pool.stats()
+    assert stats["limited"]["rate_limited"] == 1
+    assert stats["limited"]["available_in"] > 25
+    assert stats["ok"]["requests"] == 3
@@ -0,0 +1,127 @@
+import json
+import os
+
+import pytest
+
+from ideation_cli import gallery
+from ideation_cli.gallery import build_gallery
+
+pytestmark = pytest.mark.unit
+
+
+def save_idea(root, path, name, cover=False, description="A game."):
+    dir_path = os.path.join(root, *path.split("/"))
+    os.makedirs(dir_path, exist_ok=True)
+    metadata = {
+        "name": name,
+        "game_type": path.split("/")[0],
+        "branding_data": {"short_description": description, "tags": ["tag"]},
+    }
+    with open(os.path.join(dir_path, "metadata.json"), "w", encoding="utf-8") as file:
+        json.dump(metadata, file)
+    if cover:
+        with open(os.path.join(dir_path, "cover.png"), "wb") as file:
+            file.write(b"png")
+
+
+@pytest.fixture
+def no_pillow(monkeypatch):
+    monkeypatch.setattr(gallery, "Image", None)
+
+
+def test_build_paginates_the_ideas(tmp_path, no_pillow):
+    root = str(tmp_path)
+    for number in range(5):
+        save_idea(root, f"Puzzle/Idea_{number}", f"Idea <{number}>", cover=True)
+
+    stats = build_gallery(root, page_size=2)
+
+    assert stats == {"ideas": 5, "pages": 3, "written": 3, "thumbnails": 0}
+    page = (tmp_path / ".gallery" / "page-0001.html").read_text(encoding="utf-8")
+    assert "Idea &lt;0&gt;" in page
+    assert 'loading="lazy"' in page
+    # Without Pillow the cards link the full covers.
+    assert "../Puzzle/Idea_0/cover.png" in page
+    assert "page-0002.html" in page
+    assert (tmp_path / ".gallery" / "index.html").exists()
+
+
+def test_rebuild_only_rewrites_changed_pages(tmp_path, no_pillow):
+    root = str(tmp_path)
+    for number in range(4):
+        save_idea(root, f"Puzzle/Idea_{number}", f"Idea {number}")
+    build_gallery(root, page_size=2)
+
+    assert build_gallery(root, page_size=2)["written"] == 0
+
+    # A new idea goes on a new last page; only the old last page gains a Next link.
+    save_idea(root, "Arcade/Idea_new", "Newest")
+    stats = build_gallery(root, page_size=2)
+    assert stats["pages"] == 3
+    assert stats["written"] == 2
+    last = (tmp_path / ".gallery" / "page-0003.html").read_text(encoding="utf-8")
+    assert "Newest" in last
+
+    save_idea(root, "Puzzle/Idea_0", "Renamed")
+    os.utime(
+        tmp_path / "Puzzle" / "Idea_0" / "metadata.json", ns=(1, 1)
+    )  # A different mtime, whatever the clock resolution.
+    stats = build_gallery(root, page_size=2)
+    assert stats["written"] == 1
+    first = (tmp_path / ".gallery" / "page-0001.html").read_text(encoding="utf-8")
+    assert "Renamed" in first
+
+
+def test_removed_ideas_drop_their_pages(tmp_path, no_pillow):
+    root = str(tmp_path)
+    for number in range(3):
+        save_idea(root, f"Puzzle/Idea_{number}", f"Idea {number}")
+    build_gallery(root, page_size=2)
+
+    os.remove(tmp_path / "Puzzle" / "Idea_2" / "metadata.json")
+    stats = build_gallery(root, page_size=2)
+
+    assert stats["pages"] == 1
+    assert not (tmp_path / ".gallery" / "page-0002.html").exists()
+
+
+def test_thumbnails_are_generated_once(tmp_path, monkeypatch):
+    made = []
+
+    def fake_make_thumbnail(source, target, size):
+        made.append(source)
+        with open(target, "wb") as file:
+            file.write(b"jpg")
+
+    monkeypatch.setattr(gallery, "Image", object())
+    monkeypatch.setattr(gallery, "make_thumbnail", fake_make_thumbnail)
+    root = str(tmp_path)
+    save_idea(root, "Puzzle/Idea_0", "Idea 0", cover=True)
+    save_idea(root, "Puzzle/Idea_1", "Idea 1")
+
+    first = build_gallery(root, workers=1)
+    second = build_gallery(root, workers=1)
+
+    assert first["thumbnails"] == 1
+    assert second["thumbnails"] == 0
+    assert len(made) == 1
+    thumbs = os.listdir(tmp_path / ".gallery" / "thumbs")
+    page = (tmp_path / ".gallery" / "page-0001.html").read_text(encoding="utf-8")
+    assert f"thumbs/{thumbs[0]}" in page
+
+
+def test_unreadable_cover_falls_back_to_the_full_cover(tmp_path, monkeypatch):
+    def fake_make_thumbnail(source, target, size):
+        raise ValueError("decompression bomb")
+
+    monkeypatch.setattr(gallery, "Image", object())
+    monkeypatch.setattr(gallery, "make_thumbnail", fake_make_thumbnail)
+    root = str(tmp_path)
+    save_idea(root, "Puzzle/Idea_0", "Idea 0", cover=True)
+
+    stats = build_gallery(root, workers=1)
+
+    assert stats["ideas"] == 1
+    assert (tmp_path / ".gallery" / "manifest.json").exists()
+    page = (tmp_path / ".gallery" / "page-0001.html").read_text(encoding="utf-8")
+    assert 'src="../Puzzle/Idea_0/cover.png"' in page
@@ -3,6 +3,7 @@ import os
 import pytest
 
 from ideation_cli import generator
+from ideation_cli.covers import CoverStore
 
 pytestmark = pytest.mark.unit
 
@@ -57,13 +58,8 @@ def fake_generate_image(**kwargs):
     return FakeImageResponse("http://fakeurl.com/cover.png")
 
 
-class FakeRequestsResponse:
-    def __init__(self, content):
-        self.content = content
-
-
-def fake_requests_get(url):
-    return FakeRequestsResponse(b"fake image data")
+def fake_download(url):
+    return b"fake image data"
 
 
 def fake_validate_model(model):
@@ -72,7 +68,8 @@ def fake_validate_model(model):
 
 
 def fake_get_prompt(artifact, technique):
-    return f"prompt for {artifact} and {technique}"
+    # Like prompts.get_prompt, return the prompt with its technique.
+    return f"prompt for {artifact} and {technique}", technique
 
 
 def fake_exception_create(**kwargs):
@@ -92,6 +89,12 @@ def test_generate_ideas(monkeypatch):
     assert result == "idea content"
 
 
+def test_generate_ideas_sends_the_prompt_text(monkeypatch):
+    monkeypatch.setattr(generator, "get_prompt", fake_get_prompt)
+    messages = generator.build_ideas_messages("artifact", "scamper")
+    assert messages[1]["content"] == "prompt for artifact and scamper"
+
+
 def test_generate_name(monkeypatch):
     monkeypatch.setattr(generator, "validate_model", fake_validate_model)
     monkeypatch.setattr(
@@ -117,6 +120,55 @@ def test_generate_metadata(monkeypatch):
     assert result["tags"] == []
 
 
+def test_generate_metadata_repairs_only_missing_fields(monkeypatch):
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            # Truncated response missing the detailed description and tags.
+            return FakeResponse('{"short_description": "short", "detailed')
+        return FakeResponse('{"detailed_description": "detailed", "tags": ["fish"]}')
+
+    monkeypatch.setattr(generator.OPENAI_CLIENT.chat.completions, "create", fake_create)
+
+    result = generator.generate_metadata("a game concept", "GameName", "gpt-4o")
+    assert result == {
+        "short_description": "short",
+        "detailed_description": "detailed",
+        "tags": ["fish"],
+    }
+    assert len(calls) == 2
+    # The repair call is constrained to the missing fields only.
+    repair_schema = calls[1]["response_format"]["json_schema"]["schema"]
+    assert repair_schema["required"] == ["detailed_description", "tags"]
+
+
+def test_generate_metadata_never_returns_raw_string(monkeypatch):
+    monkeypatch.setattr(generator, "validate_model", fake_validate_model)
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions,
+        "create",
+        lambda **kwargs: FakeResponse("Sorry, no JSON today."),
+    )
+
+    result = generator.generate_metadata("a game concept", "GameName", "model")
+    assert result == {"short_description": "", "detailed_description": "", "tags": []}
+
+
+def test_generate_scores_pads_missing_scores(monkeypatch):
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions,
+        "create",
+        lambda **kwargs: FakeResponse('{"scores": [7, "high"]}'),
+    )
+
+    scores = generator.generate_scores(
+        [("A", "first"), ("B", "second"), ("C", "third")], "model"
+    )
+    assert scores == [7, None, None]
+
+
 def test_generate_image_prompt(monkeypatch):
     # Patch the chat.completions.create call to simulate generating an image prompt.
     monkeypatch.setattr(
@@ -132,9 +184,9 @@ def test_generate_image_prompt(monkeypatch):
 def test_generate_cover(monkeypatch, tmp_path):
     # Patch generate_image_prompt to use our fake function.
     monkeypatch.setattr(generator, "generate_image_prompt", fake_generate_image_prompt)
-    # Patch the image generation and requests.get calls.
+    # Patch the image generation and the download.
     monkeypatch.setattr(generator.OPENAI_CLIENT.images, "generate", fake_generate_image)
-    monkeypatch.setattr(generator.requests, "get", fake_requests_get)
+    monkeypatch.setattr(generator.TRANSPORT, "download", fake_download)
 
     # Use the tmp_path fixture for a temporary directory.
     temp_dir = str(tmp_path)
@@ -153,6 +205,40 @@ def test_generate_cover(monkeypatch, tmp_path):
     assert content == b"fake image data"
 
 
+def test_generate_cover_reuses_cached_cover(monkeypatch, tmp_path):
+    store = CoverStore(str(tmp_path / ".covers"))
+    monkeypatch.setattr(generator, "COVER_STORE", store)
+    monkeypatch.setattr(generator, "generate_image_prompt", fake_generate_image_prompt)
+    monkeypatch.setattr(generator.TRANSPORT, "download", fake_download)
+    image_calls = []
+
+    def counting_generate_image(**kwargs):
+        image_calls.append(kwargs)
+        return fake_generate_image(**kwargs)
+
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.images, "generate", counting_generate_image
+    )
+
+    first_dir = tmp_path / "first"
+    second_dir = tmp_path / "second"
+    first_dir.mkdir()
+    second_dir.mkdir()
+    first, _ = generator.generate_cover("Whirlpool", "Pause Menu", str(first_dir))
+    second, prompt = generator.generate_cover(
+        "  whirlpool ", "pause  menu", str(second_dir)
+    )
+
+    assert len(image_calls) == 1
+    assert prompt == "fake generated prompt"
+    assert os.path.samefile(first, second)
+
+    # --fresh-images bypasses the cache.
+    store.fresh = True
+    generator.generate_cover("Whirlpool", "Pause Menu", str(second_dir))
+    assert len(image_calls) == 2
+
+
 def test_generate_name_exception(monkeypatch):
     monkeypatch.setattr(generator, "validate_model", fake_validate_model)
     monkeypatch.setattr(
@@ -171,3 +257,70 @@ def test_generate_metadata_exception(monkeypatch):
 
     with pytest.raises(Exception, match="API error"):
         generator.generate_metadata("a game concept", "GameName", "model")
+
+
+def test_chat_calls_are_counted_in_metrics(monkeypatch):
+    from ideation_cli.metrics import METRICS
+
+    METRICS.reset()
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions, "create", fake_create_name
+    )
+    generator.generate_name("A game about space", "gpt-4o")
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions, "create", fake_exception_create
+    )
+    with pytest.raises(Exception, match="API error"):
+        generator.generate_name("A game about space", "gpt-4o")
+
+    labels = {"stage": "name", "model": "gpt-4o-mini"}
+    assert METRICS.value("ideation_api_calls_total", outcome="ok", **labels) == 1
+    assert METRICS.value("ideation_api_calls_total", outcome="error", **labels) == 1
+    assert METRICS.value("ideation_api_call_seconds", outcome="ok", **labels) == 1
+    # Failed calls leave the in-flight gauge too.
+    assert METRICS.value("ideation_api_calls_in_flight", stage="name") == 0
+
+
+def test_refine_idea_sends_only_the_idea_and_notes(monkeypatch):
+    sent = []
+
+    def fake_create_refinement(**kwargs):
+        sent.append(kwargs["messages"])
+        number = len(sent)
+        return FakeResponse(
+            json.dumps(
+                {
+                    "critique": f"critique {number}",
+                    "idea": f"idea v{number}",
+                    "notes": " ".join(["word"] * 200),
+                }
+            )
+        )
+
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions, "create", fake_create_refinement
+    )
+    idea, history = generator.refine_idea("idea v0", "gpt-4o", rounds=3)
+
+    assert idea == "idea v3"
+    assert [entry["critique"] for entry in history] == [
+        "critique 1",
+        "critique 2",
+        "critique 3",
+    ]
+    # Every round sends two messages, the notes are capped and the history is not resent.
+    assert all(len(messages) == 2 for messages in sent)
+    assert "idea v1" in sent[1][1]["content"]
+    assert "idea v0" not in sent[2][1]["content"]
+    assert len(history[-1]["notes"].split()) == generator.REFINE_NOTES_WORDS
+
+
+def test_refine_idea_keeps_the_idea_on_an_unusable_reply(monkeypatch, capsys):
+    monkeypatch.setattr(
+        generator.OPENAI_CLIENT.chat.completions,
+        "create",
+        lambda **kwargs: FakeResponse('{"critique": "weak"}'),
+    )
+    idea, history = generator.refine_idea("original", "gpt-4o", rounds=3)
+    assert (idea, history) == ("original", [])
+    assert "Refinement round 1 returned no idea." in capsys.readouterr().out
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from ideation_cli.jobqueue import (
+    DONE,
+    FAILED,
+    JobQueue,
+    LEASED,
+    PENDING,
+    QUEUE_FILENAME,
+    enqueue_main,
+    worker_main,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def queue(tmp_path):
+    clock = Clock()
+    queue = JobQueue(str(tmp_path / "queue.db"), clock=clock, max_attempts=2)
+    queue.clock_ref = clock
+    yield queue
+    queue.close()
+
+
+def test_lease_and_ack_in_order(queue):
+    queue.enqueue([{"task": "one"}, {"task": "two"}])
+    first = queue.lease("a", 60)
+    second = queue.lease("b", 60)
+    assert first[1] == {"task": "one"} and second[1] == {"task": "two"}
+    assert queue.lease("c", 60) is None
+
+    assert queue.ack(first[0], "a", "/ideas/one")
+    # Only the lease holder can acknowledge a job.
+    assert not queue.ack(second[0], "a")
+    assert queue.counts() == {PENDING: 0, LEASED: 1, DONE: 1, FAILED: 0}
+
+
+def test_expired_lease_is_retaken_then_failed(queue):
+    queue.enqueue([{"task": "one"}])
+    job_id, _ = queue.lease("dead", 60)
+
+    queue.clock_ref.now += 61
+    assert queue.lease("alive", 60)[0] == job_id
+    assert not queue.ack(job_id, "dead")
+
+    # Out of attempts once the second lease expires too.
+    queue.clock_ref.now += 61
+    assert queue.lease("other", 60) is None
+    assert queue.counts()[FAILED] == 1
+
+
+def test_failed_job_is_retried_until_out_of_attempts(queue):
+    queue.enqueue([{"task": "one"}])
+    job_id, _ = queue.lease("a", 60)
+    queue.fail(job_id, "a", "boom")
+    assert queue.counts()[PENDING] == 1
+    job_id, _ = queue.lease("a", 60)
+    queue.fail(job_id, "a", "boom")
+    assert queue.counts()[FAILED] == 1
+
+
+def test_enqueue_and_worker_process_every_job(monkeypatch, tmp_path, capsys):
+    seen = []
+
+    def fake_process_game_iteration(args):
+        seen.append((args.task, args.count, args.model))
+        if len(seen) == 2:
+            raise RuntimeError("boom")
+        return str(tmp_path / args.task), {}
+
+    monkeypatch.setattr(
+        "ideation_cli.jobqueue.process_game_iteration", fake_process_game_iteration
+    )
+    enqueue_main(
+        [
+            "--path",
+            str(tmp_path),
+            "--task",
+            "Sea",
+            "--count",
+            "3",
+            "--model",
+            "gpt-4o-mini",
+        ]
+    )
+    assert os.path.exists(tmp_path / QUEUE_FILENAME)
+
+    worker_main(["--path", str(tmp_path)])
+    # The failed job is retried by the same worker.
+    assert seen == [("Sea", 1, "gpt-4o-mini")] * 4
+    assert "Error: Job 2 failed: boom" in capsys.readouterr().out
+
+    queue = JobQueue(str(tmp_path / QUEUE_FILENAME))
+    assert queue.counts()[DONE] == 3
+    queue.close()
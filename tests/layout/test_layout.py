@@ -0,0 +1,133 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from ideation_cli.layout import make_idea_dir, migrate, shard
+
+pytestmark = pytest.mark.unit
+
+
+def test_flat_layout_keeps_the_name_and_timestamp(tmp_path):
+    dir_path, game_id = make_idea_dir(str(tmp_path), "Puzzle Game", "Tides")
+
+    assert os.path.isdir(dir_path)
+    assert os.path.dirname(dir_path) == str(tmp_path / "PuzzleGame")
+    assert os.path.basename(dir_path) == game_id
+    assert game_id.startswith("Tides_")
+
+
+def test_flat_layout_does_not_reuse_a_directory(tmp_path, monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 1, 1, 12, 0, 0)
+
+    monkeypatch.setattr("ideation_cli.layout.datetime", FrozenDatetime)
+
+    # The same name in the same second used to share a directory.
+    first, first_id = make_idea_dir(str(tmp_path), "Puzzle", "Tides")
+    second, second_id = make_idea_dir(str(tmp_path), "Puzzle", "Tides")
+
+    assert first_id == "Tides_20250101120000"
+    assert second_id.startswith("Tides_20250101120000_")
+    assert first != second
+    assert os.path.basename(second) == second_id
+
+
+def test_sharded_layout_nests_ideas_under_their_hash(tmp_path):
+    dir_path, game_id = make_idea_dir(str(tmp_path), "Puzzle", "Tides", "sharded")
+
+    relative = os.path.relpath(dir_path, tmp_path).split(os.sep)
+    assert relative == ["Puzzle", *shard(game_id), game_id]
+    assert all(len(part) == 2 for part in relative[1:3])
+
+
+def test_sharded_ids_are_unique(tmp_path):
+    paths = {
+        make_idea_dir(str(tmp_path), "Puzzle", "Tides", "sharded")[0] for _ in range(50)
+    }
+
+    assert len(paths) == 50
+
+
+def save_flat_idea(root, game_dir, name, cover=False):
+    dir_path = os.path.join(root, game_dir, name)
+    os.makedirs(dir_path)
+    metadata = {"name": name, "cover": None}
+    if cover:
+        image_path = os.path.join(dir_path, "cover.png")
+        with open(image_path, "wb") as file:
+            file.write(b"png")
+        metadata["cover"] = {"image_path": image_path, "image_prompt": "p"}
+    with open(os.path.join(dir_path, "metadata.json"), "w", encoding="utf-8") as file:
+        json.dump(metadata, file)
+    return dir_path
+
+
+def test_migrate_moves_ideas_both_ways(tmp_path):
+    root = str(tmp_path)
+    save_flat_idea(root, "Puzzle", "Tides_20250101000000", cover=True)
+    save_flat_idea(root, "Racing", "Drift_20250101000000")
+
+    moves = migrate(root, "sharded")
+
+    assert len(moves) == 2
+    target = os.path.join(
+        root, "Puzzle", *shard("Tides_20250101000000"), "Tides_20250101000000"
+    )
+    with open(os.path.join(target, "metadata.json"), encoding="utf-8") as file:
+        metadata = json.load(file)
+    assert metadata["cover"]["image_path"] == os.path.join(target, "cover.png")
+    assert not os.path.exists(os.path.join(root, "Puzzle", "Tides_20250101000000"))
+    assert migrate(root, "sharded") == []
+
+    migrate(root, "flat")
+
+    assert sorted(os.listdir(os.path.join(root, "Puzzle"))) == ["Tides_20250101000000"]
+    assert os.path.isfile(
+        os.path.join(root, "Racing", "Drift_20250101000000", "metadata.json")
+    )
+
+
+def test_migrate_keeps_a_relative_cover_path_relative(tmp_path, monkeypatch):
+    root = str(tmp_path / "ideas")
+    dir_path = save_flat_idea(root, "Puzzle", "Tides_20250101000000")
+    metadata_path = os.path.join(dir_path, "metadata.json")
+    with open(metadata_path, encoding="utf-8") as file:
+        metadata = json.load(file)
+    # Saved by a run started in tmp_path with --path ideas.
+    stored = os.path.join("ideas", "Puzzle", "Tides_20250101000000", "cover.png")
+    metadata["cover"] = {"image_path": stored, "image_prompt": "p"}
+    with open(metadata_path, "w", encoding="utf-8") as file:
+        json.dump(metadata, file)
+    monkeypatch.chdir(tmp_path / "ideas" / "Puzzle")
+
+    [(_, new)] = migrate(root, "sharded")
+
+    with open(os.path.join(root, new, "metadata.json"), encoding="utf-8") as file:
+        metadata = json.load(file)
+    assert metadata["cover"]["image_path"] == os.path.join("ideas", new, "cover.png")
+
+
+def test_migrate_dry_run_moves_nothing(tmp_path):
+    dir_path = save_flat_idea(str(tmp_path), "Puzzle", "Tides_20250101000000")
+
+    moves = migrate(str(tmp_path), "sharded", dry_run=True)
+
+    assert len(moves) == 1
+    assert os.path.isdir(dir_path)
+
+
+def test_migrate_updates_the_embedding_index(tmp_path):
+    root = str(tmp_path)
+    save_flat_idea(root, "Puzzle", "Tides_20250101000000")
+    ids_path = tmp_path / ".embeddings" / "hashing" / "ids.jsonl"
+    os.makedirs(ids_path.parent)
+    old = os.path.join("Puzzle", "Tides_20250101000000")
+    ids_path.write_text(json.dumps({"path": old, "name": "Tides"}) + "\n")
+
+    [(_, new)] = migrate(root, "sharded")
+
+    assert json.loads(ids_path.read_text())["path"] == new
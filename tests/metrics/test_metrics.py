@@ -0,0 +1,76 @@
+import urllib.request
+
+import pytest
+
+from ideation_cli.metrics import Metrics
+
+pytestmark = pytest.mark.unit
+
+
+def test_render_counters_and_histograms():
+    metrics = Metrics()
+    labels = {"stage": "name", "model": "gpt-4o-mini", "outcome": "ok"}
+    metrics.inc("ideation_api_calls_total", **labels)
+    metrics.inc("ideation_api_calls_total", **labels)
+    metrics.observe("ideation_api_call_seconds", 0.3, **labels)
+    metrics.observe("ideation_api_call_seconds", 7.0, **labels)
+    metrics.collect("ideation_writer_queue_depth", lambda: 4)
+
+    text = metrics.render()
+    assert "# TYPE ideation_api_calls_total counter" in text
+    assert (
+        'ideation_api_calls_total{model="gpt-4o-mini",outcome="ok",stage="name"} 2'
+        in text
+    )
+    bucket = 'ideation_api_call_seconds_bucket{model="gpt-4o-mini",outcome="ok",stage="name",le="%s"} %d'
+    assert bucket % ("0.25", 0) in text
+    assert bucket % ("0.5", 1) in text
+    assert bucket % ("+Inf", 2) in text
+    assert (
+        'ideation_api_call_seconds_count{model="gpt-4o-mini",outcome="ok",stage="name"} 2'
+        in text
+    )
+    assert "ideation_writer_queue_depth 4" in text
+    # Metrics without values are left out.
+    assert "ideation_ideas_total" not in text
+    assert metrics.value("ideation_api_call_seconds", **labels) == 2
+
+
+def test_unknown_metric_is_rejected():
+    with pytest.raises(KeyError):
+        Metrics().inc("ideation_unknown_total")
+
+
+def test_exports_over_http_and_to_a_textfile(tmp_path):
+    metrics = Metrics()
+    metrics.inc("ideation_ideas_total", outcome="ok")
+    textfile = tmp_path / "ideation.prom"
+    host, port = metrics.start(port=0, textfile=str(textfile), interval=60)
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+        assert 'ideation_ideas_total{outcome="ok"} 1' in body
+    finally:
+        metrics.stop()
+    # Stopping writes the textfile one last time.
+    assert 'ideation_ideas_total{outcome="ok"} 1' in textfile.read_text()
+
+
+def test_total_sums_matching_series():
+    metrics = Metrics()
+    metrics.inc("ideation_api_calls_total", stage="name", model="a", outcome="ok")
+    metrics.inc("ideation_api_calls_total", 2, stage="name", model="b", outcome="ok")
+    metrics.inc("ideation_api_calls_total", stage="metadata", model="a", outcome="ok")
+
+    assert metrics.total("ideation_api_calls_total") == 4
+    assert metrics.total("ideation_api_calls_total", stage="name") == 3
+
+
+def test_quantile_interpolates_within_buckets():
+    metrics = Metrics()
+    for _ in range(10):
+        metrics.observe("ideation_api_call_seconds", 0.3, stage="name")
+
+    assert metrics.quantile("ideation_api_call_seconds", 0.5, stage="metadata") is None
+    # Every observation is in the (0.25, 0.5] bucket.
+    assert metrics.quantile("ideation_api_call_seconds", 0.5) == pytest.approx(0.375)
@@ -0,0 +1,122 @@
+import pytest
+
+from ideation_cli import planner
+from ideation_cli.budget import IMAGE_PRICING
+
+pytestmark = pytest.mark.unit
+
+
+class FakeArgs:
+    pass
+
+
+def make_fake_args(**overrides):
+    args = FakeArgs()
+    args.task = "Test Task"
+    args.game_type = "Test Game"
+    args.model = "gpt-4o"
+    args.count = 4
+    args.name = None
+    args.ideation_technique = None
+    args.theme = None
+    args.image = False
+    args.randomize = False
+    args.concurrency = 1
+    args.max_seconds = None
+    args.max_cost = None
+    args.top_k = None
+    args.rank = "heuristic"
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+
+def test_count_message_tokens_adds_overhead():
+    messages = [{"role": "user", "content": "hello"}]
+    tokens = planner.count_message_tokens(messages, "gpt-4o")
+    assert tokens >= planner.TOKENS_PER_MESSAGE + planner.TOKENS_PER_REPLY + 1
+
+
+def test_build_plan_expands_every_call():
+    plan = planner.build_plan(make_fake_args(image=True))
+    assert len(plan["ideas"]) == 4
+    stages = [call["stage"] for call in plan["ideas"][0]]
+    assert stages == ["name", "metadata", "image_prompt", "image"]
+
+
+def test_build_plan_skips_name_when_given():
+    plan = planner.build_plan(make_fake_args(name="Fixed"))
+    assert [call["stage"] for call in plan["ideas"][0]] == ["metadata"]
+
+
+def test_build_plan_runs_a_chain_once_per_set_of_leaves():
+    # One run of the chain yields two leaves, so two ideas per run.
+    plan = planner.build_plan(
+        make_fake_args(ideation_technique="scamper,crazy_eights*2")
+    )
+    stages = [[call["stage"] for call in calls] for calls in plan["ideas"]]
+    assert stages[0] == ["ideas", "ideas", "ideas", "name", "metadata"]
+    assert stages[1] == ["name", "metadata"]
+    assert stages[2] == stages[0]
+
+
+def test_build_plan_refines_for_each_round():
+    plan = planner.build_plan(
+        make_fake_args(count=1, ideation_technique="round_robin", rounds=4)
+    )
+    calls = plan["ideas"][0]
+    assert [call["stage"] for call in calls] == ["refine"] * 4 + ["name", "metadata"]
+    # Later rounds carry capped notes, not the conversation, so they stay flat.
+    assert calls[3]["prompt_tokens"] == calls[1]["prompt_tokens"]
+
+
+def test_build_plan_plans_the_agent_turns():
+    plan = planner.build_plan(make_fake_args(count=1, agents=True))
+    calls = plan["ideas"][0]
+    assert [call["stage"] for call in calls] == ["agents"] * 4 + ["name", "metadata"]
+    # The three first turns run concurrently; the revision waits for them.
+    first_turns = sum(call["latency"] for call in calls[:3])
+    assert first_turns == pytest.approx(calls[3]["latency"])
+
+
+def test_build_plan_makes_no_api_calls(monkeypatch):
+    from ideation_cli import generator
+
+    def fail(**kwargs):
+        raise AssertionError("The planner must not call the API")
+
+    monkeypatch.setattr(generator.OPENAI_CLIENT.chat.completions, "create", fail)
+    monkeypatch.setattr(generator.OPENAI_CLIENT.images, "generate", fail)
+    planner.build_plan(make_fake_args(randomize=True, image=True))
+
+
+def test_oversized_theme_warns():
+    plan = planner.build_plan(
+        make_fake_args(randomize=True, theme="a long jam brief " * 400)
+    )
+    assert any("Theme is" in warning for warning in plan["warnings"])
+
+
+def test_summarize_plan_uses_concurrency_for_wall_time():
+    plan = planner.build_plan(make_fake_args(image=True))
+    serial = planner.summarize_plan(plan, make_fake_args())["total"]
+    parallel = planner.summarize_plan(plan, make_fake_args(concurrency=4))["total"]
+    assert parallel["wall_time"] == pytest.approx(serial["wall_time"] / 4)
+    assert serial["images"] == 4
+    assert serial["chat_calls"] == 12
+    assert serial["cost"] > 4 * IMAGE_PRICING["dall-e-3"]
+
+
+def test_print_plan_warns_when_over_budget(capsys):
+    args = make_fake_args(image=True, max_cost=0.01)
+    planner.print_plan(planner.build_plan(args), args)
+    out = capsys.readouterr().out
+    assert "Plan: 4 idea(s) at concurrency 1" in out
+    assert "Estimated cost exceeds --max-cost" in out
+
+
+def test_build_plan_top_k_limits_images():
+    plan = planner.build_plan(make_fake_args(image=True, top_k=1, rank="model"))
+    summary = planner.summarize_plan(plan, make_fake_args())
+    assert summary["total"]["images"] == 1
+    assert any(stage == "rank" for stage, _ in summary["stages"])
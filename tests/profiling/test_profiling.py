@@ -0,0 +1,60 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ideation_cli import profiling
+from ideation_cli.profiling import Profiler, package_of
+
+pytestmark = pytest.mark.unit
+
+
+def build_idea(size):
+    return json.dumps({"name": "Idea", "blob": "x" * size})
+
+
+def test_profiles_each_iteration_and_the_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(profiling, "import_times", lambda: [(1500, 500, 0, "json")])
+    profiler = Profiler()
+    profiler.configure(str(tmp_path), top=5)
+    profiler.start()
+    # Iterations run on worker threads, as in run_iterations.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(profiler.call, build_idea, 10).result().startswith("{")
+        executor.submit(profiler.call, build_idea, 100000).result()
+    profiler.stop()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "importtime.txt",
+        "iteration-001.pstats",
+        "iteration-002.pstats",
+        "memory-001.txt",
+        "memory-002.txt",
+        "memory-end.txt",
+        "run.pstats",
+    ]
+    assert (
+        (tmp_path / "memory-001.txt")
+        .read_text()
+        .startswith("# Memory after iteration 1\n")
+    )
+    assert "json" in (tmp_path / "importtime.txt").read_text()
+    output = capsys.readouterr().out
+    assert "Top 5 functions by own time:" in output
+    assert "Own time by package:" in output
+    assert any(name == "build_idea" for _, _, name in profiler.stats().stats)
+
+
+def test_call_passes_through_when_disabled(tmp_path):
+    profiler = Profiler()
+    assert profiler.call(build_idea, 1) == build_idea(1)
+    profiler.stop()
+    assert profiler.summary() == "No profiles recorded."
+
+
+def test_package_of():
+    assert package_of("~") == "builtins"
+    assert package_of("/src/ideation_cli/generator.py") == "ideation_cli.generator"
+    assert package_of("/venv/lib/python3.11/site-packages/httpx/_client.py") == "httpx"
+    assert package_of(json.__file__) == "json"
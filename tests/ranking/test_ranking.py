@@ -0,0 +1,57 @@
+import pytest
+
+from ideation_cli import ranking
+
+pytestmark = pytest.mark.unit
+
+
+def make_output(name, short, detailed, tags):
+    return {
+        "name": name,
+        "branding_data": {
+            "short_description": short,
+            "detailed_description": detailed,
+            "tags": tags,
+        },
+    }
+
+
+def test_heuristic_prefers_complete_metadata():
+    complete = make_output("A", "A fishing game", "cast " * 100, ["a", "b", "c"])
+    empty = make_output("B", "", "", [])
+    assert ranking.heuristic_score(complete, [empty]) > ranking.heuristic_score(
+        empty, [complete]
+    )
+
+
+def test_heuristic_penalises_duplicates():
+    text = "pilot a submarine through a whirlpool of ships " * 10
+    first = make_output("A", "Submarine", text, ["sea", "ships", "storm"])
+    duplicate = make_output("B", "Submarine", text, ["sea", "ships", "storm"])
+    distinct = make_output(
+        "C", "Bakery", "bake bread for hungry ghosts " * 12, ["food", "ghosts", "cozy"]
+    )
+    assert ranking.heuristic_score(distinct, [first]) > ranking.heuristic_score(
+        duplicate, [first]
+    )
+
+
+def test_rank_ideas_orders_best_first():
+    outputs = [
+        make_output("Weak", "", "", []),
+        make_output("Strong", "A fishing game", "cast " * 100, ["a", "b", "c"]),
+    ]
+    order, scores = ranking.rank_ideas(outputs)
+    assert order == [1, 0]
+    assert scores[1] > scores[0]
+
+
+def test_rank_ideas_with_model_falls_back_to_heuristics(monkeypatch):
+    monkeypatch.setattr(ranking, "generate_scores", lambda ideas, model: [2, None])
+    outputs = [
+        make_output("Judged", "A fishing game", "cast " * 100, ["a", "b", "c"]),
+        make_output("Unjudged", "A baking game", "bake " * 100, ["d", "e", "f"]),
+    ]
+    order, scores = ranking.rank_ideas(outputs, method="model", model="gpt-4o")
+    assert scores[0] == pytest.approx(0.2)
+    assert order == [1, 0]
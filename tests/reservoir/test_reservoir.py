@@ -0,0 +1,108 @@
+import argparse
+import sys
+import threading
+
+import pytest
+
+from ideation_cli.reservoir import Reservoir
+
+pytestmark = pytest.mark.unit
+
+
+def make_args(**overrides):
+    settings = dict(
+        randomize=True,
+        name=None,
+        model="gpt-4o",
+        theme="Fish",
+        game_type=None,
+        ideation_technique=None,
+        temperature=1.0,
+        top_p=1.0,
+    )
+    settings.update(overrides)
+    return argparse.Namespace(**settings)
+
+
+def make_draft(name):
+    return {"task": "task", "game_type": "Puzzle", "name": name, "metadata": {}}
+
+
+def test_take_matches_settings_and_persists(tmp_path):
+    path = str(tmp_path / "reservoir.json")
+    reservoir = Reservoir()
+    reservoir.configure(path)
+    reservoir.add(make_args(), make_draft("One"))
+    reservoir.add(make_args(), make_draft("Two"))
+
+    assert reservoir.take(make_args(model="gpt-4o-mini")) is None
+    assert reservoir.take(make_args(randomize=False)) is None
+    assert reservoir.take(make_args(name="Fixed")) is None
+    assert reservoir.take(make_args())["name"] == "One"
+
+    reloaded = Reservoir()
+    reloaded.configure(path)
+    assert reloaded.take(make_args())["name"] == "Two"
+    assert reloaded.take(make_args()) is None
+
+
+def test_disabled_reservoir_returns_nothing():
+    assert Reservoir().take(make_args()) is None
+
+
+def test_start_fills_to_size_quietly(tmp_path, capsys):
+    reservoir = Reservoir()
+    reservoir.configure(str(tmp_path / "reservoir.json"))
+    warmed = threading.Event()
+    names = iter(["One", "Two", "Three", "Four"])
+
+    def produce(args):
+        print("Generated name: noisy")
+        return make_draft(next(names))
+
+    stdout = sys.stdout
+    reservoir.start(make_args(), produce, 3, warm=warmed.set)
+    print("shown")
+    reservoir._thread.join()  # Let it fill up before stopping it.
+    reservoir.close()
+
+    assert sys.stdout is stdout
+    assert warmed.is_set()
+    assert reservoir.count(make_args()) == 3
+    assert capsys.readouterr().out == "shown\n"
+
+
+def test_stop_keeps_idea_in_progress(tmp_path):
+    reservoir = Reservoir()
+    reservoir.configure(str(tmp_path / "reservoir.json"))
+    started, release = threading.Event(), threading.Event()
+
+    def produce(args):
+        started.set()
+        release.wait()
+        return make_draft("Slow")
+
+    reservoir.start(make_args(), produce, 5)
+    started.wait()
+    reservoir.stop()
+    release.set()
+    reservoir.close()
+    assert reservoir.count(make_args()) == 1
+
+
+def test_prefetched_ideas_are_kept_in_memory_until_a_path_is_given(tmp_path):
+    path = str(tmp_path / "reservoir.json")
+    saved = Reservoir()
+    saved.configure(path)
+    saved.add(make_args(), make_draft("Saved"))
+
+    reservoir = Reservoir()
+    reservoir.configure(None)
+    reservoir.add(make_args(), make_draft("Prefetched"))
+    assert reservoir.take(make_args()) is None  # Not used before the path is known.
+
+    reservoir.configure(path, keep_prefetched=True)
+    assert [reservoir.take(make_args())["name"] for _ in range(2)] == [
+        "Saved",
+        "Prefetched",
+    ]
@@ -0,0 +1,108 @@
+import argparse
+
+import pytest
+
+from ideation_cli import routing
+from ideation_cli.routing import ModelRouter, parse_stage_assignment
+
+pytestmark = pytest.mark.unit
+
+
+def test_route_uses_stage_table_then_default():
+    router = ModelRouter()
+    # Cheap stages are routed to the small model by default.
+    assert router.route("name", "gpt-4o") == "gpt-4o-mini"
+    # Stages without an entry use the run-level model.
+    assert router.route("metadata", "gpt-4o") == "gpt-4o"
+
+
+def test_configure_overrides_stage_model():
+    router = ModelRouter()
+    router.configure({"metadata": "gpt-3.5-turbo"})
+    assert router.route("metadata", "gpt-4o") == "gpt-3.5-turbo"
+
+
+def test_slo_breach_falls_back_to_next_model(capsys):
+    router = ModelRouter(stage_slos={"metadata": 1.0})
+    for _ in range(routing.MIN_SAMPLES):
+        router.record("metadata", "gpt-4o", latency=5.0)
+
+    assert router.route("metadata", "gpt-4o") == "gpt-4o-mini"
+    assert "falling back to gpt-4o-mini" in capsys.readouterr().out
+
+    # A second breach on the fallback moves further down the list.
+    for _ in range(routing.MIN_SAMPLES):
+        router.record("metadata", "gpt-4o-mini", latency=5.0)
+    assert router.route("metadata", "gpt-4o") == "gpt-3.5-turbo"
+
+
+def test_fast_calls_do_not_fall_back():
+    router = ModelRouter(stage_slos={"metadata": 1.0})
+    for _ in range(10):
+        router.record("metadata", "gpt-4o", latency=0.2)
+    assert router.route("metadata", "gpt-4o") == "gpt-4o"
+
+
+def test_error_rate_triggers_fallback():
+    router = ModelRouter(stage_slos={"name": 100.0})
+    for _ in range(routing.MIN_SAMPLES):
+        router.record("name", "gpt-4o-mini", latency=0.1, ok=False)
+    assert router.route("name", "gpt-4o") == "gpt-3.5-turbo"
+
+
+def test_last_model_has_no_fallback():
+    router = ModelRouter(stage_slos={"metadata": 1.0})
+    for _ in range(routing.MIN_SAMPLES):
+        router.record("metadata", "gpt-3.5-turbo", latency=5.0)
+    assert router.route("metadata", "gpt-3.5-turbo") == "gpt-3.5-turbo"
+
+
+def test_fallbacks_move_to_faster_models_only():
+    router = ModelRouter(stage_slos={"name": 1.0})
+    for model in ("gpt-4o-mini", "gpt-3.5-turbo"):
+        for _ in range(routing.MIN_SAMPLES):
+            router.record("name", model, latency=5.0, params={"temperature": 1.2})
+    # The fastest model has nowhere faster to go, so no slower model is tried.
+    assert router.route("name", "gpt-4o") == "gpt-3.5-turbo"
+
+
+def test_fallbacks_skip_models_that_reject_the_sampling_parameters():
+    router = ModelRouter(stage_slos={"metadata": 1.0})
+    for _ in range(routing.MIN_SAMPLES):
+        router.record("metadata", "o1-preview", latency=50.0)
+    assert router.route("metadata", "o1-preview") == "o1-mini"
+
+    router = ModelRouter(stage_slos={"metadata": 1.0})
+    for _ in range(routing.MIN_SAMPLES):
+        router.record(
+            "metadata", "o1-preview", latency=50.0, params={"temperature": 0.7}
+        )
+    assert router.route("metadata", "o1-preview") == "gpt-4o"
+
+
+def test_pinned_model_applies_only_inside_the_context():
+    router = ModelRouter()
+    table = dict(router.stage_models)
+    with router.pinned("gpt-3.5-turbo"):
+        assert router.route("metadata", "gpt-4o") == "gpt-3.5-turbo"
+        assert router.route("name", "gpt-4o") == "gpt-3.5-turbo"
+    assert router.route("metadata", "gpt-4o") == "gpt-4o"
+    assert router.stage_models == table
+
+
+def test_stats_snapshot():
+    router = ModelRouter()
+    router.record("name", "gpt-4o-mini", latency=1.0)
+    router.record("name", "gpt-4o-mini", latency=3.0, ok=False)
+    stats = router.stats()["name"]["gpt-4o-mini"]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 1
+    assert stats["mean_latency"] == 2.0
+
+
+def test_parse_stage_assignment():
+    assert parse_stage_assignment("name=gpt-4o-mini") == ("name", "gpt-4o-mini")
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_stage_assignment("name")
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_stage_assignment("unknown=gpt-4o")
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from ideation_cli import strategies
+from ideation_cli.sampler import SAMPLER, SeedSampler, saturated_game_types
+
+pytestmark = pytest.mark.unit
+
+ITEMS = ["a", "b", "c", "d", "e"]
+
+
+def test_no_repeats_until_the_list_is_exhausted():
+    sampler = SeedSampler()
+    first_round = [sampler.choice("pool", ITEMS) for _ in ITEMS]
+    second_round = [sampler.choice("pool", ITEMS) for _ in ITEMS]
+    assert sorted(first_round) == ITEMS
+    assert sorted(second_round) == ITEMS
+
+
+def test_seed_makes_draws_reproducible():
+    draws = []
+    for _ in range(2):
+        sampler = SeedSampler()
+        sampler.configure(seed=7)
+        draws.append([sampler.choice("pool", ITEMS) for _ in range(8)])
+    assert draws[0] == draws[1]
+
+
+def test_history_carries_over_between_runs(tmp_path):
+    history = tmp_path / ".sampler.json"
+    sampler = SeedSampler()
+    sampler.configure(history_path=str(history))
+    first = [sampler.choice("pool", ITEMS) for _ in range(3)]
+    assert json.loads(history.read_text()) == {"pool": first}
+
+    sampler = SeedSampler()
+    sampler.configure(history_path=str(history))
+    rest = [sampler.choice("pool", ITEMS) for _ in range(2)]
+    assert sorted(first + rest) == ITEMS
+
+    # The list is exhausted, so the next draw starts a new round.
+    sampler.choice("pool", ITEMS)
+    assert len(json.loads(history.read_text())["pool"]) == 1
+
+
+def test_strategies_draw_without_repeats(monkeypatch):
+    monkeypatch.setattr(
+        strategies, "load_json", lambda path: {"oblique_strategies": ITEMS}
+    )
+    SAMPLER.configure(seed=1)
+    try:
+        drawn = [strategies.apply_oblique_strategy("Game")[1] for _ in ITEMS]
+    finally:
+        SAMPLER.configure()
+    assert sorted(drawn) == ITEMS
+
+
+def test_avoided_items_are_left_out_while_others_remain(tmp_path):
+    report = tmp_path / ".clusters" / "saturation.json"
+    report.parent.mkdir()
+    report.write_text(json.dumps({"saturated_game_types": ["a", "b"]}))
+    avoid = saturated_game_types(str(tmp_path))
+    assert avoid == ["a", "b"]
+
+    sampler = SeedSampler()
+    sampler.configure(avoid=avoid)
+    assert sorted(sampler.choice("pool", ITEMS) for _ in range(3)) == ["c", "d", "e"]
+    # With every item avoided the list is drawn from as usual.
+    assert sampler.choice("other", ["a", "b"]) in ("a", "b")
+
+
+def test_saturated_game_types_without_a_report(tmp_path):
+    assert saturated_game_types(str(tmp_path)) == []
@@ -0,0 +1,153 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from ideation_cli.server import (
+    build_serve_parser,
+    job_args,
+    job_parser,
+    main,
+    make_server,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def fake_process_game_iteration(args):
+    output = {"task": args.task, "name": "Generated Name", "model": args.model}
+    return f"/ideas/{args.task}", output
+
+
+@pytest.fixture
+def serve(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        "ideation_cli.cli.process_game_iteration", fake_process_game_iteration
+    )
+    servers = []
+
+    def start(*argv):
+        args = build_serve_parser().parse_args(
+            ["--path", str(tmp_path), "--port", "0", *argv]
+        )
+        server = make_server(args)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post_job(connection, options):
+    connection.request("POST", "/jobs", body=json.dumps(options))
+    response = connection.getresponse()
+    body = response.read().decode("utf-8")
+    if response.status != 200:
+        return response.status, json.loads(body)
+    return response.status, [json.loads(line) for line in body.splitlines()]
+
+
+def test_job_args_merge_over_server_defaults():
+    defaults = build_serve_parser().parse_args(["--model", "gpt-4o-mini", "--image"])
+    parser = job_parser()
+
+    args = job_args(parser, defaults, {"task": "A task", "count": 3, "image": False})
+    assert (args.task, args.count, args.model, args.image) == (
+        "A task",
+        3,
+        "gpt-4o-mini",
+        True,
+    )
+    assert defaults.task is None
+
+    with pytest.raises(ValueError, match="Unsupported job option"):
+        job_args(parser, defaults, {"path": "/tmp"})
+    with pytest.raises(ValueError, match="invalid choice"):
+        job_args(parser, defaults, {"model": "not-a-model"})
+
+
+def test_job_streams_idea_events(serve):
+    server = serve("--model", "gpt-4o-mini")
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+
+    status, events = post_job(connection, {"task": "Sea", "count": 2})
+    assert status == 200
+    assert [event["event"] for event in events] == ["idea", "idea", "done"]
+    assert events[0]["output"] == {
+        "task": "Sea",
+        "name": "Generated Name",
+        "model": "gpt-4o-mini",
+    }
+    assert events[-1]["ideas"] == 2
+
+
+def test_invalid_job_is_rejected(serve):
+    server = serve()
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+    status, body = post_job(connection, {"count": "many"})
+    assert status == 400
+    assert "invalid int value" in body["error"]
+
+
+def test_health_and_stats(serve):
+    server = serve()
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+    connection.request("GET", "/health")
+    assert json.loads(connection.getresponse().read()) == {"status": "ok", "jobs": 0}
+    connection.request("GET", "/stats")
+    assert set(json.loads(connection.getresponse().read())) == {
+        "jobs",
+        "writer_queue",
+        "router",
+        "transport",
+        "endpoints",
+    }
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requires Unix sockets")
+def test_unix_socket(serve, tmp_path):
+    socket_path = str(tmp_path / "ideation.sock")
+    serve("--socket", socket_path)
+
+    class UnixConnection(http.client.HTTPConnection):
+        def connect(self):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(socket_path)
+
+    status, events = post_job(UnixConnection("localhost"), {"task": "Sea"})
+    assert status == 200
+    assert events[-1] == {"event": "done", "ideas": 1}
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requires Unix sockets")
+def test_socket_path_that_is_not_a_socket_is_left_alone(tmp_path, monkeypatch, capsys):
+    from ideation_cli.covers import COVER_STORE
+
+    # main() points the process-wide cover store at the output path; restore it afterwards.
+    monkeypatch.setattr(COVER_STORE, "root", COVER_STORE.root)
+    data_path = tmp_path / "notes.txt"
+    data_path.write_text("keep me")
+    args = build_serve_parser().parse_args(["--socket", str(data_path)])
+    with pytest.raises(RuntimeError, match="is not a socket"):
+        make_server(args)
+
+    with pytest.raises(SystemExit) as exited:
+        main(["--path", str(tmp_path), "--socket", str(data_path)])
+    assert exited.value.code == 1
+    assert "Error:" in capsys.readouterr().out
+    assert data_path.read_text() == "keep me"
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requires Unix sockets")
+def test_stale_socket_is_replaced(tmp_path):
+    socket_path = str(tmp_path / "ideation.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    server = make_server(build_serve_parser().parse_args(["--socket", socket_path]))
+    server.server_close()
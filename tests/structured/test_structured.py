@@ -0,0 +1,66 @@
+import pytest
+
+from ideation_cli import structured
+
+pytestmark = pytest.mark.unit
+
+
+def test_strip_code_fences_keeps_content_characters():
+    # str.strip("```json") would also eat the leading "j" and trailing "n".
+    assert structured.strip_code_fences("```json\njust a plan\n```") == "just a plan"
+    assert structured.strip_code_fences("no fence") == "no fence"
+
+
+def test_parse_partial_json_ignores_surrounding_text():
+    text = 'Here you go:\n```json\n{"tags": ["a", "b"]}\n```\nEnjoy!'
+    assert structured.parse_partial_json(text) == {"tags": ["a", "b"]}
+
+
+def test_parse_partial_json_closes_truncated_string():
+    text = '{"short_description": "A fish game", "detailed_description": "Swim thr'
+    assert structured.parse_partial_json(text) == {
+        "short_description": "A fish game",
+        "detailed_description": "Swim thr",
+    }
+
+
+def test_parse_partial_json_drops_incomplete_member():
+    text = '{"short_description": "A fish game", "tags": ["sea", '
+    assert structured.parse_partial_json(text) == {
+        "short_description": "A fish game",
+        "tags": ["sea"],
+    }
+    text = '{"short_description": "A fish game", "detailed_description":'
+    assert structured.parse_partial_json(text) == {"short_description": "A fish game"}
+
+
+def test_parse_partial_json_without_json_raises():
+    with pytest.raises(ValueError):
+        structured.parse_partial_json("I cannot help with that.")
+
+
+def test_validate_metadata_reports_missing_and_invalid_fields():
+    valid, missing = structured.validate_metadata(
+        {"short_description": "short", "detailed_description": 42}
+    )
+    assert valid == {"short_description": "short"}
+    assert missing == ["detailed_description", "tags"]
+
+
+def test_validate_metadata_splits_string_tags():
+    valid, missing = structured.validate_metadata(
+        {
+            "short_description": "short",
+            "detailed_description": "detailed",
+            "tags": "fish, ocean",
+        }
+    )
+    assert valid["tags"] == ["fish", "ocean"]
+    assert missing == []
+
+
+def test_metadata_response_format_limits_fields():
+    response_format = structured.metadata_response_format(["tags"])
+    schema = response_format["json_schema"]["schema"]
+    assert list(schema["properties"]) == ["tags"]
+    assert schema["required"] == ["tags"]
@@ -0,0 +1,59 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ideation_cli.transport import MIN_POOL_SIZE, Transport, pool_size
+
+pytestmark = pytest.mark.unit
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"image"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/cover.png"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_is_sized_for_concurrency():
+    assert pool_size(1) == MIN_POOL_SIZE
+    assert pool_size(16) == 32
+
+
+def test_downloads_reuse_connections(url):
+    transport = Transport()
+    transport.configure(http2=False)
+    for _ in range(3):
+        assert transport.download(url) == b"image"
+
+    stats = transport.stats()
+    assert stats["requests"] == 3
+    assert stats["connections"] == 1
+    assert stats["reused"] == pytest.approx(2 / 3)
+    assert stats["http2"] is False
+    assert transport.summary() == (
+        "Connections: 3 request(s) over 1 new connection(s), 67% reused."
+    )
+
+
+def test_reconfigure_resets_stats(url):
+    transport = Transport()
+    transport.download(url)
+    transport.configure()
+    assert transport.stats()["requests"] == 0
@@ -1,3 +1,4 @@
+import inspect
 import sys
 import pytest
 from ideation_cli import utils
@@ -23,6 +24,15 @@ def test_parse_arguments_defaults(monkeypatch):
     assert args.interactive is False
 
 
+def test_rounds_default_matches_refine_idea(monkeypatch):
+    from ideation_cli.generator import refine_idea
+
+    monkeypatch.setattr(sys, "argv", ["script_name"])
+    args = utils.parse_arguments()
+    default = inspect.signature(refine_idea).parameters["rounds"].default
+    assert args.rounds == default
+
+
 def test_parse_arguments_interactive_flag(monkeypatch):
     # When --interactive is provided, it should be set to True in the namespace.
     monkeypatch.setattr(sys, "argv", ["script_name", "--interactive"])
@@ -67,3 +77,22 @@ def test_parse_arguments_custom(monkeypatch):
     assert args.name == "TestName"
     # Since we did not provide --interactive, it should be False.
     assert args.interactive is False
+
+
+def test_parse_arguments_stage_model(monkeypatch):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "script_name",
+            "--stage-model",
+            "name=gpt-4o-mini",
+            "--stage-model",
+            "metadata=gpt-4o",
+            "--stage-slo",
+            "name=5",
+        ],
+    )
+    args = utils.parse_arguments()
+    assert args.stage_model == [("name", "gpt-4o-mini"), ("metadata", "gpt-4o")]
+    assert args.stage_slo == [("name", "5")]
@@ -0,0 +1,157 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from ideation_cli import writer
+from ideation_cli.covers import CoverStore
+from ideation_cli.writer import BackgroundWriter, atomic_write
+
+pytestmark = pytest.mark.unit
+
+PARAMS = {"model": "dall-e-3", "size": "1024x1024", "quality": "standard"}
+
+
+@pytest.fixture
+def background_writer(monkeypatch):
+    background = BackgroundWriter(queue_size=4, batch_size=3)
+    monkeypatch.setattr(writer, "WRITER", background)
+    background.start()
+    yield background
+    background.close()
+
+
+def test_atomic_write_replaces_without_leaving_temp_files(tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text("old")
+    atomic_write(str(path), b"new")
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["metadata.json"]
+
+
+def test_writes_are_inline_without_a_running_writer(tmp_path):
+    path = tmp_path / "metadata.json"
+    writer.write_json(str(path), {"name": "Game"})
+    assert json.loads(path.read_text()) == {"name": "Game"}
+
+
+def test_background_writes_drain_on_close(tmp_path, background_writer):
+    paths = [str(tmp_path / f"{index}.json") for index in range(10)]
+    for index, path in enumerate(paths):
+        writer.write_json(path, {"index": index})
+    background_writer.close()
+
+    assert not background_writer.running
+    for index, path in enumerate(paths):
+        with open(path, encoding="utf-8") as file:
+            assert json.load(file) == {"index": index}
+        assert not writer.is_pending(path)
+
+
+def test_link_waits_for_queued_write(tmp_path, background_writer):
+    source = str(tmp_path / "object.png")
+    target = str(tmp_path / "cover.png")
+    writer.write_bytes(source, b"png")
+    writer.link(source, target)
+    background_writer.close()
+    assert open(target, "rb").read() == b"png"
+
+
+def test_full_queue_blocks_producers(tmp_path, monkeypatch):
+    background = BackgroundWriter(queue_size=1, batch_size=1)
+    monkeypatch.setattr(writer, "WRITER", background)
+    release = threading.Event()
+    original = background._process
+    monkeypatch.setattr(
+        background, "_process", lambda batch: (release.wait(), original(batch))
+    )
+    background.start()
+
+    def produce():
+        for index in range(3):
+            writer.write_bytes(str(tmp_path / f"{index}.bin"), b"x")
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()
+
+    release.set()
+    producer.join()
+    background.close()
+    assert sorted(os.listdir(tmp_path)) == ["0.bin", "1.bin", "2.bin"]
+
+
+def test_failed_writes_are_reported_on_close(tmp_path, background_writer, capsys):
+    writer.write_bytes(str(tmp_path / "missing" / "file.bin"), b"x")
+    background_writer.close()
+    assert "Error: Failed to write" in capsys.readouterr().out
+
+
+def test_failed_fsync_is_reported_and_the_writer_keeps_going(
+    tmp_path, background_writer, monkeypatch, capsys
+):
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer.os, "fsync", failing_fsync)
+    writer.write_bytes(str(tmp_path / "first.bin"), b"x")
+    background_writer.flush()
+    monkeypatch.undo()
+    writer.write_bytes(str(tmp_path / "second.bin"), b"y")
+    background_writer.close()
+
+    assert "Failed to write" in capsys.readouterr().out
+    # The failed write leaves no temp file, and later writes still happen.
+    assert os.listdir(tmp_path) == ["second.bin"]
+    assert not writer.is_pending(str(tmp_path / "first.bin"))
+
+
+def test_fsyncs_of_a_batch_run_concurrently(tmp_path, background_writer, monkeypatch):
+    # Each fsync waits for the other, so issuing them one at a time would time out.
+    both = threading.Barrier(2, timeout=5)
+    fsync = os.fsync
+
+    def waiting_fsync(fd):
+        # Directory fsyncs come after the batch's file fsyncs and need not wait.
+        if stat.S_ISREG(os.fstat(fd).st_mode):
+            both.wait()
+        fsync(fd)
+
+    monkeypatch.setattr(writer.os, "fsync", waiting_fsync)
+    paths = [str(tmp_path / "first.bin"), str(tmp_path / "second.bin")]
+    background_writer._pending = {path: 1 for path in paths}
+    background_writer._process([("write", path, b"x") for path in paths])
+
+    assert not background_writer.errors
+    assert sorted(os.listdir(tmp_path)) == ["first.bin", "second.bin"]
+
+
+def test_operations_run_in_queue_order(tmp_path):
+    source = str(tmp_path / "object.png")
+    target = str(tmp_path / "cover.png")
+    atomic_write(source, b"old")
+    background = BackgroundWriter()
+    background._pending = {source: 1, target: 1}
+    # The link is queued before the rewrite in the same batch, so it sees the old content.
+    background._process([("link", target, source), ("write", source, b"new")])
+    assert open(target, "rb").read() == b"old"
+    assert open(source, "rb").read() == b"new"
+    assert not background.errors
+
+
+def test_cover_store_counts_queued_objects_as_stored(tmp_path, background_writer):
+    store = CoverStore(str(tmp_path))
+    release = threading.Event()
+    original = background_writer._process
+    background_writer._process = lambda batch: (release.wait(), original(batch))
+
+    object_path = store.add("task", "name", PARAMS, "prompt", b"png")
+    assert not os.path.exists(object_path)
+    assert store.lookup("task", "name", PARAMS) == (object_path, "prompt")
+
+    release.set()
+    background_writer.close()
+    assert open(object_path, "rb").read() == b"png"